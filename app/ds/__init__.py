@@ -4,6 +4,17 @@
 Классы и функции, которые рекомендуется использовать перечисленны далее
 """
 from .ds_hook import DSHook, DS_TYPE_SCOPE, DS_TYPE_OBJECT, DS_GROUP_SCOPE, DS_GROUP_CATEGORY
+from .async_ds_hook import AsyncDSHook
 from .ds_dict import DSDict
+from .ds_entry import DSEntry
+from .ds_result_set import DSResultSet
+from .cancel_token import CancelToken, OperationCancelled, cancel_token_ctx_var
+from .ds_changes import add_change_listener, remove_change_listener
+from .ds_pool import DSConnectionPool
+from .ds_search_base import DSCapabilities, get_capabilities
 
-__all__ = ["DSHook", "DSDict", "DS_TYPE_SCOPE", "DS_TYPE_OBJECT", "DS_GROUP_SCOPE", "DS_GROUP_CATEGORY"]
+__all__ = ["DSHook", "AsyncDSHook", "DSDict", "DSEntry", "DSResultSet",
+           "DS_TYPE_SCOPE", "DS_TYPE_OBJECT", "DS_GROUP_SCOPE", "DS_GROUP_CATEGORY",
+           "CancelToken", "OperationCancelled", "cancel_token_ctx_var",
+           "add_change_listener", "remove_change_listener", "DSConnectionPool",
+           "DSCapabilities", "get_capabilities"]
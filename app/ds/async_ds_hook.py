@@ -0,0 +1,419 @@
+"""
+Асинхронный вариант DSHook.
+
+DSHook ожидает результат каждого запроса в отдельном потоке, поэтому число одновременных поисков ограничено числом
+потоков. AsyncDSHook отправляет запрос (search_ext) и ожидает результат в цикле событий asyncio: дескриптор
+соединения (fileno) регистрируется в цикле событий, а готовые результаты забираются без блокировки
+(result3 с timeout=0). Так сотни одновременных поисков обслуживаются несколькими потоками.
+
+Данные TLS могут быть уже прочитаны из сокета в буфер библиотеки, поэтому, пока есть ожидающие запросы,
+результаты дополнительно проверяются каждые POLL_INTERVAL секунд. Если цикл событий не поддерживает add_reader
+(например, ProactorEventLoop), результаты ожидаются только проверкой по интервалу.
+
+Порядок поиска (постраничный поиск, дозапрос значений со свойством "range", параллельный поиск, поиск членов группы)
+общий с DSHook: AsyncDSHook исполняет те же корутины (DSHook._get_object, app.ds.func_ds_get.paged_search и т.д.),
+заменяя только ожидание - запросы исполняет сессия _Dispatcher.
+
+Открытие сессии (bind, пул сессий, выбор хоста, rootDSE) и конвертация страниц исполняются в пуле потоков executor
+(для присосок /ds - в пуле APIRouter), так как это блокирующие операции или работа на чистом Python. Методы DSHook,
+у которых нет асинхронного варианта (изменение объектов), исполняются там же, на это время асинхронное ожидание
+результатов сессии приостанавливается, а прерывание запросов откладывается до освобождения сессии
+"""
+import asyncio
+import logging
+import functools
+import contextvars
+from contextlib import aclosing
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable
+
+import ldap
+
+from .ds_dict import DSDict
+from .ds_result_set import DSResultSet
+from .ds_hook import DSHook
+from .cancel_token import CancelToken, OperationCancelled
+from .data import DS_TYPE_SCOPE, DS_TYPE_OBJECT
+from .ds_pool import DSConnectionPool
+from .func_ds_partition import PartitionQueue
+
+# Интервал в секундах, через который проверяются результаты, уже прочитанные в буфер TLS
+POLL_INTERVAL = 0.05
+
+# Указатель завершения работы сессии параллельного поиска
+_DONE = object()
+
+
+def _to_thread(executor: Executor | None, func: Callable, /, *args, **kwargs) -> asyncio.Future:
+    """Исполнение функции в пуле потоков executor (None - пул asyncio по умолчанию) с копией текущего контекста"""
+    return asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(contextvars.copy_context().run, func, *args, **kwargs))
+
+
+class _Dispatcher:
+    """
+    Ожидание результатов запросов одной сессии в цикле событий.
+    Сессия общих корутин поиска (см. app.ds.func_ds_get.BlockingSession)
+    """
+
+    def __init__(self, connect, _logger, cancel_token: CancelToken | None = None, executor: Executor | None = None,
+                 poll_interval: float = POLL_INTERVAL):
+        self._connect = connect
+        self._logger = _logger
+        self._executor = executor
+        self._poll_interval = poll_interval
+        self._loop = asyncio.get_running_loop()
+        self.cancel_token = cancel_token
+
+        # Ожидающие запросы: msgid -> (Future, токен отмены)
+        self._waiters: dict[int, tuple[asyncio.Future, CancelToken | None]] = {}
+        self._fd: int | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+        # Число вызовов DSHook в потоках. Пока они исполняются, сессия занята потоком и не опрашивается
+        self._busy = 0
+        self._ready = asyncio.Event()
+        self._ready.set()
+
+        # Вызовы, отложенные до освобождения сессии (прерывание запросов)
+        self._deferred: list[tuple[Callable, tuple]] = []
+
+    def _watch(self) -> None:
+        """Регистрация дескриптора соединения в цикле событий и запуск проверки по интервалу"""
+        if self._fd is None:
+            try:
+                fd = self._connect.fileno()
+                self._loop.add_reader(fd, self._poll)
+                self._fd = fd
+            except (NotImplementedError, ValueError, OSError, ldap.LDAPError) as e:
+                self._logger.debug(f"Descriptor is not watched, results are polled: {e}")
+        if self._timer is None:
+            self._timer = self._loop.call_later(self._poll_interval, self._tick)
+
+    def _unwatch(self) -> None:
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _tick(self) -> None:
+        self._timer = None
+        self._poll()
+        if self._waiters:
+            self._timer = self._loop.call_later(self._poll_interval, self._tick)
+
+    def _poll(self) -> None:
+        """Получение готовых результатов без блокировки"""
+        if self._busy:
+            return
+
+        for msgid, (future, cancel_token) in list(self._waiters.items()):
+            if future.done():
+                continue
+            if cancel_token and cancel_token.cancelled:
+                future.set_exception(OperationCancelled("Operation was cancelled"))
+                continue
+            try:
+                result = self._connect.result3(msgid, all=1, timeout=0)
+            except ldap.LDAPError as e:
+                future.set_exception(e)
+                continue
+            if result[0] is not None:
+                future.set_result(result)
+
+    async def submit(self, func: Callable, /, *args, **kwargs):
+        """Отправка запроса (search_ext и т.д.), когда сессия не занята потоком"""
+        await self._ready.wait()
+        return func(*args, **kwargs)
+
+    async def search(self, **kwargs) -> int:
+        """Отправка запроса (search_ext). Возвращается ID запроса"""
+        return await self.submit(self._connect.search_ext, **kwargs)
+
+    async def result(self, msgid: int) -> tuple:
+        """
+        Ожидание результата запроса. Если ожидание отменено (asyncio или токен отмены сессии),
+        запрос прерывается на сервере (abandon)
+
+        Args:
+            msgid: ID запроса
+        """
+        future = self._loop.create_future()
+        self._waiters[msgid] = (future, self.cancel_token)
+        self._watch()
+        # Результат мог быть получен до регистрации дескриптора
+        self._poll()
+        try:
+            return await future
+        except (asyncio.CancelledError, OperationCancelled):
+            self._logger.info(f"Search was cancelled, abandon msgid: {msgid}")
+            self.abandon(msgid)
+            raise
+        finally:
+            self._waiters.pop(msgid, None)
+            if not self._waiters:
+                self._unwatch()
+
+    async def convert(self, func: Callable, /, *args):
+        """Конвертация страницы в пуле потоков (сессия при этом не занята)"""
+        return await _to_thread(self._executor, func, *args)
+
+    def defer(self, func: Callable, /, *args) -> None:
+        """Вызов с сессией без ожидания: сразу, если сессия не занята потоком, иначе после её освобождения"""
+        if self._busy:
+            self._deferred.append((func, args))
+        else:
+            func(*args)
+
+    def abandon(self, msgid: int) -> None:
+        """Прерывание запроса на сервере (откладывается, если сессия занята потоком)"""
+        self.defer(self._abandon, msgid)
+
+    def close_paged(self, **kwargs) -> None:
+        """Закрытие очереди страниц на сервере (откладывается, если сессия занята потоком)"""
+        self.defer(self._close_paged, kwargs)
+
+    def _abandon(self, msgid: int) -> None:
+        try:
+            self._connect.abandon_ext(msgid)
+        except ldap.LDAPError as e:
+            self._logger.debug(f"Request was not abandoned: {e}")
+
+    def _close_paged(self, kwargs: dict) -> None:
+        try:
+            self._connect.search_ext(**kwargs)
+        except ldap.LDAPError as e:
+            self._logger.debug(f"Paged search was not abandoned: {e}")
+
+    async def run_in_thread(self, func: Callable, /, *args, **kwargs):
+        """Исполнение блокирующей функции с сессией в потоке. На это время опрос сессии приостанавливается"""
+        self._busy += 1
+        self._ready.clear()
+        future = _to_thread(self._executor, func, *args, **kwargs)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            # Если ожидание отменено, сессия остаётся занятой, пока функция исполняется в потоке
+            if future.done():
+                self._release()
+            else:
+                future.add_done_callback(self._finished)
+
+    def _finished(self, future: asyncio.Future) -> None:
+        # Ошибка функции, ожидание которой было отменено, только освобождает сессию
+        if not future.cancelled():
+            future.exception()
+        self._release()
+
+    def _release(self) -> None:
+        self._busy -= 1
+        if not self._busy:
+            self._ready.set()
+            # Отложенные вызовы и результаты, полученные за время исполнения в потоке
+            deferred, self._deferred = self._deferred, []
+            for func, args in deferred:
+                func(*args)
+            self._poll()
+
+    async def idle(self) -> None:
+        """Ожидание освобождения сессии (завершения вызовов в потоках и отложенных вызовов)"""
+        await self._ready.wait()
+
+    @property
+    def busy(self) -> bool:
+        """Сессия занята вызовом в потоке"""
+        return bool(self._busy)
+
+    def close(self) -> None:
+        self._unwatch()
+
+
+class AsyncDSHook:
+    def __init__(self, host: str | list[str], login: str, password: str = None, keytab: str = None,
+                 port: int = 636, base: str = None, dry_run: bool = False, log_level: int = logging.INFO,
+                 page_decoder: Callable | None = None, cancel_token: CancelToken | None = None,
+                 pool: DSConnectionPool | None = None, connect_timeout: float = 10.0,
+                 parallel_connect: int = 1, parallel_search: int = 1, page_size: int | None = None,
+                 range_step: int | None = None, lazy: bool = False, columnar: bool = False,
+                 poll_interval: float = POLL_INTERVAL, executor: Executor | None = None) -> None:
+        """
+        Асинхронный вариант DSHook. Используется через async with, методы поиска - корутины,
+        методы iter_* - асинхронные генераторы страниц. Аргументы совпадают с DSHook
+
+        Args:
+            poll_interval: Интервал в секундах, через который проверяются результаты, уже прочитанные в буфер TLS
+            executor: Пул потоков для блокирующих операций (открытие и закрытие сессии, конвертация страниц,
+                изменение объектов). Присоски передают слот пула APIRouter (slot_ctx_var).
+                Если None, используется пул asyncio по умолчанию
+        """
+        self._hook = DSHook(host=host, login=login, password=password, keytab=keytab, port=port, base=base,
+                            dry_run=dry_run, log_level=log_level, page_decoder=page_decoder,
+                            cancel_token=cancel_token, pool=pool, connect_timeout=connect_timeout,
+                            parallel_connect=parallel_connect, parallel_search=parallel_search,
+                            page_size=page_size, range_step=range_step, lazy=lazy, columnar=columnar)
+        self._poll_interval = poll_interval
+        self._executor = executor
+        self._dispatcher: _Dispatcher | None = None
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        if log_level:
+            self._logger.setLevel(log_level)
+
+    @classmethod
+    def _wrap(cls, hook: DSHook, poll_interval: float = POLL_INTERVAL,
+              executor: Executor | None = None) -> "AsyncDSHook":
+        """Асинхронный вариант уже созданного DSHook (например, сессии параллельного поиска)"""
+        async_hook = cls.__new__(cls)
+        async_hook._hook = hook
+        async_hook._poll_interval = poll_interval
+        async_hook._executor = executor
+        async_hook._dispatcher = None
+        async_hook._logger = logging.getLogger(cls.__name__)
+        return async_hook
+
+    @property
+    def base(self) -> str:
+        return self._hook.base
+
+    @base.setter
+    def base(self, value: str) -> None:
+        self._hook.base = value
+
+    @property
+    def dry_run(self) -> bool:
+        return self._hook.dry_run
+
+    @property
+    def capabilities(self):
+        """Возможности контроллера домена текущей сессии (см. DSHook.capabilities)"""
+        return self._hook.capabilities
+
+    def _enter(self) -> None:
+        self._hook.__enter__()
+        # Размер страницы и шаг дозапроса значений определяются по политике запросов DS до начала поиска,
+        # чтобы чтение rootDSE не исполнялось в цикле событий
+        try:
+            _ = self._hook.page_size, self._hook.range_step
+        except BaseException as e:
+            self._hook.__exit__(type(e), e, e.__traceback__)
+            raise
+
+    async def __aenter__(self):
+        """Открытие сессии в потоке (bind, пул сессий, выбор хоста, rootDSE и политика запросов)"""
+        await _to_thread(self._executor, self._enter)
+        self._dispatcher = _Dispatcher(self._hook._connect, self._logger, self._hook._cancel_token, self._executor,
+                                       self._poll_interval)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Закрытие сессии (или возврат в пул) в потоке после завершения вызовов и отложенных прерываний запросов"""
+        await self._dispatcher.idle()
+        self._dispatcher.close()
+        await _to_thread(self._executor, self._hook.__exit__, exc_type, exc_val, exc_tb)
+        return False
+
+    def __getattr__(self, name: str):
+        """
+        Методы DSHook без асинхронного варианта (изменение объектов) исполняются в потоке
+        и возвращают корутину
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        method = getattr(self._hook, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return await self._dispatcher.run_in_thread(method, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def _iter_partitioned(self, ldap_filter: str, properties: list, type_object: str,
+                                decoder: Callable | None = None) -> AsyncIterator[list[DSDict]]:
+        """Параллельный поиск по поддереву области каталога в задачах asyncio (см. DSHook._iter_partitioned)"""
+        partitions = await self._hook._plan_partitions(self._dispatcher)
+        work = PartitionQueue(partitions)
+        workers = min(self._hook._parallel_search, len(partitions))
+
+        pages = asyncio.Queue(maxsize=workers * 2)
+        cancel_token = CancelToken()
+
+        async def worker(index: int) -> None:
+            try:
+                async with AsyncDSHook._wrap(self._hook._sibling(index, cancel_token), self._poll_interval,
+                                             self._executor) as ds:
+                    async with aclosing(ds._hook._partition_pages(ds._dispatcher, work, ldap_filter=ldap_filter,
+                                                                  properties=properties, type_object=type_object,
+                                                                  decoder=decoder)) as partition_pages:
+                        async for page in partition_pages:
+                            await pages.put(page)
+            except Exception as e:
+                await pages.put(e)
+            await pages.put(_DONE)
+
+        tasks = [asyncio.ensure_future(worker(index)) for index in range(workers)]
+        running = workers
+        try:
+            while running:
+                item = await pages.get()
+                if self._hook._cancel_token:
+                    self._hook._cancel_token.raise_if_cancelled()
+
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Остальные сессии прерывают поиск и закрываются
+            cancel_token.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get_object(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            type_object: DS_TYPE_OBJECT = "object", result_set_size: int | None = None
+    ) -> list[DSDict]:
+        """Функция запроса любого объекта из каталога. Аргументы совпадают с DSHook.get_object"""
+        return await self._hook._get_object(self._dispatcher, self._iter_partitioned, identity=identity,
+                                            ldap_filter=ldap_filter, properties=properties,
+                                            search_scope=search_scope, type_object=type_object,
+                                            result_set_size=result_set_size)
+
+    def iter_object(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            type_object: DS_TYPE_OBJECT = "object", result_set_size: int | None = None
+    ) -> AsyncIterator[list[DSDict]]:
+        """
+        Функция постраничного запроса любого объекта из каталога (асинхронный генератор страниц).
+        Аргументы совпадают с DSHook.iter_object
+        """
+        return self._hook._iter_object(self._dispatcher, self._iter_partitioned, identity=identity,
+                                       ldap_filter=ldap_filter, properties=properties, search_scope=search_scope,
+                                       type_object=type_object, result_set_size=result_set_size)
+
+    # Запросы объектов одного типа. Аргументы совпадают с одноимёнными методами DSHook
+    get_user = functools.partialmethod(get_object, type_object="user")
+    get_group = functools.partialmethod(get_object, type_object="group")
+    get_computer = functools.partialmethod(get_object, type_object="computer")
+    get_contact = functools.partialmethod(get_object, type_object="contact")
+    iter_user = functools.partialmethod(iter_object, type_object="user")
+    iter_group = functools.partialmethod(iter_object, type_object="group")
+    iter_computer = functools.partialmethod(iter_object, type_object="computer")
+    iter_contact = functools.partialmethod(iter_object, type_object="contact")
+
+    async def get_group_member(self, identity: str | dict | DSDict) -> list[DSDict] | DSResultSet:
+        """
+        Функция получения всех членов группы, с дополнительными атрибутами.
+        Если передан DSDict группы, поиск группы не будет производиться. Аргументы совпадают с DSHook.get_group_member
+        """
+        return await self._hook._get_group_member(self._dispatcher, identity)
@@ -0,0 +1,37 @@
+"""
+Токен отмены операций с DS.
+
+Операции с DS исполняются в потоках, которые нельзя прервать извне. Поэтому поиск периодически проверяет токен
+и при отмене сам прерывает запрос на сервере (abandon), закрывает очередь страниц и завершается исключением
+OperationCancelled, после чего сессия закрывается при выходе из DSHook.
+"""
+import threading
+import contextvars
+
+
+class OperationCancelled(Exception):
+    """Исключение при отмене операции через CancelToken"""
+
+
+class CancelToken:
+    def __init__(self):
+        """Токен отмены операции. Может быть отменён из любого потока"""
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Отмена операции"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Указатель, что операция отменена"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Вызов OperationCancelled, если операция отменена"""
+        if self._event.is_set():
+            raise OperationCancelled("Operation was cancelled")
+
+
+# Токен отмены текущего запроса. Назначается при исполнении присоски и используется DSHook по умолчанию
+cancel_token_ctx_var: contextvars.ContextVar[CancelToken | None] = contextvars.ContextVar("cancel_token", default=None)
@@ -1,6 +1,8 @@
 """
 Общие функции для конвертации значений
 """
+from functools import lru_cache
+
 # Флаги и связанный байт для атрибута userAccountControl
 _UAC_FLAGS = {
     'SCRIPT': 0x0001,
@@ -88,10 +90,34 @@ _TYPES_OBJECT = {
     "secret": ['top', 'leaf', 'secret'],
 }
 
+# Отсортированные флаги атрибута ObjectClass - короткое имя объекта. При совпадении флагов используется имя,
+# которое указано в _TYPES_OBJECT первым (словарь заполняется с конца)
+_OBJECT_CLASS_NAMES = {tuple(sorted(flags)): name for name, flags in reversed(_TYPES_OBJECT.items())}
+
+
+@lru_cache(maxsize=1024)
+def _uac_names(numeric: int) -> tuple[str, ...]:
+    """Флаги userAccountControl из кэша (у объектов обычно несколько различных значений атрибута)"""
+    return tuple(name for name, bit in _UAC_FLAGS.items() if numeric & bit)
+
 
 def uac_to_flags(numeric: int) -> list:
     """Функция возвращает флаги userAccountControl на основе integer"""
-    return [name for name, bit in _UAC_FLAGS.items() if numeric & bit]
+    return list(_uac_names(numeric))
+
+
+@lru_cache(maxsize=1024)
+def _grouptype_names(request: int, skip_error: bool) -> tuple[str, ...]:
+    """Флаги groupType в текстовой форме из кэша (см. convert_grouptype)"""
+    if request & sum(flag['value'] for flag in _GROUPTYPE_FLAGS) != request:
+        raise ValueError('Переданы некорректное числовое значение')
+    result = [flag for flag in _GROUPTYPE_FLAGS if request & flag['value'] == flag['value']]
+
+    mutex_result = [flag['mutex_group'] for flag in result]
+    if not skip_error and len(mutex_result) != len(set(mutex_result)):
+        raise ValueError(f'Одновременная установка флагов {[entry["name"] for entry in result]} невозможна')
+
+    return tuple(entry["name"] for entry in result)
 
 
 def convert_grouptype(request: tuple | list | int, skip_error: bool = False) -> int | list:
@@ -118,15 +144,7 @@ def convert_grouptype(request: tuple | list | int, skip_error: bool = False) ->
 
         return sum(flag['value'] for flag in result)
     elif isinstance(request, int):
-        if request & sum(flag['value'] for flag in _GROUPTYPE_FLAGS) != request:
-            raise ValueError('Переданы некорректное числовое значение')
-        result = [flag for flag in _GROUPTYPE_FLAGS if request & flag['value'] == flag['value']]
-
-        mutex_result = [flag['mutex_group'] for flag in result]
-        if not skip_error and len(mutex_result) != len(set(mutex_result)):
-            raise ValueError(f'Одновременная установка флагов {[entry["name"] for entry in result]} невозможна')
-
-        return [entry["name"] for entry in result]
+        return list(_grouptype_names(request, skip_error))
     else:
         raise TypeError('Данная функция принимает данные только следующих типов: list, tuple, int')
 
@@ -145,10 +163,7 @@ def convert_object_class(name: str = None, flags: list = None) -> str | list:
         raise RuntimeError("Недопустимо использовать оба ключа")
 
     if isinstance(flags, list):
-        for key, item in _TYPES_OBJECT.items():
-            if sorted(flags) == sorted(item):
-                return key
-        return flags
+        return _OBJECT_CLASS_NAMES.get(tuple(sorted(flags)), flags)
     elif isinstance(name, str):
         if name.lower() in _TYPES_OBJECT:
             return _TYPES_OBJECT[name.lower()]
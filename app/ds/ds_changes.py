@@ -0,0 +1,45 @@
+"""
+Уведомления об изменениях объектов в DS, выполненных через DSHook.
+
+Функции изменения (set_*, new_*, remove_*, move_object, rename_object, изменение членства) после успешного запроса
+передают distinguishedName затронутых объектов подписчикам (например, кэшу ответов присосок, чтобы сбросить
+устаревшие записи). Подписчики вызываются в потоке, исполняющем изменение
+"""
+import logging
+from typing import Callable
+
+_LISTENERS: list[Callable[[list[str]], None]] = []
+
+_logger = logging.getLogger(__name__)
+
+
+def add_change_listener(listener: Callable[[list[str]], None]) -> None:
+    """
+    Подписка на изменения объектов
+
+    Args:
+        listener: Функция, принимающая список distinguishedName изменённых объектов
+    """
+    if listener not in _LISTENERS:
+        _LISTENERS.append(listener)
+
+
+def remove_change_listener(listener: Callable[[list[str]], None]) -> None:
+    """Отмена подписки на изменения объектов"""
+    if listener in _LISTENERS:
+        _LISTENERS.remove(listener)
+
+
+def notify_change(*dns: str) -> None:
+    """
+    Уведомление подписчиков об изменении объектов. Ошибка подписчика не прерывает изменение
+
+    Args:
+        dns: distinguishedName изменённых объектов
+    """
+    dns = [dn for dn in dns if dn]
+    for listener in list(_LISTENERS):
+        try:
+            listener(dns)
+        except Exception as e:
+            _logger.warning(f"Change listener failed: {e}")
@@ -1,34 +1,100 @@
 """
 Словарь игнорирующий заглавные буквы в ключах и сохраняющий формат исходных ключей
+
+Значения хранятся в самом словаре по ключам в нижнем регистре (casefold), исходные ключи - в таблице ключей
+(ключ в нижнем регистре - исходный ключ) в том же порядке. Ключи в нижнем регистре вычисляются один раз на название
+и кэшируются (_casefold), а таблица ключей может быть общей для нескольких словарей с одинаковым набором ключей
+(например, для всех объектов одного плана конвертации): словарь копирует таблицу, только когда изменяет её
 """
+import sys
+from functools import lru_cache
+
 _no_default = object()
 
+# Названия ключей - ключи в нижнем регистре (строки интернируются и общие для всех словарей)
+_CASEFOLD = {}
+_cached = _CASEFOLD.get
+# Максимальное число названий в кэше. Названия сверх него (произвольные ключи) приводятся к нижнему регистру каждый раз
+CASEFOLD_CACHE = 65536
+
+
+def _casefold(key: str) -> str:
+    """Ключ в нижнем регистре из кэша"""
+    lower_key = _CASEFOLD.get(key)
+    if lower_key is None:
+        lower_key = sys.intern(key.casefold())
+        if len(_CASEFOLD) < CASEFOLD_CACHE:
+            _CASEFOLD[key] = lower_key
+    return lower_key
+
+
+@lru_cache(maxsize=4096)
+def key_table(keys: tuple[str, ...]) -> dict[str, str]:
+    """
+    Общая таблица ключей для набора исходных ключей (см. DSDict._from_table). Таблица не должна изменяться
+
+    Args:
+        keys: Исходные ключи в порядке словаря
+    """
+    return {_casefold(key): key for key in keys}
+
 
 class DSDict(dict):
     """Регистронечувствительный словарь, сохраняющий исходные ключи"""
+    # _original_keys - таблица ключей (ключ в нижнем регистре - исходный ключ),
+    # _shared - таблица общая с другими словарями и должна быть скопирована перед изменением
+    __slots__ = ("_original_keys", "_shared")
 
     def __init__(self, seed=None, **kwargs):
         super().__init__()
         self._original_keys = {}
+        self._shared = False
         # Defer work to the method .update
         self.update(seed)
         self.update(kwargs)
 
+    @classmethod
+    def _from_table(cls, table: dict[str, str], items) -> "DSDict":
+        """
+        Словарь с общей таблицей ключей (key_table) без приведения ключей к нижнему регистру
+
+        Args:
+            table: Таблица ключей (ключ в нижнем регистре - исходный ключ)
+            items: Словарь или пары (ключ в нижнем регистре, значение) в порядке таблицы ключей
+        """
+        new_dict = dict.__new__(cls)
+        dict.update(new_dict, items)
+        new_dict._original_keys = table
+        new_dict._shared = True
+        return new_dict
+
+    def _own(self) -> None:
+        """Копирование общей таблицы ключей перед её изменением"""
+        if self._shared:
+            self._original_keys = dict(self._original_keys)
+            self._shared = False
+
+    def _iter_items(self):
+        return zip(tuple(self._original_keys.values()), tuple(dict.values(self)))
+
     def __getitem__(self, key):
-        return dict.__getitem__(self, key.casefold())
+        return dict.__getitem__(self, _cached(key) or _casefold(key))
 
     def __setitem__(self, key, value):
-        lower_key = key.casefold()
-        self._original_keys[lower_key] = key
+        lower_key = _cached(key) or _casefold(key)
+        if self._original_keys.get(lower_key) != key:
+            self._own()
+            self._original_keys[lower_key] = key
         return dict.__setitem__(self, lower_key, value)
 
     def __delitem__(self, key):
-        lower_key = key.casefold()
+        lower_key = _cached(key) or _casefold(key)
         dict.__delitem__(self, lower_key)
+        self._own()
         self._original_keys.pop(lower_key, None)
 
     def __contains__(self, key):
-        return dict.__contains__(self, key.casefold())
+        return dict.__contains__(self, _cached(key) or _casefold(key))
 
     def __or__(self, other):
         base = self.copy()
@@ -40,33 +106,67 @@ class DSDict(dict):
         base.update(other)
         return base
 
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
     def copy(self):
-        new_dict = DSDict()
-        new_dict.update(self.items())
+        # Копия использует ту же таблицу ключей, пока один из словарей не изменит ключи
+        new_dict = DSDict._from_table(self._original_keys, dict.items(self))
+        self._shared = True
         return new_dict
 
     def get(self, key, default=None):
-        return dict.get(self, key.casefold(), default)
+        return dict.get(self, _cached(key) or _casefold(key), default)
 
     def pop(self, key, default=_no_default):
-        lower_key = key.casefold()
+        lower_key = _cached(key) or _casefold(key)
         if default is _no_default:
-            self._original_keys.pop(lower_key, None)
-            return dict.pop(self, lower_key)
+            value = dict.pop(self, lower_key)
+        elif dict.__contains__(self, lower_key):
+            value = dict.pop(self, lower_key)
         else:
-            self._original_keys.pop(lower_key, None)
-            return dict.pop(self, lower_key, default)
+            return default
+        self._own()
+        self._original_keys.pop(lower_key, None)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._own()
+        self._original_keys.pop(key, None)
+        return key, value
 
     def setdefault(self, key, default=None):
-        lower_key = key.casefold()
-        if lower_key not in self:
+        lower_key = _cached(key) or _casefold(key)
+        if not dict.__contains__(self, lower_key):
+            self._own()
             self._original_keys[lower_key] = key
         return dict.setdefault(self, lower_key, default)
 
+    def clear(self):
+        dict.clear(self)
+        self._original_keys = {}
+        self._shared = False
+
     def update(self, seed=None, **kwargs):
         if seed is None:
             seed = {}
 
+        if type(self) is DSDict:
+            # Ключи и значения добавляются целиком (результат тот же, что и при поочерёдном self[key] = value)
+            for pairs in (seed.items() if hasattr(seed, "items") else seed, kwargs.items()):
+                keys, values = [], []
+                for key, value in pairs:
+                    keys.append(key)
+                    values.append(value)
+                if keys:
+                    lower_keys = [_cached(key) or _casefold(key) for key in keys]
+                    dict.update(self, zip(lower_keys, values))
+                    self._own()
+                    self._original_keys.update(zip(lower_keys, keys))
+            return
+
         if hasattr(seed, "items"):
             for key, value in seed.items():
                 self[key] = value
@@ -78,17 +178,20 @@ class DSDict(dict):
             self[key] = value
 
     def keys(self):
-        return list(self._original_keys[k] for k in dict.keys(self))
+        return list(self._original_keys.values())
 
     def items(self):
-        return [(self._original_keys[k], v) for k, v in dict.items(self)]
+        return list(self._iter_items())
 
     def __iter__(self):
-        return iter(self.keys())
+        return iter(tuple(self._original_keys.values()))
 
     def __repr__(self):
         items = ", ".join(f"{k!r}: {v!r}" for k, v in self.items())
         return f"{self.__class__.__name__}({{{items}}})"
 
+    def __reduce__(self):
+        return self.__class__, (list(self.items()),)
+
     def original_dict(self):
-        return {orig_key: self[orig_key] for orig_key in self.keys()}
+        return dict(self.items())
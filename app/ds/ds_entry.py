@@ -0,0 +1,125 @@
+"""
+Объект DS с отложенной конвертацией значений.
+
+DSEntry хранит значения атрибутов в исходном виде (байты из result3) и конвертирует атрибут при первом обращении
+к нему (или при сериализации), результат запоминается. Набор, порядок и регистр ключей совпадают с DSDict,
+который вернула бы полная конвертация, поэтому DSEntry можно использовать везде, где ожидается DSDict.
+Правила конвертации берутся из плана конвертации (app.ds.func_ds_get.DecodePlan)
+"""
+from .ds_dict import DSDict, _no_default, _casefold
+
+# Значение ключа, которое ещё не сконвертировано
+_PENDING = object()
+
+
+class DSEntry(DSDict):
+    """Объект DS, атрибуты которого конвертируются при первом обращении"""
+    __slots__ = ("_raw", "_derived")
+
+    def __init__(self, data: dict, plan):
+        """
+        Args:
+            data: Атрибуты объекта в исходном виде
+            plan: План конвертации для набора атрибутов data (DecodePlan)
+        """
+        # Исходные значения: ключ в нижнем регистре - (функция конвертации, однозначный, значения).
+        # Скрытые атрибуты тоже хранятся, так как нужны для вычисляемых атрибутов
+        self._raw = {}
+        # Вычисляемые атрибуты: ключ в нижнем регистре - (исходный атрибут, функция)
+        self._derived = {}
+        for (attr, handler, single), key in zip(plan.attributes, plan.keys):
+            self._raw[key] = (handler, single, data[attr])
+        for attr, attr_extend, handler_extend in plan.extend:
+            self._derived[_casefold(attr_extend)] = (_casefold(attr), handler_extend)
+
+        # Таблица ключей общая для всех объектов плана
+        dict.update(self, dict.fromkeys(plan.table, _PENDING))
+        self._original_keys = plan.table
+        self._shared = True
+
+    def _value(self, key: str):
+        """Конвертация атрибута (ключ в нижнем регистре) без сохранения"""
+        if key in self._derived:
+            source, handler_extend = self._derived[key]
+            value = dict.get(self, source, _PENDING)
+            return handler_extend(self._value(source) if value is _PENDING else value)
+
+        handler, single, values = self._raw[key]
+        values = handler(values)
+        return values[0] if single else values
+
+    def _resolve(self, key: str):
+        """Значение атрибута (ключ в нижнем регистре): при первом обращении конвертируется и запоминается"""
+        value = dict.__getitem__(self, key)
+        if value is _PENDING:
+            value = self._value(key)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def decode_all(self) -> "DSEntry":
+        """Конвертация всех ещё не сконвертированных атрибутов"""
+        for key in list(dict.keys(self)):
+            self._resolve(key)
+        return self
+
+    def __getitem__(self, key):
+        return self._resolve(_casefold(key))
+
+    def __setitem__(self, key, value):
+        lower_key = _casefold(key)
+        self._raw.pop(lower_key, None)
+        self._derived.pop(lower_key, None)
+        return super().__setitem__(key, value)
+
+    def __eq__(self, other):
+        self.decode_all()
+        if isinstance(other, DSEntry):
+            other.decode_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def get(self, key, default=None):
+        lower_key = _casefold(key)
+        return self._resolve(lower_key) if dict.__contains__(self, lower_key) else default
+
+    def pop(self, key, default=_no_default):
+        lower_key = _casefold(key)
+        if dict.__contains__(self, lower_key):
+            self._resolve(lower_key)
+        return super().pop(key, default)
+
+    def popitem(self):
+        if dict.__len__(self):
+            self._resolve(next(reversed(dict.keys(self))))
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        lower_key = _casefold(key)
+        if dict.__contains__(self, lower_key):
+            return self._resolve(lower_key)
+        return super().setdefault(key, default)
+
+    def clear(self):
+        super().clear()
+        self._raw.clear()
+        self._derived.clear()
+
+    def values(self):
+        self.decode_all()
+        return dict.values(self)
+
+    def _iter_items(self):
+        self.decode_all()
+        return super()._iter_items()
+
+    def copy(self):
+        self.decode_all()
+        return super().copy()
+
+    def __reduce__(self):
+        # При передаче в другой процесс (пул процессов) объект передаётся полностью сконвертированным
+        return DSDict, (list(self.items()),)
@@ -0,0 +1,132 @@
+"""
+Учёт доступности хостов (контроллеров домена, адресов Тентакли).
+
+Для каждого хоста запоминаются ошибки подключения и время успешного подключения (скользящее среднее).
+После failure_threshold ошибок подряд хост считается недоступным (circuit breaker) на время backoff, которое
+удваивается с каждой следующей ошибкой (но не больше max_backoff). Когда время истекло, хост снова пробуется
+(одна попытка), успешное подключение сбрасывает счётчик ошибок.
+
+order() упорядочивает хосты: сначала доступные, среди них - с меньшим временем подключения
+(хосты без замеров сохраняют исходный порядок и пробуются первыми), недоступные хосты - в конце списка
+"""
+import time
+import threading
+
+
+class _HostState:
+    __slots__ = ("failures", "open_until", "latency", "successes", "errors")
+
+    def __init__(self):
+        self.failures = 0  # Ошибки подряд
+        self.open_until = 0.0  # Время, до которого хост считается недоступным (time.monotonic)
+        self.latency: float | None = None  # Скользящее среднее времени подключения в секундах
+        self.successes = 0
+        self.errors = 0
+
+
+class HealthRegistry:
+    def __init__(self, failure_threshold: int = 1, backoff: float = 5.0, max_backoff: float = 300.0,
+                 smoothing: float = 0.3):
+        """
+        Реестр доступности хостов
+
+        Args:
+            failure_threshold: Число ошибок подряд, после которого хост считается недоступным
+            backoff: Начальное время недоступности в секундах
+            max_backoff: Максимальное время недоступности в секундах
+            smoothing: Вес последнего замера в скользящем среднем времени подключения
+        """
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.smoothing = smoothing
+
+        self._hosts: dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        return self._hosts.setdefault(host.casefold(), _HostState())
+
+    def record_success(self, host: str, latency: float | None = None) -> None:
+        """
+        Успешное подключение к хосту
+
+        Args:
+            host: Хост
+            latency: Время подключения в секундах (если известно)
+        """
+        with self._lock:
+            state = self._state(host)
+            state.failures = 0
+            state.open_until = 0.0
+            state.successes += 1
+            if latency is not None:
+                state.latency = latency if state.latency is None else \
+                    state.latency + self.smoothing * (latency - state.latency)
+
+    def record_failure(self, host: str) -> None:
+        """Ошибка подключения к хосту"""
+        with self._lock:
+            state = self._state(host)
+            state.failures += 1
+            state.errors += 1
+            if state.failures >= self.failure_threshold:
+                backoff = min(self.backoff * 2 ** (state.failures - self.failure_threshold), self.max_backoff)
+                state.open_until = time.monotonic() + backoff
+
+    def available(self, host: str) -> bool:
+        """Хост не отмечен как недоступный (или время недоступности истекло)"""
+        with self._lock:
+            state = self._hosts.get(host.casefold())
+            return state is None or state.open_until <= time.monotonic()
+
+    def order(self, hosts: list[str]) -> list[str]:
+        """
+        Упорядочивание хостов для подключения. Недоступные хосты не исключаются, а переносятся в конец,
+        чтобы подключение было возможно, даже если недоступны все хосты
+
+        Args:
+            hosts: Хосты в исходном порядке
+        """
+        now = time.monotonic()
+        with self._lock:
+            states = [self._hosts.get(host.casefold()) for host in hosts]
+            keys = [(state is not None and state.open_until > now, (state.latency or 0.0) if state else 0.0)
+                    for state in states]
+        return [host for _, host in sorted(zip(keys, hosts), key=lambda i: i[0])]
+
+    def spread(self, hosts: list[str], index: int) -> list[str]:
+        """
+        Упорядочивание хостов для одной из параллельных сессий: как order(), но первым ставится index-й доступный
+        хост, чтобы параллельные сессии распределялись по разным хостам
+
+        Args:
+            hosts: Хосты в исходном порядке
+            index: Номер сессии
+        """
+        ordered = self.order(hosts)
+        available = [host for host in ordered if self.available(host)]
+        if not available:
+            return ordered
+        first = available[index % len(available)]
+        ordered.remove(first)
+        return [first] + ordered
+
+    def stats(self) -> dict:
+        """Статистика по хостам"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "available": state.open_until <= now,
+                    "failures": state.failures,
+                    "latency": round(state.latency, 4) if state.latency is not None else None,
+                    "successes": state.successes,
+                    "errors": state.errors,
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+# Общий реестр доступности хостов
+health = HealthRegistry()
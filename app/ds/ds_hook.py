@@ -2,23 +2,45 @@
 Класс для обращения к СК
 """
 import os
+import time
+import queue
 import subprocess
 import logging
+import contextvars
+from contextlib import aclosing
 from datetime import datetime
+from typing import AsyncIterator, Iterator, Callable
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import ldap
 import ldap.sasl
 
 from .ds_dict import DSDict
+from .ds_result_set import DSResultSet
+from .cancel_token import CancelToken, OperationCancelled, cancel_token_ctx_var
+from .ds_pool import DSConnectionPool, PooledConnection
+from .ds_kerberos import ticket_manager, is_credentials_error
+from .ds_health import health
+from .ds_changes import notify_change
 from .data import DataDSProperties, DS_TYPE_SCOPE, DS_TYPE_OBJECT, DS_GROUP_SCOPE, DS_GROUP_CATEGORY
-from .func_ds_get import search_object, gen_filter_to_id
-from .ds_search_base import search_root_dse
+from .func_ds_get import search_object, search_all, paged_search, gen_filter_to_id, BlockingSession, run_blocking, \
+    iter_blocking, CANCEL_POLL, DEFAULT_PAGE_SIZE
+from .func_ds_partition import CHILD_PROPERTIES, raw_page, plan_partitions, PartitionQueue
+from .func_ds_member import ASQ_OID, read_members, member_strategy, member_search, members_in_base
+from .ds_search_base import DSCapabilities, fetch_capabilities
 from .convertors_value import _UAC_FLAGS
 from .func_ds_gen import gen_uac, gen_gt, gen_change_pwd_at_logon, gen_account_exp_date
 from .func_ds_new import ds_new
 from .func_ds_set import ds_set
 from .func_ds_set_member import ds_set_member
 
+# Ошибки, после которых сессия из пула не используется повторно
+_BROKEN = (ldap.SERVER_DOWN, ldap.TIMEOUT, ldap.CONNECT_ERROR, OperationCancelled)
+
+# Указатель завершения работы сессии параллельного поиска
+_DONE = object()
+
 # Префикс для типа LDAP подключения
 _PREFIX_LDAP = {
     636: 'ldaps',
@@ -28,7 +50,8 @@ _PREFIX_LDAP = {
 
 def kinit_keytab(login: str, keytab: str):
     """
-    Формирование Тикета для подключения по Kerberos
+    Формирование Тикета для подключения по Kerberos.
+    DSHook использует менеджер билетов (app.ds.ds_kerberos), функция сохранена для внешних вызовов
 
     Args:
         login: Логин из Keytab
@@ -46,9 +69,41 @@ def kinit_keytab(login: str, keytab: str):
     )
 
 
+def _gen_properties(properties: str | list | tuple | None, type_object: DS_TYPE_OBJECT) -> list[str]:
+    """
+    Формирование списка запрашиваемых атрибутов с учётом стандартных атрибутов для типа объекта
+
+    Args:
+        properties: Запрошенные атрибуты. '*' возвращает все заполненные атрибуты
+        type_object: Тип объекта
+    """
+    # Если передан список атрибутов, он добавляется с учётом стандартных атрибутов для типа объекта
+    if properties:
+        if isinstance(properties, str):
+            properties = [properties]
+
+        if '*' in properties:
+            if len(properties) != 1:
+                raise RuntimeError("При запросе всех атрибутов может быть только один знак *")
+            properties = list(properties)
+        else:
+            properties = list(set([i.casefold() for i in properties]))
+            properties += [i.casefold() for i in DataDSProperties[type_object.upper()].value
+                           if i.casefold() not in properties]
+    # Запрашиваются только стандартные атрибуты
+    else:
+        properties = list(set([i.casefold() for i in DataDSProperties[type_object.upper()].value]))
+
+    return properties
+
+
 class DSHook:
     def __init__(self, host: str | list[str], login: str, password: str = None, keytab: str = None,
-                 port: int = 636, base: str = None, dry_run: bool = False, log_level: int = logging.INFO) -> None:
+                 port: int = 636, base: str = None, dry_run: bool = False, log_level: int = logging.INFO,
+                 page_decoder: Callable | None = None, cancel_token: CancelToken | None = None,
+                 pool: DSConnectionPool | None = None, connect_timeout: float = 10.0,
+                 parallel_connect: int = 1, parallel_search: int = 1, page_size: int | None = None,
+                 range_step: int | None = None, lazy: bool = False, columnar: bool = False) -> None:
         """
         Класс создаёт сессию с DS, в рамках который будет исполнен запрос к каталогу
         (запрос описывается в рамках наследованных функций).
@@ -61,14 +116,47 @@ class DSHook:
             login: Логин учётной записи, от имени который создаётся сессия в DS (для билетов Kerberos (Keytab) требуется userPrincipalName с доменом заглавными буквами)
             password: Пароль от учётной записи
             keytab: Путь до Keytab-файла, если требуется запросить keytab
-            host: Адрес контроллера домена (если в строке будут указаны хосты через запятую или передан список хостов, хук последовательно подключается к каждому, пока не сможет установить соединение)
+            host: Адрес контроллера домена (если в строке будут указаны хосты через запятую или передан список хостов, хук последовательно подключается к каждому, пока не сможет установить соединение. Хосты упорядочиваются по доступности и времени подключения)
             port: Порт подключения: 389 или 636 (по умолчанию 636)
             base: Область каталога. Если не указать, при открытии сессии у DS будет запрошена область работы (при определении зоны поиска автоматически исключается DomainDnsZones, ForestDnsZones). Допустимо переназначать переменную base после определения класса
             dry_run: Формирование запроса, без внесения изменений в DS
             log_level: Переопределение глубины логирования
+            page_decoder: Функция исполнения конвертации страниц в генераторах iter_* (например, в пуле процессов).
+                Вызывается как page_decoder(decode_page, *args), возвращённое значение передаётся как страница
+            cancel_token: Токен отмены поиска. Если не указан, используется токен текущего запроса (cancel_token_ctx_var)
+            pool: Пул сессий (DSConnectionPool). Если указан, сессия берётся из пула и возвращается в него при выходе
+            connect_timeout: Время ожидания подключения к хосту в секундах (OPT_NETWORK_TIMEOUT)
+            parallel_connect: Число хостов, к которым одновременно открывается сессия. Используется первая открытая
+            parallel_search: Число сессий, в которых параллельно исполняется поиск по LDAP-фильтру на всю глубину
+                (search_scope="subtree") без ограничения result_set_size. Поддерево делится на части
+                (см. app.ds.func_ds_partition), сессии распределяются по хостам. При 1 поиск исполняется в одной сессии
+            page_size: Размер страницы поиска. Если не указан, берётся MaxPageSize из политики запросов
+                контроллера домена (lDAPAdminLimits). При указанном result_set_size страница не больше оставшегося числа
+                объектов
+            range_step: Число значений атрибута в одном дозапросе (member и т.д.). Если не указан, берётся MaxValRange
+                контроллера домена, если и он неизвестен - сервер возвращает столько значений, сколько разрешает
+            lazy: Методы get_* и iter_* возвращают объекты DSEntry, атрибуты которых конвертируются при первом
+                обращении (если нужны только некоторые атрибуты найденных объектов)
+            columnar: Методы get_* и iter_* возвращают результат по столбцам (DSResultSet) вместо списков DSDict.
+                Для больших выгрузок: таблица ключей общая на весь результат, при сериализации ответа объекты
+                DSDict не создаются
         """
 
         self.dry_run = dry_run
+        self._page_decoder = page_decoder
+        self._cancel_token = cancel_token or cancel_token_ctx_var.get()
+        self._pool = pool
+        self._pooled: PooledConnection | None = None
+        self._connected_host = None
+        self._capabilities: DSCapabilities | None = None
+        self._connect_timeout = connect_timeout
+        self._parallel_connect = parallel_connect
+        self._parallel_search = parallel_search
+        self._keep_order = False  # Хосты уже упорядочены (сессия параллельного поиска)
+        self._page_size = page_size
+        self._range_step = range_step
+        self._lazy = lazy
+        self._columnar = columnar
 
         self._login = login
         self._password = password
@@ -86,53 +174,410 @@ class DSHook:
         if log_level:
             self._logger.setLevel(log_level)
 
-    def __enter__(self):
-        """Автоматическое открытие сессии"""
-
-        connect_line = None
+    def _bind(self, connect_line: str):
+        """
+        Открытие новой сессии с хостом
 
-        # Поиск доступного хоста
-        for host in self._host:
+        Args:
+            connect_line: Строка подключения
+        """
+        # Параметры установки соединения с СК
+        ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_ALLOW)
+        connect = ldap.initialize(connect_line)
+
+        connect.set_option(ldap.OPT_REFERRALS, 0)
+        connect.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
+        connect.set_option(ldap.OPT_DEBUG_LEVEL, 255)
+        connect.set_option(ldap.OPT_NETWORK_TIMEOUT, self._connect_timeout)
+        connect.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
+
+        self._logger.info(f"Run LDAP Connect: {connect_line}, login: {self._login}")
+
+        if self._password:  # Открытие сессии с DS по паролю
+            connect.simple_bind_s(self._login, self._password)
+        elif self._keytab:
+            # Открытие сессии с DS по Keytab. Билет берётся из кэша менеджера билетов,
+            # kinit запускается, только если действующего билета ещё нет
             try:
-                # Формирование строки подключения
-                connect_line = f"{_PREFIX_LDAP[self._port]}://{host}:{self._port}"
+                with ticket_manager.use(self._login, self._keytab):
+                    connect.sasl_interactive_bind_s("", ldap.sasl.gssapi())
+            except ldap.LDAPError as e:
+                if not is_credentials_error(e):
+                    raise
+                # Билет истёк раньше ожидаемого или кэш удалён: билет запрашивается заново
+                self._logger.warning(f"Kerberos ticket rejected, run kinit again: {self._login}: {e}")
+                ticket_manager.invalidate(self._login, self._keytab)
+                with ticket_manager.use(self._login, self._keytab):
+                    connect.sasl_interactive_bind_s("", ldap.sasl.gssapi())
+        else:
+            connect.sasl_interactive_bind_s("", ldap.sasl.gssapi())  # Открытие сессии с DS по билетам текущей сессии
 
-                # Параметры установки соединения с СК
-                ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_ALLOW)
-                self._connect = ldap.initialize(connect_line)
+        return connect
 
-                self._connect.set_option(ldap.OPT_REFERRALS, 0)
-                self._connect.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
-                self._connect.set_option(ldap.OPT_DEBUG_LEVEL, 255)
-                self._connect.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
+    def _open_host(self, host: str) -> tuple:
+        """
+        Открытие сессии с хостом (или получение сессии из пула) с учётом в реестре доступности хостов.
+        Возвращает (соединение, сессия пула или None)
 
-                self._logger.info(f"Run LDAP Connect: {connect_line}, login: {self._login}")
+        Args:
+            host: Адрес контроллера домена
+        """
+        # Формирование строки подключения
+        connect_line = f"{_PREFIX_LDAP[self._port]}://{host}:{self._port}"
+
+        start = time.monotonic()
+        try:
+            if self._pool:
+                # Сессия берётся из пула, новая открывается, только если свободной сессии нет
+                key = self._pool.key(host, self._port, self._login, self._password or self._keytab)
+                pooled = self._pool.checkout(key, lambda: self._bind(connect_line))
+                connect = pooled.connect
+            else:
+                pooled, connect = None, self._bind(connect_line)
+        except (ldap.SERVER_DOWN, ldap.TIMEOUT, ldap.CONNECT_ERROR) as e:
+            health.record_failure(host)
+            raise ldap.SERVER_DOWN(f"Host {connect_line}: {e}")
+
+        health.record_success(host, time.monotonic() - start)
+        return connect, pooled
+
+    def _release(self, connect, pooled: PooledConnection | None) -> None:
+        """Закрытие лишней сессии (полученной при параллельном подключении)"""
+        if pooled:
+            self._pool.checkin(pooled)
+        else:
+            connect.unbind_s()
 
-                # Запрос выпуска билетов на основе Keytab, если ожидается использование keytab
-                if self._keytab:
-                    kinit_keytab(login=self._login, keytab=self._keytab)
+    def _race(self, hosts: list[str]) -> tuple:
+        """
+        Параллельное подключение к нескольким хостам. Используется первая открытая сессия, остальные закрываются
+        (или возвращаются в пул). Если хост недоступен, вместо него подключается следующий по списку.
+        Возвращает (хост, соединение, сессия пула или None)
 
-                if self._password:  # Открытие сессии с DS по паролю
-                    self._connect.simple_bind_s(self._login, self._password)
-                else:
-                    self._connect.sasl_interactive_bind_s("", ldap.sasl.gssapi())  # Открытие сессии с DS по Keytab
+        Args:
+            hosts: Упорядоченный список хостов
+        """
+        executor = ThreadPoolExecutor(max_workers=self._parallel_connect)
+        queue = iter(hosts)
+        pending = {executor.submit(self._open_host, host): host for host in islice(queue, self._parallel_connect)}
+        winner = None
+        error = None
+
+        try:
+            while pending and winner is None:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except ldap.SERVER_DOWN as e:
+                        self._logger.warning(str(e))
+                        # Вместо недоступного хоста подключается следующий
+                        next_host = next(queue, None)
+                        if next_host is not None:
+                            pending[executor.submit(self._open_host, next_host)] = next_host
+                        continue
+                    except Exception as e:  # Ошибка не связана с доступностью хоста (например, учётные данные)
+                        error = error or e
+                        continue
+
+                    if winner is None:
+                        winner = (host, *result)
+                    else:
+                        self._release(*result)
+        finally:
+            # Сессии, которые будут открыты позже, закрываются сразу после открытия
+            for future in pending:
+                future.add_done_callback(lambda f: f.exception() is None and self._release(*f.result()))
+            executor.shutdown(wait=False)
+
+        if winner is None:
+            if error:
+                raise error
+            raise TimeoutError(f"Can't contact LDAP servers")
+        return winner
+
+    def __enter__(self):
+        """Автоматическое открытие сессии"""
 
-                break
-            except ldap.SERVER_DOWN as e:
-                self._logger.warning(f"Host {connect_line}: {e}")
+        # Хосты упорядочиваются по доступности и времени подключения (см. app.ds.ds_health)
+        hosts = self._host if self._keep_order else health.order(self._host)
 
+        if self._parallel_connect > 1 and len(hosts) > 1:
+            self._connected_host, self._connect, self._pooled = self._race(hosts)
         else:
-            raise TimeoutError(f"Can't contact LDAP servers")
+            # Поиск доступного хоста
+            for host in hosts:
+                try:
+                    self._connect, self._pooled = self._open_host(host)
+                    self._connected_host = host
+                    break
+                except ldap.SERVER_DOWN as e:
+                    self._logger.warning(str(e))
+
+            else:
+                raise TimeoutError(f"Can't contact LDAP servers")
 
-        # Если область каталога не определена, производится запрос для установки области работы
-        self.base = self.base if self.base else search_root_dse(connect=self._connect, _logger=self._logger)
+        # Если область каталога не определена, она берётся из rootDSE (кэшируется для каждого хоста)
+        if not self.base:
+            self.base = self.capabilities.base
         return self
 
+    @property
+    def capabilities(self) -> DSCapabilities:
+        """Возможности контроллера домена текущей сессии (rootDSE и ограничения политики запросов)"""
+        if self._capabilities is None:
+            self._capabilities = fetch_capabilities(connect=self._connect, host=self._connected_host,
+                                                    port=self._port, _logger=self._logger)
+        return self._capabilities
+
+    @property
+    def page_size(self) -> int:
+        """Размер страницы поиска: указанный при создании или MaxPageSize контроллера домена текущей сессии"""
+        if self._page_size is None:
+            self._page_size = self.capabilities.limit("MaxPageSize") or DEFAULT_PAGE_SIZE
+        return self._page_size
+
+    @property
+    def range_step(self) -> int | None:
+        """Число значений атрибута в одном дозапросе: указанное при создании или MaxValRange контроллера домена"""
+        if self._range_step is None:
+            self._range_step = self.capabilities.limit("MaxValRange")
+        return self._range_step
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Автоматическое закрытие сессии"""
-        self._connect.unbind_s()
+        """Автоматическое закрытие сессии. Сессия из пула возвращается в пул"""
+        if self._pooled:
+            # Сессия закрывается, если соединение разорвано или операция была прервана
+            discard = exc_val is not None and (not isinstance(exc_val, Exception) or isinstance(exc_val, _BROKEN))
+            self._pool.checkin(self._pooled, discard=discard)
+            self._pooled = None
+        else:
+            self._connect.unbind_s()
         return False
 
+    def _sibling(self, index: int, cancel_token: CancelToken) -> "DSHook":
+        """
+        Дополнительная сессия с теми же параметрами для параллельного поиска. Сессии распределяются по хостам
+
+        Args:
+            index: Номер сессии
+            cancel_token: Токен отмены параллельного поиска
+        """
+        sibling = DSHook(host=health.spread(self._host, index), login=self._login, password=self._password,
+                         keytab=self._keytab, port=self._port, base=self.base, dry_run=self.dry_run,
+                         log_level=self._logger.level, page_decoder=self._page_decoder, cancel_token=cancel_token,
+                         pool=self._pool, connect_timeout=self._connect_timeout, page_size=self._page_size,
+                         range_step=self._range_step, lazy=self._lazy, columnar=self._columnar)
+        sibling._keep_order = True
+        return sibling
+
+    def _partitioned(self, ldap_filter: str | None, search_scope: DS_TYPE_SCOPE,
+                     result_set_size: int | None) -> bool:
+        """Поиск исполняется параллельно в нескольких сессиях"""
+        return self._parallel_search > 1 and bool(ldap_filter) and search_scope == "subtree" and not result_set_size
+
+    def _session(self) -> BlockingSession:
+        """Сессия, в которой общие корутины поиска исполняются в текущем потоке (см. app.ds.func_ds_get)"""
+        return BlockingSession(self._connect, self._logger, self._cancel_token)
+
+    def _pages(self, session, ldap_filter: str, properties: list, type_object: str = 'object',
+               search_scope: DS_TYPE_SCOPE = "subtree", result_set_size: int | None = None,
+               decoder: Callable | None = None, search_base: str | None = None, serverctrls: list | None = None,
+               lazy: bool | None = None) -> AsyncIterator[list[DSDict] | DSResultSet]:
+        """
+        Постраничный поиск с параметрами хука (область поиска, размер страницы, lazy, columnar).
+        Общая корутина DSHook и AsyncDSHook: запросы исполняет session. Явно указанный lazy (внутренние поиски)
+        отменяет параметры хука
+        """
+        return paged_search(session=session, _logger=self._logger, ldap_filter=ldap_filter,
+                            search_base=search_base or self.base, properties=properties, type_object=type_object,
+                            search_scope=search_scope, result_set_size=result_set_size, decoder=decoder,
+                            page_size=self.page_size, range_step=self.range_step, serverctrls=serverctrls,
+                            lazy=self._lazy if lazy is None else lazy,
+                            columnar=self._columnar if lazy is None else False)
+
+    async def _search(self, session, ldap_filter: str, properties: list | None, type_object: str = 'object',
+                      search_scope: DS_TYPE_SCOPE = "subtree", only_one: bool = False,
+                      result_set_size: int | None = None, search_base: str | None = None,
+                      serverctrls: list | None = None, lazy: bool | None = None) -> list[DSDict] | DSResultSet:
+        """Поиск с получением всех страниц (см. _pages)"""
+        return await search_all(session=session, _logger=self._logger, ldap_filter=ldap_filter,
+                                search_base=search_base or self.base, properties=properties,
+                                type_object=type_object, search_scope=search_scope, only_one=only_one,
+                                result_set_size=result_set_size, page_size=self.page_size,
+                                range_step=self.range_step, serverctrls=serverctrls,
+                                lazy=self._lazy if lazy is None else lazy,
+                                columnar=self._columnar if lazy is None else False)
+
+    async def _plan_partitions(self, session) -> list[tuple[str, str]]:
+        """Части поиска по поддереву области каталога (см. app.ds.func_ds_partition)"""
+        children = []
+        async for page in self._pages(session, ldap_filter="(objectClass=*)", properties=list(CHILD_PROPERTIES),
+                                      search_scope="onelevel", decoder=raw_page, lazy=False):
+            children.extend(page)
+
+        partitions = plan_partitions(self.base, children)
+        self._logger.info(f"Parallel search: search_base: {self.base}, partitions: {len(partitions)}, "
+                          f"sessions: {min(self._parallel_search, len(partitions))}")
+        return partitions
+
+    async def _partition_pages(self, session, partitions: PartitionQueue, ldap_filter: str, properties: list,
+                               type_object: str, decoder: Callable | None) -> AsyncIterator[list[DSDict]]:
+        """Исполнение частей поиска в сессии параллельного поиска, пока части не закончатся"""
+        while (partition := partitions.get()) is not None:
+            search_base, search_scope = partition
+            # Список атрибутов дополняется при поиске, поэтому для каждой части передаётся копия.
+            # Если перебор прерван, поиск части закрывается сразу (очередь страниц на сервере)
+            async with aclosing(self._pages(session, ldap_filter=ldap_filter, properties=list(properties),
+                                            type_object=type_object, search_scope=search_scope,
+                                            search_base=search_base, decoder=decoder)) as pages:
+                async for page in pages:
+                    yield page
+
+    def _partition_worker(self, index: int, partitions: PartitionQueue, pages: queue.Queue,
+                          cancel_token: CancelToken, decoder: Callable | None, ldap_filter: str, properties: list,
+                          type_object: str) -> None:
+        """Исполнение частей поиска в дополнительной сессии. Страницы и ошибка передаются в очередь pages"""
+
+        def put(item) -> None:
+            # Если перебор страниц прекращён, поток не блокируется на заполненной очереди
+            while not cancel_token.cancelled:
+                try:
+                    pages.put(item, timeout=CANCEL_POLL)
+                    return
+                except queue.Full:
+                    pass
+
+        try:
+            with self._sibling(index, cancel_token) as ds:
+                for page in iter_blocking(ds._partition_pages(ds._session(), partitions, ldap_filter=ldap_filter,
+                                                              properties=properties, type_object=type_object,
+                                                              decoder=decoder)):
+                    put(page)
+        except BaseException as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    def _iter_partitioned(self, ldap_filter: str, properties: list, type_object: str,
+                          decoder: Callable | None = None) -> Iterator[list[DSDict]]:
+        """
+        Параллельный поиск по поддереву области каталога. Части поиска исполняются в parallel_search
+        дополнительных сессиях, страницы возвращаются по мере получения (порядок объектов не сохраняется)
+        """
+        partitions = run_blocking(self._plan_partitions(self._session()))
+        work = PartitionQueue(partitions)
+        workers = min(self._parallel_search, len(partitions))
+
+        # Очередь страниц ограничена, чтобы сессии не опережали отправку страниц клиенту
+        pages = queue.Queue(maxsize=workers * 2)
+        cancel_token = CancelToken()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ds_partition")
+        for index in range(workers):
+            executor.submit(contextvars.copy_context().run, self._partition_worker, index, work, pages,
+                            cancel_token, decoder, ldap_filter, properties, type_object)
+
+        running = workers
+        try:
+            while running:
+                try:
+                    item = pages.get(timeout=CANCEL_POLL)
+                except queue.Empty:
+                    if self._cancel_token:
+                        self._cancel_token.raise_if_cancelled()
+                    continue
+
+                if item is _DONE:
+                    running -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Остальные сессии прерывают поиск и закрываются
+            cancel_token.cancel()
+            executor.shutdown(wait=False)
+
+    async def _blocking_partitioned(self, ldap_filter: str, properties: list, type_object: str,
+                                    decoder: Callable | None = None) -> AsyncIterator[list[DSDict]]:
+        """Параллельный поиск в потоках (_iter_partitioned) для общих корутин _get_object и _iter_object"""
+        for page in self._iter_partitioned(ldap_filter=ldap_filter, properties=properties, type_object=type_object,
+                                           decoder=decoder):
+            yield page
+
+    async def _get_object(self, session, partitioned: Callable, identity: str | dict | DSDict = None,
+                          ldap_filter: str = None, properties: str | list | tuple = None,
+                          search_scope: DS_TYPE_SCOPE = "subtree", type_object: DS_TYPE_OBJECT = "object",
+                          result_set_size: int | None = None) -> list[DSDict] | DSResultSet:
+        """
+        Общий порядок get_object для DSHook и AsyncDSHook: запросы исполняет session, а параллельный поиск -
+        partitioned(ldap_filter, properties, type_object, decoder) (потоки в DSHook, задачи asyncio в AsyncDSHook)
+        """
+        properties = _gen_properties(properties, type_object=type_object)
+
+        if all([identity, ldap_filter]):
+            raise RuntimeError("You can only use one search filter")
+        elif identity:
+            return await self._search(session, ldap_filter=gen_filter_to_id(identity, type_object=type_object),
+                                      properties=properties, type_object=type_object, search_scope=search_scope,
+                                      only_one=True, result_set_size=result_set_size)
+        elif self._partitioned(ldap_filter, search_scope, result_set_size):
+            result = DSResultSet() if self._columnar else []
+            async for page in partitioned(ldap_filter=ldap_filter, properties=properties, type_object=type_object):
+                result.extend(page)
+            return result
+        elif ldap_filter:
+            return await self._search(session, ldap_filter=ldap_filter, properties=properties,
+                                      type_object=type_object, search_scope=search_scope,
+                                      result_set_size=result_set_size)
+        else:
+            raise RuntimeError("You must use one of the filters")
+
+    async def _iter_object(self, session, partitioned: Callable, identity: str | dict | DSDict = None,
+                           ldap_filter: str = None, properties: str | list | tuple = None,
+                           search_scope: DS_TYPE_SCOPE = "subtree", type_object: DS_TYPE_OBJECT = "object",
+                           result_set_size: int | None = None) -> AsyncIterator[list[DSDict]]:
+        """Общий порядок iter_object для DSHook и AsyncDSHook (аргументы совпадают с _get_object)"""
+        # Поиск одного объекта не разбивается на страницы
+        if identity or not ldap_filter:
+            yield await self._get_object(session, partitioned, identity=identity, ldap_filter=ldap_filter,
+                                         properties=properties, search_scope=search_scope, type_object=type_object,
+                                         result_set_size=result_set_size)
+            return
+
+        properties = _gen_properties(properties, type_object=type_object)
+        if self._partitioned(ldap_filter, search_scope, result_set_size):
+            pages = partitioned(ldap_filter=ldap_filter, properties=properties, type_object=type_object,
+                                decoder=self._page_decoder)
+        else:
+            pages = self._pages(session, ldap_filter=ldap_filter, properties=properties, type_object=type_object,
+                                search_scope=search_scope, result_set_size=result_set_size,
+                                decoder=self._page_decoder)
+        # Если перебор прерван, поиск закрывается сразу (очередь страниц на сервере)
+        async with aclosing(pages):
+            async for page in pages:
+                yield page
+
+    async def _get_group_member(self, session, identity: str | dict | DSDict) -> list[DSDict] | DSResultSet:
+        """Общий порядок get_group_member для DSHook и AsyncDSHook: запросы исполняет session"""
+        if not (isinstance(identity, DSDict) and identity.get('objectClass') == 'group'
+                and identity.get('distinguishedName')):
+            identity = (await self._search(session, ldap_filter=gen_filter_to_id(identity, type_object='group'),
+                                           properties=None, type_object='group', only_one=True, lazy=True))[0]
+
+        group_dn = identity['distinguishedName']
+        members = await read_members(session, group_dn)
+        strategy = member_strategy(members, supports_asq=self.capabilities.supports(ASQ_OID))
+        self._logger.info(f"Get group member: {group_dn}, strategy: {strategy}")
+        if strategy == "empty":
+            return DSResultSet() if self._columnar else []
+
+        return members_in_base(await self._search(session, properties=list(DataDSProperties['MEMBER'].value),
+                                                  type_object='member',
+                                                  **member_search(strategy, group_dn=group_dn, base=self.base,
+                                                                  members=members)), self.base)
+
     def get_object(
             self, identity: str | dict | DSDict = None, ldap_filter: str = None,
             properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
@@ -153,51 +598,10 @@ class DSHook:
             Список объектов из DS
         """
 
-        # Если передан список атрибутов, он добавляется с учётом стандартных атрибутов для типа объекта
-        if properties:
-            if isinstance(properties, str):
-                properties = [properties]
-
-            if '*' in properties:
-                if len(properties) != 1:
-                    raise RuntimeError("При запросе всех атрибутов может быть только один знак *")
-            else:
-                properties = list(set([i.casefold() for i in properties]))
-                properties += [i.casefold() for i in DataDSProperties[type_object.upper()].value
-                               if i.casefold() not in properties]
-        # Запрашиваются только стандартные атрибуты
-        else:
-            properties = list(set([i.casefold() for i in DataDSProperties[type_object.upper()].value]))
-
-        if all([identity, ldap_filter]):
-            raise RuntimeError("You can only use one search filter")
-        elif identity:
-            result = search_object(
-                connect=self._connect,
-                _logger=self._logger,
-                ldap_filter=gen_filter_to_id(identity, type_object=type_object),
-                search_base=self.base,
-                search_scope=search_scope,
-                properties=properties,
-                type_object=type_object,
-                only_one=True,
-                result_set_size=result_set_size
-            )
-        elif ldap_filter:
-            result = search_object(
-                connect=self._connect,
-                _logger=self._logger,
-                ldap_filter=ldap_filter,
-                search_base=self.base,
-                search_scope=search_scope,
-                properties=properties,
-                type_object=type_object,
-                result_set_size=result_set_size
-            )
-        else:
-            raise RuntimeError("You must use one of the filters")
-
-        return result
+        return run_blocking(self._get_object(self._session(), self._blocking_partitioned, identity=identity,
+                                             ldap_filter=ldap_filter, properties=properties,
+                                             search_scope=search_scope, type_object=type_object,
+                                             result_set_size=result_set_size))
 
     def get_user(
             self, identity: str | dict | DSDict = None, ldap_filter: str = None,
@@ -283,10 +687,95 @@ class DSHook:
         return self.get_object(identity=identity, ldap_filter=ldap_filter, properties=properties,
                                search_scope=search_scope, type_object="contact", result_set_size=result_set_size)
 
+    def iter_object(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            type_object: DS_TYPE_OBJECT = "object", result_set_size: int | None = None
+    ) -> Iterator[list[DSDict]]:
+        """
+        Функция постраничного запроса любого объекта из каталога. Страница возвращается сразу после получения из DS,
+        поэтому объём занятой памяти зависит от размера страницы, а не от числа найденных объектов.
+        Аргументы совпадают с get_object
+
+        Args:
+            identity: Аргумент для поиска только одного объекта в каталоге (distinguishedName, objectGUID, objectSid, sAMAccountName (для user, group или computer) или словарь объекта DS (DSDict)). Не совместим с ldap_filter. Возвращает ошибку, если не будет получен один объект
+            ldap_filter: Аргумент для поиска по LDAP-фильтру. Не совместим с identity
+            properties: Запрос дополнительных атрибутов. '*' возвращает все заполненные атрибуты
+            search_scope: Глубина поиска
+            type_object: К фильтру поиска добавляется фильтр типа объекта  ("object", "user", "group", "computer" или "contact") (по умолчанию)
+            result_set_size: Ограничение на число объектов, которые должно быть возвращено (Если None ограничений нет)
+
+        Returns:
+            Генератор страниц (списков объектов из DS)
+        """
+
+        yield from iter_blocking(self._iter_object(self._session(), self._blocking_partitioned, identity=identity,
+                                                   ldap_filter=ldap_filter, properties=properties,
+                                                   search_scope=search_scope, type_object=type_object,
+                                                   result_set_size=result_set_size))
+
+    def iter_user(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            result_set_size: int | None = None
+    ) -> Iterator[list[DSDict]]:
+        """
+        Функция постраничного запроса пользователей из каталога. Аргументы совпадают с get_user
+
+        Returns:
+            Генератор страниц (списков объектов из DS)
+        """
+        return self.iter_object(identity=identity, ldap_filter=ldap_filter, properties=properties,
+                                search_scope=search_scope, type_object="user", result_set_size=result_set_size)
+
+    def iter_group(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            result_set_size: int | None = None
+    ) -> Iterator[list[DSDict]]:
+        """
+        Функция постраничного запроса групп из каталога. Аргументы совпадают с get_group
+
+        Returns:
+            Генератор страниц (списков объектов из DS)
+        """
+        return self.iter_object(identity=identity, ldap_filter=ldap_filter, properties=properties,
+                                search_scope=search_scope, type_object="group", result_set_size=result_set_size)
+
+    def iter_computer(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            result_set_size: int | None = None
+    ) -> Iterator[list[DSDict]]:
+        """
+        Функция постраничного запроса компьютеров из каталога. Аргументы совпадают с get_computer
+
+        Returns:
+            Генератор страниц (списков объектов из DS)
+        """
+        return self.iter_object(identity=identity, ldap_filter=ldap_filter, properties=properties,
+                                search_scope=search_scope, type_object="computer", result_set_size=result_set_size)
+
+    def iter_contact(
+            self, identity: str | dict | DSDict = None, ldap_filter: str = None,
+            properties: str | list | tuple = None, search_scope: DS_TYPE_SCOPE = "subtree",
+            result_set_size: int | None = None
+    ) -> Iterator[list[DSDict]]:
+        """
+        Функция постраничного запроса контактов из каталога. Аргументы совпадают с get_contact
+
+        Returns:
+            Генератор страниц (списков объектов из DS)
+        """
+        return self.iter_object(identity=identity, ldap_filter=ldap_filter, properties=properties,
+                                search_scope=search_scope, type_object="contact", result_set_size=result_set_size)
+
     def get_group_member(self, identity: str | dict | DSDict) -> list[DSDict]:
         """
         Функция получения всех членов группы, с дополнительными атрибутами.
         Если передан DSDict группы, поиск группы не будет производиться.
+        Способ поиска (ASQ, по distinguishedName или по memberOf) выбирается по размеру группы и возможностям
+        контроллера домена (см. app.ds.func_ds_member)
 
         Args:
             identity: Аргумент принимающий уникальные атрибуты группы для идентификации (distinguishedName, objectGUID, objectSid, sAMAccountName или словарь объекта DS (DSDict)).
@@ -295,29 +784,7 @@ class DSHook:
             Список объектов из DS
         """
 
-        if (isinstance(identity, DSDict) and identity.get('objectClass') == 'group' and identity.get(
-                'distinguishedName')):
-            pass
-        else:
-            identity = search_object(
-                connect=self._connect,
-                _logger=self._logger,
-                ldap_filter=gen_filter_to_id(identity, type_object='group'),
-                search_base=self.base,
-                properties=None,
-                type_object='group',
-                only_one=True
-            )[0]
-
-        return search_object(
-            connect=self._connect,
-            _logger=self._logger,
-            ldap_filter=f"(memberOf={identity['distinguishedName']})",
-            search_base=self.base,
-            properties=DataDSProperties['MEMBER'].value,
-            type_object='member',
-            only_one=False
-        )
+        return run_blocking(self._get_group_member(self._session(), identity))
 
     def set_object(self, identity: str | dict | DSDict,
                    remove: dict[str, list | bool | str] = None, add: dict[str, list | bool | str] = None,
@@ -545,11 +1012,13 @@ class DSHook:
         result = search_object(
             connect=self._connect,
             _logger=self._logger,
+            cancel_token=self._cancel_token,
             ldap_filter=gen_filter_to_id(identity, type_object='object'),
             search_base=self.base,
             properties=['distinguishedName'],
             type_object='object',
             only_one=True,
+            lazy=True,
         )[0]
 
         self._logger.info(f"Move object: DN: {result['distinguishedName']}, new path: {target_path}")
@@ -558,6 +1027,8 @@ class DSHook:
             # Сохраняется оригинальный CN из строки distinguishedName
             self._connect.rename_s(result['distinguishedName'],
                                    ldap.dn.explode_dn(result['distinguishedName'])[0], target_path)
+            notify_change(result['distinguishedName'],
+                          f"{ldap.dn.explode_dn(result['distinguishedName'])[0]},{target_path}")
         else:
             self._logger.warning("Enabled dry run")
 
@@ -572,11 +1043,13 @@ class DSHook:
         result = search_object(
             connect=self._connect,
             _logger=self._logger,
+            cancel_token=self._cancel_token,
             ldap_filter=gen_filter_to_id(identity, type_object='object'),
             search_base=self.base,
             properties=['cn', 'name', 'distinguishedName'],
             type_object='object',
             only_one=True,
+            lazy=True,
         )[0]
 
         self._logger.info(f"Rename object: DN: {result['distinguishedName']}, new name: {new_name}, "
@@ -584,6 +1057,8 @@ class DSHook:
 
         if not self.dry_run:
             self._connect.rename_s(result['distinguishedName'], f"CN={new_name}")
+            notify_change(result['distinguishedName'],
+                          ','.join([f"CN={new_name}"] + ldap.dn.explode_dn(result['distinguishedName'])[1:]))
         else:
             self._logger.warning("Enabled dry run")
 
@@ -685,17 +1160,20 @@ class DSHook:
         result = search_object(
             connect=self._connect,
             _logger=self._logger,
+            cancel_token=self._cancel_token,
             ldap_filter=gen_filter_to_id(identity, type_object=type_object),
             search_base=self.base,
             properties=['distinguishedName'],
             type_object=type_object,
             only_one=True,
+            lazy=True,
         )[0]
 
         self._logger.info(f"Remove object: DN: {result['distinguishedName']}")
 
         if not self.dry_run:
             self._connect.delete_s(result['distinguishedName'])
+            notify_change(result['distinguishedName'])
         else:
             self._logger.warning("Enabled dry run")
 
@@ -0,0 +1,266 @@
+"""
+Менеджер билетов Kerberos для подключения к DS по Keytab.
+
+Для каждой пары (принципал, Keytab) поддерживается отдельный файловый кэш билетов (KRB5CCNAME). Билет запрашивается
+через kinit только при первом использовании, а затем обновляется в фоновом потоке до истечения срока действия,
+поэтому при открытии сессии подпроцесс не запускается. Новый билет записывается во временный кэш, который
+атомарно заменяет рабочий, поэтому сессии не читают частично записанный кэш. Срок обновления считается от
+фактического времени окончания действия билета, записанного в кэше (KDC может ограничить запрошенное время жизни).
+
+Библиотека GSSAPI берёт кэш из переменной окружения KRB5CCNAME, общей для процесса. Поэтому переменная назначается
+только на время bind (use): bind с одним кэшем выполняются одновременно, bind с другим кэшем ожидает их завершения
+"""
+import os
+import time
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+# Фрагменты текста ошибки bind, при которых билет запрашивается заново (билет истёк или кэш удалён)
+CREDENTIALS_ERRORS = ("expired", "credentials cache", "no kerberos credentials", "no credentials")
+
+
+def is_credentials_error(error: Exception) -> bool:
+    """Ошибка bind по GSSAPI вызвана истёкшим или отсутствующим билетом"""
+    text = str(error).lower()
+    return any(marker in text for marker in CREDENTIALS_ERRORS)
+
+
+def ticket_end(path: str) -> float | None:
+    """
+    Время окончания действия билета на получение билетов (krbtgt) из файлового кэша (Unix time).
+    Поддерживаются кэши версий 3 и 4 (MIT Kerberos, Heimdal). None - кэш не удалось разобрать
+
+    Args:
+        path: Путь до файла кэша
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+
+        version, offset = struct.unpack_from(">H", data, 0)[0], 2
+        if version not in (0x0503, 0x0504):
+            return None
+        if version == 0x0504:
+            offset += 2 + struct.unpack_from(">H", data, offset)[0]
+
+        def octets() -> bytes:
+            nonlocal offset
+            length = struct.unpack_from(">I", data, offset)[0]
+            offset += 4 + length
+            return data[offset - length:offset]
+
+        def principal() -> list[bytes]:
+            nonlocal offset
+            count = struct.unpack_from(">I", data, offset + 4)[0]
+            offset += 8
+            return [octets() for _ in range(count + 1)]  # Область, затем компоненты
+
+        principal()  # Принципал по умолчанию
+        while offset < len(data):
+            principal()
+            server = principal()
+            offset += 2 if version == 0x0504 else 4  # Тип ключа (в версии 3 указан дважды)
+            octets()
+            _, _, end, _ = struct.unpack_from(">4I", data, offset)
+            offset += 16 + 1 + 4  # Время, is_skey, флаги
+            for _ in range(2):  # Адреса и authdata: тип и значение
+                count = struct.unpack_from(">I", data, offset)[0]
+                offset += 4
+                for _ in range(count):
+                    offset += 2
+                    octets()
+            octets()
+            octets()
+
+            # Служебные записи кэша (X-CACHECONF:) пропускаются
+            if len(server) > 1 and server[1] == b"krbtgt" and not server[0].startswith(b"X-CACHECONF:"):
+                return float(end)
+    except (OSError, struct.error):
+        return None
+
+    return None
+
+
+class _CcacheEnvironment:
+    """
+    Назначение KRB5CCNAME на время bind. Bind с одинаковым кэшем выполняются одновременно,
+    bind с другим кэшем ожидает, пока переменная используется
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._ccache = None  # Назначенный кэш
+        self._users = 0  # Число bind, использующих назначенный кэш
+        self._previous = None  # Значение переменной до назначения
+
+    @contextmanager
+    def use(self, ccache: str):
+        with self._cond:
+            while self._users and self._ccache != ccache:
+                self._cond.wait()
+            if not self._users:
+                self._previous = os.environ.get("KRB5CCNAME")
+                os.environ["KRB5CCNAME"] = ccache
+                self._ccache = ccache
+            self._users += 1
+
+        try:
+            yield ccache
+        finally:
+            with self._cond:
+                self._users -= 1
+                if not self._users:
+                    if self._previous is None:
+                        os.environ.pop("KRB5CCNAME", None)
+                    else:
+                        os.environ["KRB5CCNAME"] = self._previous
+                    self._ccache = None
+                    self._cond.notify_all()
+
+
+# Переменная окружения KRB5CCNAME, общая для всех менеджеров билетов
+_ENVIRONMENT = _CcacheEnvironment()
+
+
+class _Ticket:
+    """Кэш билетов одной пары (принципал, Keytab)"""
+
+    def __init__(self, principal: str, keytab: str, path: str):
+        self.principal = principal
+        self.keytab = keytab
+        self.path = path
+        self.renew_at = 0.0  # Время обновления билета (time.monotonic)
+        self.expires = 0.0  # Время окончания действия билета (time.monotonic)
+        self.lock = threading.Lock()
+
+
+class TicketManager:
+    def __init__(self, directory: str | None = None, lifetime: int = 36000, renew_ratio: float = 0.75,
+                 check_interval: float = 60):
+        """
+        Менеджер кэшей билетов Kerberos
+
+        Args:
+            directory: Папка файлов кэша. По умолчанию временная папка системы
+            lifetime: Запрашиваемое время жизни билета в секундах (kinit -l)
+            renew_ratio: Доля времени жизни, после которой билет обновляется
+            check_interval: Интервал проверки билетов фоновым потоком в секундах
+        """
+        self.directory = directory or tempfile.gettempdir()
+        self.lifetime = lifetime
+        self.renew_ratio = renew_ratio
+        self.check_interval = check_interval
+
+        self._tickets: dict[tuple, _Ticket] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def _kinit(self, ticket: _Ticket) -> None:
+        """Запрос билета по Keytab во временный кэш с атомарной заменой рабочего кэша"""
+        tmp_path = f"{ticket.path}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            subprocess.run(
+                ["kinit", "-k", "-t", ticket.keytab, "-l", f"{self.lifetime}s", "-c", f"FILE:{tmp_path}",
+                 ticket.principal],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            os.replace(tmp_path, ticket.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Фактическое время жизни может быть ограничено KDC, поэтому оно читается из кэша.
+        # Если кэш не удалось разобрать, используется запрошенное время жизни
+        now = time.monotonic()
+        end = ticket_end(ticket.path)
+        lifetime = self.lifetime if end is None else max(end - time.time(), 0.0)
+        ticket.renew_at = now + lifetime * self.renew_ratio
+        ticket.expires = now + lifetime
+        _logger.info(f"Kerberos ticket acquired: {ticket.principal}, lifetime: {int(lifetime)}s")
+
+    def ccache(self, principal: str, keytab: str) -> str:
+        """
+        Кэш билетов для принципала. Если действующего билета нет, он запрашивается
+
+        Args:
+            principal: Принципал (userPrincipalName с доменом заглавными буквами)
+            keytab: Путь до Keytab-файла
+        """
+        key = (principal, os.path.abspath(keytab))
+        with self._lock:
+            ticket = self._tickets.get(key)
+            if ticket is None:
+                name = hashlib.sha256(f"{key[0]}\0{key[1]}".encode("utf-8")).hexdigest()[:16]
+                ticket = _Ticket(principal, key[1], os.path.join(self.directory, f"krb5cc_tentacula_{name}"))
+                self._tickets[key] = ticket
+            self._start()
+
+        # Билет запрашивается при открытии сессии, только если он отсутствует или уже истёк
+        if time.monotonic() >= ticket.expires:
+            with ticket.lock:
+                if time.monotonic() >= ticket.expires:
+                    self._kinit(ticket)
+
+        return f"FILE:{ticket.path}"
+
+    def invalidate(self, principal: str, keytab: str) -> None:
+        """
+        Билет принципала запрашивается заново при следующем использовании (например, bind завершился ошибкой
+        истёкшего билета, см. is_credentials_error)
+
+        Args:
+            principal: Принципал
+            keytab: Путь до Keytab-файла
+        """
+        with self._lock:
+            ticket = self._tickets.get((principal, os.path.abspath(keytab)))
+        if ticket is not None:
+            with ticket.lock:
+                ticket.expires = 0.0
+
+    @contextmanager
+    def use(self, principal: str, keytab: str):
+        """
+        Назначение кэша билетов принципала для GSSAPI на время блока (например, sasl_interactive_bind_s)
+
+        Args:
+            principal: Принципал
+            keytab: Путь до Keytab-файла
+        """
+        with _ENVIRONMENT.use(self.ccache(principal, keytab)) as ccache:
+            yield ccache
+
+    def _start(self) -> None:
+        """Запуск фонового обновления билетов. Вызывается под блокировкой"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._renew_loop, name="krb5-renew", daemon=True)
+            self._thread.start()
+
+    def _renew_loop(self) -> None:
+        """Обновление билетов, срок обновления которых наступил. Ошибка обновления повторяется при следующей проверке"""
+        while True:
+            time.sleep(self.check_interval)
+            with self._lock:
+                tickets = list(self._tickets.values())
+
+            for ticket in tickets:
+                if ticket.renew_at and time.monotonic() >= ticket.renew_at:
+                    try:
+                        with ticket.lock:
+                            self._kinit(ticket)
+                    except Exception as e:
+                        _logger.warning(f"Kerberos ticket renew failed: {ticket.principal}: {e}")
+
+
+# Общий менеджер билетов DSHook
+ticket_manager = TicketManager()
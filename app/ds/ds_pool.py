@@ -0,0 +1,244 @@
+"""
+Пул открытых сессий с DS.
+
+Открытие сессии (TLS-рукопожатие и bind) для поиска одного объекта обычно дольше самого
+поиска. Пул сохраняет сессии после выхода из DSHook и повторно выдаёт их запросам с теми же хостом, портом, логином
+и учётными данными (пароль или Keytab хранится только в виде хеша).
+
+- Сессия, которая не использовалась дольше check_interval, перед выдачей проверяется запросом WhoAmI.
+  Если сессия устарела (контроллер домена закрыл соединение) или не ответила за check_timeout, она закрывается
+  и открывается новая;
+- Сессии, которые не использовались дольше idle_timeout или открыты дольше max_lifetime, закрываются;
+- Число сессий к одному контроллеру домена ограничено max_per_host. Если лимит достигнут, закрывается свободная сессия
+  другого пользователя к тому же хосту, иначе запрос ожидает освобождения сессии не дольше wait_timeout.
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable
+from collections import deque
+
+import ldap
+from ldap.extop import ExtendedRequest
+
+# Все созданные пулы, для вывода статистики
+_POOLS: list["DSConnectionPool"] = []
+
+_logger = logging.getLogger(__name__)
+
+# OID расширенной операции WhoAmI (RFC 4532)
+WHOAMI_OID = "1.3.6.1.4.1.4203.1.11.3"
+
+
+class PooledConnection:
+    """Сессия с DS, выданная пулом"""
+
+    def __init__(self, key: tuple, connect):
+        self.key = key
+        self.connect = connect
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+    @property
+    def host(self) -> tuple:
+        return self.key[:2]
+
+
+def _unbind(connect) -> None:
+    """Закрытие сессии без ошибки, если соединение уже разорвано"""
+    try:
+        connect.unbind_s()
+    except Exception as e:
+        _logger.debug(f"Unbind failed: {e}")
+
+
+class DSConnectionPool:
+    def __init__(self, max_per_host: int = 10, idle_timeout: float = 300, max_lifetime: float = 3600,
+                 check_interval: float = 30, wait_timeout: float = 30, check_timeout: float = 5):
+        """
+        Пул сессий с DS. Передаётся в DSHook(pool=...)
+
+        Args:
+            max_per_host: Максимальное число сессий (свободных и занятых) к одному хосту
+            idle_timeout: Время в секундах, после которого свободная сессия закрывается
+            max_lifetime: Максимальное время жизни сессии в секундах
+            check_interval: Время простоя в секундах, после которого сессия проверяется перед выдачей
+            wait_timeout: Время ожидания свободной сессии, если достигнут лимит хоста
+            check_timeout: Время ожидания ответа на проверку сессии в секундах (полуоткрытое соединение
+                не блокирует выдачу сессии на время таймаута TCP)
+        """
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.wait_timeout = wait_timeout
+        self.check_timeout = check_timeout
+
+        self._salt = os.urandom(16)
+        self._idle: dict[tuple, deque[PooledConnection]] = {}
+        self._per_host: dict[tuple, int] = {}
+        self._cond = threading.Condition()
+
+        self._opened = 0
+        self._reused = 0
+        self._discarded = 0
+        self._waits = 0
+
+        _POOLS.append(self)
+
+    def key(self, host: str, port: int, login: str, secret: str | None) -> tuple:
+        """Ключ сессии: хост, порт, логин и хеш учётных данных"""
+        digest = hashlib.blake2b((secret or "").encode("utf-8"), key=self._salt, digest_size=16).hexdigest()
+        return host.casefold(), port, (login or "").casefold(), digest
+
+    def checkout(self, key: tuple, factory: Callable[[], object]) -> PooledConnection:
+        """
+        Получение сессии из пула. Если свободной сессии нет, открывается новая
+
+        Args:
+            key: Ключ сессии (DSConnectionPool.key)
+            factory: Функция открытия новой сессии (возвращает объект соединения ldap после bind)
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            pooled = evicted = None
+            opening = False
+            with self._cond:
+                expired = self._sweep()
+                idle = self._idle.get(key)
+                if idle:
+                    pooled = idle.pop()
+                elif self._per_host.get(key[:2], 0) < self.max_per_host:
+                    self._per_host[key[:2]] = self._per_host.get(key[:2], 0) + 1
+                    opening = True
+                elif not expired:
+                    evicted = self._evict_host(key[:2])
+                    if evicted is None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"Connection limit for {key[0]}:{key[1]} reached")
+                        self._waits += 1
+                        self._cond.wait(remaining)
+                        continue
+                    # Место вытесненной сессии в лимите хоста переходит к новой сессии
+                    opening = True
+
+            # Сессии закрываются после освобождения блокировки (unbind - сетевой вызов)
+            for i in expired:
+                self._close(i)
+            if evicted is not None:
+                _unbind(evicted.connect)
+
+            if opening:
+                return self._open(key, factory)
+            if pooled is None:
+                continue
+            if self._alive(pooled):
+                with self._cond:
+                    self._reused += 1
+                return pooled
+            self._close(pooled)
+
+    def checkin(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """
+        Возврат сессии в пул
+
+        Args:
+            pooled: Сессия, выданная пулом
+            discard: Закрыть сессию (например, после разрыва соединения или прерванного поиска)
+        """
+        pooled.last_used = time.monotonic()
+        if discard or pooled.last_used - pooled.created >= self.max_lifetime:
+            self._close(pooled)
+            return
+
+        with self._cond:
+            self._idle.setdefault(pooled.key, deque()).append(pooled)
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Закрытие всех свободных сессий"""
+        with self._cond:
+            idle = [pooled for connections in self._idle.values() for pooled in connections]
+            self._idle.clear()
+        for pooled in idle:
+            self._close(pooled)
+
+    def _open(self, key: tuple, factory: Callable[[], object]) -> PooledConnection:
+        """Открытие новой сессии. Место в лимите хоста уже занято"""
+        try:
+            pooled = PooledConnection(key, factory())
+        except BaseException:
+            with self._cond:
+                self._per_host[key[:2]] -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opened += 1
+        return pooled
+
+    def _alive(self, pooled: PooledConnection) -> bool:
+        """Проверка сессии, которая давно не использовалась"""
+        if time.monotonic() - pooled.last_used < self.check_interval:
+            return True
+        try:
+            msgid = pooled.connect.extop(ExtendedRequest(WHOAMI_OID, None))
+            pooled.connect.extop_result(msgid, all=1, timeout=self.check_timeout)
+            return True
+        except ldap.LDAPError as e:  # В том числе ldap.TIMEOUT: сессия без ответа считается разорванной
+            _logger.info(f"Stale connection to {pooled.key[0]}: {e}")
+            return False
+
+    def _close(self, pooled: PooledConnection) -> None:
+        """Закрытие сессии с освобождением места в лимите хоста"""
+        _unbind(pooled.connect)
+        with self._cond:
+            self._per_host[pooled.host] -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def _sweep(self) -> list[PooledConnection]:
+        """
+        Извлечение свободных сессий с истёкшим временем простоя или жизни. Вызывается под блокировкой,
+        сессии закрываются после её освобождения (_close)
+        """
+        now = time.monotonic()
+        expired = []
+        for key, idle in self._idle.items():
+            for pooled in [pooled for pooled in idle if now - pooled.last_used >= self.idle_timeout
+                           or now - pooled.created >= self.max_lifetime]:
+                idle.remove(pooled)
+                expired.append(pooled)
+        return expired
+
+    def _evict_host(self, host: tuple) -> PooledConnection | None:
+        """
+        Извлечение самой старой свободной сессии к хосту (другого пользователя) для закрытия. Вызывается под
+        блокировкой, место сессии в лимите хоста не освобождается
+        """
+        candidates = [idle for key, idle in self._idle.items() if key[:2] == host and idle]
+        if not candidates:
+            return None
+        idle = min(candidates, key=lambda i: i[0].last_used)
+        self._discarded += 1
+        return idle.popleft()
+
+    def stats(self) -> dict:
+        """Статистика пула"""
+        with self._cond:
+            idle = sum(len(i) for i in self._idle.values())
+            return {
+                "connections": sum(self._per_host.values()),
+                "idle": idle,
+                "opened": self._opened,
+                "reused": self._reused,
+                "discarded": self._discarded,
+                "waits": self._waits,
+            }
+
+
+def ds_pools_stats() -> list[dict]:
+    """Статистика всех пулов сессий"""
+    return [pool.stats() for pool in _POOLS]
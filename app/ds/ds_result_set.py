@@ -0,0 +1,301 @@
+"""
+Результат поиска в DS, хранящийся по столбцам.
+
+Каждый DSDict хранит собственную таблицу исходных ключей и ключи в нижнем регистре. DSResultSet хранит одну
+таблицу ключей на весь результат и по одному списку значений на атрибут, а для каждого объекта - ссылку на порядок
+ключей, общий для объектов с одинаковым набором атрибутов. Вычисляемые атрибуты (Enabled, FlagsUAC и т.д.)
+вычисляются сразу для всего столбца: функция исполняется один раз на каждое различное значение исходного атрибута.
+
+При переборе и обращении по индексу возвращаются объекты DSDict (набор, порядок и регистр ключей совпадают с
+decode_page), поэтому DSResultSet можно использовать вместо списка объектов. При сериализации ответа
+(app.moduls.response_format) объекты DSDict не создаются
+"""
+from itertools import repeat
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator
+
+from .ds_dict import DSDict, key_table
+
+
+class _Missing:
+    """Значение столбца для объекта, у которого нет атрибута"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __reduce__(self):
+        # При передаче в другой процесс сохраняется единственный экземпляр
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def derive_column(handler: Callable, values: list) -> list:
+    """
+    Вычисляемый атрибут для столбца значений исходного атрибута. Функция исполняется один раз на каждое различное
+    значение, изменяемые результаты (списки, словари) копируются для каждого объекта
+
+    Args:
+        handler: Функция вычисления атрибута (ATTR_EXTEND)
+        values: Значения исходного атрибута
+    """
+    try:
+        derived = {value: handler(value) for value in set(values)}
+    except TypeError:  # Значения, которые не могут быть ключами словаря
+        return [handler(value) for value in values]
+    return [result.copy() if isinstance(result, (list, dict)) else result
+            for result in map(derived.__getitem__, values)]
+
+
+def _getter(columns: tuple[int, ...]) -> Callable:
+    """Функция получения значений столбцов columns из строки значений всех столбцов"""
+    if len(columns) == 1:
+        return lambda row: (row[columns[0]],)
+    return itemgetter(*columns) if columns else lambda row: ()
+
+
+def _arrange(order: list[int]) -> Callable:
+    """
+    Функция перестановки значений, записанных в порядке order (номер объекта для каждого значения),
+    в порядок объектов
+    """
+    position = [0] * len(order)
+    for index, offset in enumerate(order):
+        position[offset] = index
+    return _getter(tuple(position))
+
+
+class DSResultSet:
+    """Список объектов DS, хранящийся по столбцам"""
+    __slots__ = ("_keys", "_index", "_columns", "_shapes", "_shape_cache", "_size")
+
+    def __init__(self, rows: Iterable[dict] | None = None):
+        """
+        Args:
+            rows: Объекты, которые добавляются в результат (DSDict или словари)
+        """
+        self._keys = []  # Исходные названия столбцов (как у первого объекта, у которого есть атрибут)
+        self._index = {}  # Название столбца в нижнем регистре - номер столбца
+        self._columns = []  # Значения столбцов (MISSING, если у объекта нет атрибута)
+        self._shapes = []  # Для каждого объекта: (названия ключей, номера столбцов) в порядке ключей объекта
+        self._shape_cache = {}  # Названия ключей - общий для объектов порядок ключей
+        self._size = 0
+
+        if rows is not None:
+            self.extend(rows)
+
+    def _column(self, key: str) -> int:
+        """Номер столбца (столбец создаётся, если его ещё нет)"""
+        lower_key = key.casefold()
+        index = self._index.get(lower_key)
+        if index is None:
+            index = self._index[lower_key] = len(self._columns)
+            self._keys.append(key)
+            self._columns.append([MISSING] * self._size)
+        return index
+
+    def _shape(self, names: tuple[str, ...]) -> tuple[tuple[str, ...], tuple[int, ...]]:
+        """Порядок ключей объекта, общий для объектов с одинаковым набором атрибутов"""
+        shape = self._shape_cache.get(names)
+        if shape is None:
+            shape = self._shape_cache[names] = (names, tuple(self._column(name) for name in names))
+        return shape
+
+    def _grow(self, count: int) -> int:
+        """Добавление count пустых объектов. Возвращает номер первого из них"""
+        start = self._size
+        self._size += count
+        for column in self._columns:
+            column.extend([MISSING] * count)
+        return start
+
+    def append(self, row: dict) -> None:
+        """Добавление объекта (DSDict или словаря)"""
+        names = tuple(row.keys())
+        values = [row[name] for name in names]
+        index = self._grow(1)
+        shape = self._shape(names)
+        for column, value in zip(shape[1], values):
+            self._columns[column][index] = value
+        self._shapes.append(shape)
+
+    def extend(self, rows: Iterable[dict]) -> None:
+        """Добавление объектов (другого DSResultSet или списка DSDict)"""
+        if not isinstance(rows, DSResultSet):
+            for row in rows:
+                self.append(row)
+            return
+
+        start = self._grow(rows._size)
+        shapes = {}  # Порядок ключей в rows - порядок ключей в результате
+        copied = set()
+        for names, columns in dict.fromkeys(rows._shapes):
+            shape = shapes[(names, columns)] = self._shape(names)
+            for target, column in zip(shape[1], columns):
+                if column not in copied:
+                    copied.add(column)
+                    self._columns[target][start:] = rows._columns[column]
+        self._shapes.extend(shapes[shape] for shape in rows._shapes)
+
+    def add_page(self, objects: list[dict], plans: list) -> None:
+        """
+        Конвертация страницы объектов в исходном виде по столбцам. Объекты с одинаковым планом конвертации
+        конвертируются вместе: атрибут за атрибутом (DecodePlan.columns)
+
+        Args:
+            objects: Атрибуты объектов страницы в исходном виде
+            plans: План конвертации каждого объекта (app.ds.func_ds_get.DecodePlan)
+        """
+        groups = {}  # План конвертации - номера объектов на странице
+        for offset, plan in enumerate(plans):
+            groups.setdefault(id(plan), (plan, []))[1].append(offset)
+
+        start = self._grow(len(objects))
+        if not objects:
+            return
+
+        # Значения столбцов каждой группы (в порядке таблицы ключей плана) записываются подряд, затем объекты
+        # переставляются в порядок страницы одной перестановкой на столбец
+        order = []  # Номера объектов на странице в порядке групп
+        shapes = []
+        columns = {}  # Номер столбца результата - значения объектов в порядке групп
+        for plan, offsets in groups.values():
+            shape = self._shape(tuple(plan.table.values()))
+            filled = len(order)
+            for target, column in zip(shape[1], plan.columns([objects[offset] for offset in offsets])):
+                values = columns.get(target)
+                if values is None:
+                    values = columns[target] = [MISSING] * filled
+                values.extend(column)
+            order.extend(offsets)
+            shapes.extend([shape] * len(offsets))
+            for values in columns.values():
+                if len(values) < len(order):
+                    values.extend([MISSING] * (len(order) - len(values)))
+
+        if len(groups) == 1:
+            for target, values in columns.items():
+                self._columns[target][start:] = values
+            self._shapes.extend(shapes)
+            return
+
+        arrange = _arrange(order)
+        for target, values in columns.items():
+            self._columns[target][start:] = arrange(values)
+        self._shapes.extend(arrange(shapes))
+
+    def take(self, indexes: Iterable[int]) -> "DSResultSet":
+        """Новый результат из объектов с указанными номерами (таблица ключей содержит только их атрибуты)"""
+        indexes = list(indexes)
+        rows = [self._shapes[index] for index in indexes]
+
+        result = DSResultSet()
+        result._size = len(indexes)
+        shapes = {}  # Порядок ключей в исходном результате - порядок ключей в новом
+        copied = set()
+        for names, columns in dict.fromkeys(rows):
+            shape = shapes[(names, columns)] = result._shape(names)
+            for target, column in zip(shape[1], columns):
+                if column not in copied:
+                    copied.add(column)
+                    source = self._columns[column]
+                    result._columns[target] = [source[index] for index in indexes]
+        result._shapes = [shapes[shape] for shape in rows]
+        return result
+
+    def keys(self) -> list[str]:
+        """Названия всех атрибутов результата в порядке их появления"""
+        return list(self._keys)
+
+    def column(self, key: str, default=None) -> list:
+        """
+        Значения атрибута всех объектов без создания объектов
+
+        Args:
+            key: Название атрибута (регистр не учитывается)
+            default: Значение для объектов, у которых нет атрибута
+        """
+        index = self._index.get(key.casefold())
+        if index is None:
+            return [default] * self._size
+        return [default if value is MISSING else value for value in self._columns[index]]
+
+    def _row(self, index: int) -> DSDict:
+        names, columns = self._shapes[index]
+        table = key_table(names)
+        return DSDict._from_table(table, zip(table, [self._columns[column][index] for column in columns]))
+
+    def records(self) -> list[dict]:
+        """Объекты в виде обычных словарей (для сериализации)"""
+        groups = {}  # Порядок ключей - номера объектов с этим порядком
+        for index, shape in enumerate(self._shapes):
+            groups.setdefault(id(shape), (shape, []))[1].append(index)
+
+        # Словари объектов с одинаковым порядком ключей создаются вместе, затем переставляются в порядок объектов
+        order, records = [], []
+        for (names, columns), indexes in groups.values():
+            if len(groups) == 1:
+                values = [self._columns[column] for column in columns]
+            else:
+                pick = _getter(tuple(indexes))
+                values = [pick(self._columns[column]) for column in columns]
+            records.extend(map(dict, map(zip, repeat(names), zip(*values))) if values else
+                           [{} for _ in indexes])
+            order.extend(indexes)
+
+        if len(groups) > 1:
+            return list(_arrange(order)(records))
+        return records
+
+    def columnar_block(self) -> dict:
+        """
+        Блок формата columnar: {"columns": [...], "rows": [[...], ...]} (в том числе для пустого результата).
+        Отсутствующие значения равны null, номера строк без атрибута передаются в missing
+        (см. app.moduls.response_format._columnar_block)
+        """
+        columns, missing = [], []
+        for column in self._columns:
+            if MISSING in column:
+                missing.append([row for row, value in enumerate(column) if value is MISSING])
+                column = [None if value is MISSING else value for value in column]
+            else:
+                missing.append([])
+            columns.append(column)
+
+        rows = list(map(list, zip(*columns))) if columns else [[] for _ in range(self._size)]
+        block = {"columns": list(self._keys), "rows": rows}
+        if any(missing):
+            block["missing"] = missing
+        return block
+
+    def to_list(self) -> list[DSDict]:
+        """Список объектов DSDict"""
+        return [self._row(index) for index in range(self._size)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[DSDict]:
+        for index in range(self._size):
+            yield self._row(index)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.take(range(*item.indices(self._size)))
+        if item < 0:
+            item += self._size
+        if not 0 <= item < self._size:
+            raise IndexError("DSResultSet index out of range")
+        return self._row(item)
+
+    def __eq__(self, other):
+        if isinstance(other, (DSResultSet, list)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_list()!r})"
@@ -1,31 +1,202 @@
 """
-Функция для формирования base-строки. Основное применение, если в строке не найдены
+Функции для формирования base-строки и чтения возможностей контроллера домена (rootDSE).
+
+Данные rootDSE (namingContexts, defaultNamingContext, поддерживаемые элементы управления) и ограничения
+политики запросов (lDAPAdminLimits) кэшируются для каждого хоста на ROOT_DSE_TTL секунд. Поэтому сессия, для которой
+не указана область каталога, не делает отдельный запрос к DS, а остальные компоненты могут выбрать
+элементы управления по уже полученным данным (get_capabilities)
 """
+import time
+import logging
+import threading
+
 import ldap
 
+# Время жизни данных rootDSE в кэше, в секундах
+ROOT_DSE_TTL = 3600.0
 
-def search_root_dse(connect, _logger) -> str:
+# Запрашиваемые атрибуты rootDSE
+ROOT_DSE_PROPERTIES = ["namingContexts", "defaultNamingContext", "configurationNamingContext",
+                       "supportedControl", "supportedLDAPVersion", "dnsHostName"]
+
+# Объект политики запросов по умолчанию относительно configurationNamingContext
+_QUERY_POLICY = "CN=Default Query Policy,CN=Query-Policies,CN=Directory Service,CN=Windows NT,CN=Services"
+
+_CACHE: dict[tuple, "DSCapabilities"] = {}
+_LOCK = threading.Lock()
+
+_logger = logging.getLogger(__name__)
+
+
+class DSCapabilities:
+    """Возможности контроллера домена, полученные из rootDSE"""
+
+    def __init__(self, attributes: dict[str, list[bytes]]):
+        values = {k.casefold(): [v.decode("utf-8") for v in vs] for k, vs in attributes.items()}
+
+        self.naming_contexts: list[str] = values.get("namingcontexts", [])
+        self.default_naming_context: str | None = (values.get("defaultnamingcontext") or [None])[0]
+        self.configuration_naming_context: str | None = (values.get("configurationnamingcontext") or [None])[0]
+        self.supported_controls: set[str] = set(values.get("supportedcontrol", []))
+        self.supported_ldap_versions: list[str] = values.get("supportedldapversion", [])
+        self.dns_host_name: str | None = (values.get("dnshostname") or [None])[0]
+        # Ограничения политики запросов (MaxPageSize, MaxValRange и т.д.). None - ещё не запрашивались
+        self.admin_limits: dict[str, int] | None = None
+        self.fetched = time.monotonic()
+
+    @property
+    def base(self) -> str:
+        """Область каталога: первая доменная область (без DomainDnsZones и ForestDnsZones)"""
+        contexts = [nc for nc in self.naming_contexts
+                    if nc.lower().startswith("dc=")
+                    and 'DomainDnsZones'.lower() not in nc.lower()
+                    and 'ForestDnsZones'.lower() not in nc.lower()]
+        if contexts:
+            return contexts[0]
+        if self.default_naming_context:
+            return self.default_naming_context
+        raise RuntimeError("Naming context not found in rootDSE")
+
+    def supports(self, oid: str) -> bool:
+        """Поддержка элемента управления (OID) контроллером домена"""
+        return oid in self.supported_controls
+
+    def limit(self, name: str, default: int | None = None) -> int | None:
+        """Значение ограничения политики запросов (например, MaxPageSize). Если не получено, возвращается default"""
+        return (self.admin_limits or {}).get(name.casefold(), default)
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.fetched >= ROOT_DSE_TTL
+
+
+def set_root_dse_ttl(ttl: float) -> None:
     """
-    Функция формирования base-строки подключения
+    Назначение времени жизни данных rootDSE в кэше
+
+    Args:
+        ttl: Время в секундах. При 0 данные запрашиваются для каждой сессии
+    """
+    global ROOT_DSE_TTL
+    ROOT_DSE_TTL = ttl
+
+
+def read_root_dse(connect) -> DSCapabilities:
+    """
+    Чтение rootDSE (доступно и без авторизации)
 
     Args:
         connect: Переменная с открытой сессией к СК
+    """
+    res = connect.search_s("", ldap.SCOPE_BASE, "(objectClass=*)", ROOT_DSE_PROPERTIES)
+    return DSCapabilities(res[0][1])
+
+
+def read_admin_limits(connect, capabilities: DSCapabilities) -> dict[str, int]:
+    """
+    Чтение ограничений политики запросов по умолчанию (lDAPAdminLimits). Требуется авторизованная сессия
+
+    Args:
+        connect: Переменная с открытой сессией к СК
+        capabilities: Возможности контроллера домена
+    """
+    if not capabilities.configuration_naming_context:
+        return {}
+
+    res = connect.search_s(f"{_QUERY_POLICY},{capabilities.configuration_naming_context}", ldap.SCOPE_BASE,
+                           "(objectClass=*)", ["lDAPAdminLimits"])
+    limits = {}
+    for value in (res[0][1].get("lDAPAdminLimits", []) if res else []):
+        name, _, number = value.decode("utf-8").partition("=")
+        if number.isdigit():
+            limits[name.casefold()] = int(number)
+    return limits
+
+
+def get_capabilities(host: str, port: int = 636) -> DSCapabilities | None:
+    """
+    Возможности контроллера домена из кэша. Если данных нет или время жизни истекло, возвращается None
+
+    Args:
+        host: Адрес контроллера домена
+        port: Порт подключения
+    """
+    with _LOCK:
+        capabilities = _CACHE.get((host.casefold(), port))
+    if capabilities is None or capabilities.expired():
+        return None
+    return capabilities
+
+
+def fetch_capabilities(connect, host: str, port: int, _logger=_logger) -> DSCapabilities:
+    """
+    Возможности контроллера домена: из кэша, иначе из rootDSE открытой сессии.
+    Ограничения политики запросов запрашиваются один раз для авторизованной сессии
+
+    Args:
+        connect: Переменная с открытой сессией к СК
+        host: Адрес контроллера домена
+        port: Порт подключения
         _logger: Переменная с логированием
     """
-    base = ""
-    search_scope = ldap.SCOPE_BASE
-    ldap_filter = "(objectClass=*)"
-    properties = ["namingContexts"]
+    capabilities = get_capabilities(host, port)
+    if capabilities is None:
+        _logger.debug(f"Get rootDSE: host: {host}, properties: {ROOT_DSE_PROPERTIES}")
+        capabilities = read_root_dse(connect)
+
+    if capabilities.admin_limits is None:
+        try:
+            capabilities.admin_limits = read_admin_limits(connect, capabilities)
+        except ldap.LDAPError as e:
+            _logger.debug(f"Can't read lDAPAdminLimits: {e}")
+            capabilities.admin_limits = {}
+
+    with _LOCK:
+        _CACHE[(host.casefold(), port)] = capabilities
+    return capabilities
+
+
+def warm_capabilities(hosts: list[str], port: int = 636, timeout: float = 5.0) -> None:
+    """
+    Заполнение кэша для списка хостов (например, при старте приложения). rootDSE читается без авторизации,
+    ограничения политики запросов будут получены при первой авторизованной сессии. Ошибки только логируются
+
+    Args:
+        hosts: Адреса контроллеров домена
+        port: Порт подключения
+        timeout: Время ожидания подключения в секундах
+    """
+    for host in hosts:
+        if get_capabilities(host, port):
+            continue
+        try:
+            ldap.set_option(ldap.OPT_X_TLS_REQUIRE_CERT, ldap.OPT_X_TLS_ALLOW)
+            connect = ldap.initialize(f"{'ldaps' if port == 636 else 'ldap'}://{host}:{port}")
+            connect.set_option(ldap.OPT_REFERRALS, 0)
+            connect.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
+            connect.set_option(ldap.OPT_NETWORK_TIMEOUT, timeout)
+            connect.set_option(ldap.OPT_X_TLS_NEWCTX, 0)
+            try:
+                capabilities = read_root_dse(connect)
+            finally:
+                connect.unbind_s()
 
-    _logger.debug(f"Get dn: search_base: {base}, search_scope: {search_scope}, "
-                  f"ldap_filter: {ldap_filter}, properties: {properties}")
+            with _LOCK:
+                _CACHE[(host.casefold(), port)] = capabilities
+            _logger.info(f"RootDSE cached: {host}:{port}")
+        except Exception as e:
+            _logger.warning(f"Can't read rootDSE {host}:{port}: {e}")
 
-    # Получения списка корневых областей
-    res = connect.search_s(base, search_scope, ldap_filter, properties)
-    naming_contexts = [nc.decode() for nc in res[0][1]["namingContexts"]]
+
+def search_root_dse(connect, _logger) -> str:
+    """
+    Функция формирования base-строки подключения
+
+    Args:
+        connect: Переменная с открытой сессией к СК
+        _logger: Переменная с логированием
+    """
+    _logger.debug(f"Get dn: search_base: , search_scope: {ldap.SCOPE_BASE}, "
+                  f"ldap_filter: (objectClass=*), properties: {ROOT_DSE_PROPERTIES}")
 
     # Возвращение первого элемента из списка областей, с учётом фильтров
-    return [nc for nc in naming_contexts
-            if nc.lower().startswith("dc=")
-            and 'DomainDnsZones'.lower() not in nc.lower()
-            and 'ForestDnsZones'.lower() not in nc.lower()][0]
+    return read_root_dse(connect).base
@@ -5,23 +5,50 @@ import struct
 import uuid
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from typing import AsyncIterator, Iterator, Callable
 
 import ldap
 import ldap.filter
 from ldap.controls.libldap import SimplePagedResultsControl
 
 from .data import DataDSLDAP, DS_TYPE_SCOPE, DS_TYPE_OBJECT_SYSTEM
-from .ds_dict import DSDict
+from .ds_dict import DSDict, key_table, _casefold
+from .ds_entry import DSEntry
+from .ds_result_set import DSResultSet, derive_column
+from .cancel_token import CancelToken
 from .attributes_type import ATTR_TYPES
 from .convertors_value import convert_grouptype, convert_object_class, uac_to_flags, _UAC_FLAGS
 
+try:
+    import numpy
+except ImportError:  # numpy не является обязательной зависимостью
+    numpy = None
+
+# Интервал в секундах, через который ожидающий результата поиск проверяет отмену
+CANCEL_POLL = 0.5
+
+# Максимальное число одновременных дозапросов значений атрибутов со свойством "range" в одной сессии
+RANGE_PIPELINE = 16
+
+# Размер страницы поиска, если он не указан и ограничение MaxPageSize контроллера домена неизвестно
+# (сервер уменьшает страницу до своего ограничения)
+DEFAULT_PAGE_SIZE = 1499
+
 # Особая обработка атрибутов, которая противоречит стандартному правилу чтения атрибута указанного в TYPE_HANDLERS
 ATTR_SPECIAL = DSDict({
-    "objectGUID": lambda v: [str(uuid.UUID(bytes_le=i)) for i in v],
+    "objectGUID": lambda v: c_guid_byte_to_string_batch(v),
     "objectClass": lambda v: convert_object_class(flags=[i.decode("utf-8") for i in v]),
     "rIDAvailablePool": lambda v: [i.decode("utf-8") for i in v],
 })
 
+# Правила ATTR_SPECIAL и TYPE_HANDLERS конвертируют значения поэлементно, поэтому значения атрибута всех объектов
+# страницы конвертируются одним вызовом правила (decode_column). Здесь указываются правила для столбца значений
+# (значения атрибута каждого объекта) для атрибутов, результат которых зависит от всего набора значений объекта
+ATTR_SPECIAL_COLUMN = DSDict({
+    "objectClass": lambda column: derive_column(ATTR_SPECIAL["objectClass"], [tuple(v) for v in column]),
+})
+
 # Правила обработки атрибутов в зависимости от того указанного в ATTR_TYPES
 TYPE_HANDLERS = {
     # Строка Distinguished ж\Name
@@ -33,15 +60,21 @@ TYPE_HANDLERS = {
     # Целое число
     "2.5.5.9": lambda v: [int(i) for i in v],
     # Время в формате UTC (напр. 20240916132547.0Z).
-    "2.5.5.11": lambda v: [c_datetime_unicode_to_python(i) for i in v],
+    "2.5.5.11": lambda v: c_datetime_unicode_to_python_batch(v),
     # Юникод (Строка "Пропустить регистр")
     "2.5.5.12": lambda v: [i.decode("utf-8") for i in v],
     # Большое целое число (IADsLargeInteger) (целое 64-битное, например pwdLastSet, lastLogonTimestamp).
-    "2.5.5.16": lambda v: [c_datetime_win_to_python(i) for i in v],
+    "2.5.5.16": lambda v: c_datetime_win_to_python_batch(v),
     # Идентификатор безопасности (Октетная строка)
-    "2.5.5.17": lambda v: [c_sid_byte_to_string(i) for i in v]
+    "2.5.5.17": lambda v: c_sid_byte_to_string_batch(v)
 }
 
+# Минимальное число GUID в пакете, начиная с которого они конвертируются через numpy (если библиотека установлена)
+NUMPY_BATCH = 64
+
+# Число планов конвертации (decode_plan), которые хранятся в кэше
+DECODE_PLAN_CACHE = 1024
+
 # Создание новых атрибутов на базовых атрибутов (все специальные атрибуты начинаются с заглавной буквы
 # Первый ключ это название исходного атрибута,
 # значение это возможные специальные атрибуты, которые могут быть созданы из исходного
@@ -65,49 +98,430 @@ ATTR_EXTEND = {
 }
 
 
+def ranged_attributes(objects: list[dict]) -> list[tuple[int, str]]:
+    """Атрибуты, полученные не полностью (со свойством "range"): список (номер объекта, атрибут)"""
+    return [(index, attr) for index, data in enumerate(objects) for attr in data if ';range=' in attr]
+
+
+def merge_ranges(objects: list[dict], values: dict[tuple[int, str], list]) -> list[dict]:
+    """
+    Замена атрибутов со свойством "range" полным списком значений (атрибут без свойства "range")
+
+    Args:
+        objects: Атрибуты объектов в исходном виде
+        values: Дозапрошенные значения: (номер объекта, атрибут) - значения после полученных в объекте
+    """
+    result = []
+    for index, data in enumerate(objects):
+        if any((index, attr) in values for attr in data):
+            merged = {}
+            for attr, attr_values in data.items():
+                if (index, attr) in values:
+                    attr_values = attr_values + values[(index, attr)]
+                    attr = attr.split(';')[0]
+                merged[attr] = attr_values
+            data = merged
+        result.append(data)
+    return result
+
+
+def read_range(data: dict, attr_name: str) -> tuple[list, int | None]:
+    """
+    Значения диапазона из ответа сервера и номер первого значения следующего диапазона
+    (None - получены все значения)
+
+    Args:
+        data: Атрибуты объекта из ответа сервера
+        attr_name: Название атрибута без свойства "range"
+    """
+    prefix = f"{attr_name};range=".casefold()
+    name = next((i for i in data if i.casefold().startswith(prefix)), None)
+    if name is None or not data[name]:
+        return [], None
+
+    end = name[len(prefix):].split('-')[1]
+    return data[name], None if '*' in end else int(end) + 1
+
+
+def next_step(step: int | None, received: int) -> int | None:
+    """Шаг следующего дозапроса: если сервер вернул меньше значений, чем запрошено, шаг уменьшается до его предела"""
+    return received if step and 0 < received < step else step
+
+
+class BlockingSession:
+    """
+    Сессия DSHook для общих корутин поиска (fetch_ranges, paged_search, search_all).
+    Запросы отправляются и ожидаются в текущем потоке, поэтому корутины не приостанавливаются и исполняются
+    без цикла событий (run_blocking, iter_blocking). В AsyncDSHook те же корутины исполняет сессия,
+    которая ожидает результаты в цикле событий
+    """
+
+    def __init__(self, connect, _logger, cancel_token: CancelToken | None = None):
+        self.connect = connect
+        self.cancel_token = cancel_token
+        self._logger = _logger
+
+    async def search(self, **kwargs) -> int:
+        """Отправка запроса (search_ext). Возвращается ID запроса"""
+        return self.connect.search_ext(**kwargs)
+
+    async def result(self, msgid: int) -> tuple:
+        """Ожидание результата запроса (см. wait_result)"""
+        return wait_result(connect=self.connect, _logger=self._logger, msgid=msgid, cancel_token=self.cancel_token)
+
+    async def convert(self, func: Callable, /, *args):
+        """Конвертация страницы"""
+        return func(*args)
+
+    def abandon(self, msgid: int) -> None:
+        """Прерывание запроса на сервере"""
+        try:
+            self.connect.abandon_ext(msgid)
+        except ldap.LDAPError as e:
+            self._logger.debug(f"Request was not abandoned: {e}")
+
+    def close_paged(self, **kwargs) -> None:
+        """Закрытие очереди страниц на сервере (search_ext с SimplePagedResultsControl размера 0)"""
+        try:
+            self.connect.search_ext(**kwargs)
+        except ldap.LDAPError as e:
+            self._logger.debug(f"Paged search was not abandoned: {e}")
+
+
+def run_blocking(coro):
+    """Исполнение общей корутины поиска с BlockingSession: корутина не приостанавливается, цикл событий не нужен"""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    coro.close()
+    raise RuntimeError("Coroutine was suspended outside of the event loop")
+
+
+def iter_blocking(pages: AsyncIterator) -> Iterator:
+    """Перебор асинхронного генератора общих корутин поиска с BlockingSession как обычного генератора"""
+    try:
+        while True:
+            try:
+                page = run_blocking(anext(pages))
+            except StopAsyncIteration:
+                return
+            yield page
+    finally:
+        # Если перебор прерван, исполняются блоки finally генератора (например, закрытие очереди страниц)
+        run_blocking(pages.aclose())
+
+
+async def fetch_ranges(session, _logger, objects: list[dict], range_step: int | None = None) -> list[dict]:
+    """
+    Дозапрос значений атрибутов, полученных не полностью (со свойством "range"), для всех объектов страницы.
+    Диапазоны разных атрибутов запрашиваются одновременно (до RANGE_PIPELINE запросов в сессии) с глубиной поиска base,
+    следующий диапазон атрибута запрашивается сразу после получения предыдущего.
+    Возвращаются данные объектов без свойства "range"
+
+    Args:
+        session: Сессия, которая исполняет запросы (BlockingSession или сессия AsyncDSHook)
+        _logger: Переменная с логированием
+        objects: Атрибуты объектов страницы в исходном виде
+        range_step: Число значений в одном запросе (по умолчанию - сколько разрешит сервер)
+    """
+    # Очередь дозапросов: (номер объекта, атрибут, название атрибута, первое значение, шаг)
+    todo = []
+    values = {}
+    for index, attr in ranged_attributes(objects):
+        attr_name = attr.split(';')[0]
+        values[(index, attr)] = []
+        todo.append((index, attr, attr_name, int(attr.split(';range=')[1].split('-')[1]) + 1, range_step))
+    if not todo:
+        return objects
+
+    running = {}  # Отправленные дозапросы: msgid - параметры дозапроса
+    try:
+        while todo or running:
+            while todo and len(running) < RANGE_PIPELINE:
+                index, attr, attr_name, start, step = todo.pop(0)
+                dn = objects[index]['distinguishedName'][0].decode("utf-8")
+                attribute = range_attribute(attr_name, start, step)
+                _logger.debug(f"Get range: search_base: {dn}, search_scope: {ldap.SCOPE_BASE}, "
+                              f"ldap_filter: (objectClass=*), properties: {[attribute]}")
+                msgid = await session.search(base=dn, scope=ldap.SCOPE_BASE, filterstr="(objectClass=*)",
+                                             attrlist=[attribute])
+                running[msgid] = (index, attr, attr_name, start, step)
+
+            # Результаты ожидаются в порядке отправки, остальные ответы тем временем накапливаются в сессии
+            msgid = next(iter(running))
+            _, res, _, _ = await session.result(msgid)
+            index, attr, attr_name, _, step = running.pop(msgid)
+
+            received, start = read_range(res[0][1], attr_name) if res else ([], None)
+            values[(index, attr)] += received
+            if start is not None:
+                todo.append((index, attr, attr_name, start, next_step(step, len(received))))
+    finally:
+        # Если дозапрос прерван, оставшиеся запросы прерываются на сервере
+        for msgid in running:
+            session.abandon(msgid)
+
+    return merge_ranges(objects, values)
+
+
+def fetch_page_ranges(connect, _logger, objects: list[dict], range_step: int | None = None,
+                      cancel_token: CancelToken | None = None) -> list[dict]:
+    """
+    Функция дозапроса значений атрибутов, полученных не полностью (со свойством "range"), для всех объектов страницы
+    в текущем потоке (см. fetch_ranges)
+
+    Args:
+        connect: Переменная с открытой сессией к СК
+        _logger: Переменная с логированием
+        objects: Атрибуты объектов страницы в исходном виде
+        range_step: Число значений в одном запросе (по умолчанию - сколько разрешит сервер)
+        cancel_token: Токен отмены поиска
+    """
+    return run_blocking(fetch_ranges(BlockingSession(connect, _logger, cancel_token), _logger, objects, range_step))
+
+
+def fetch_attribute_ranges(connect, _logger, data: dict, range_step: int | None = None) -> dict:
+    """
+    Функция дозапроса значений атрибутов, полученных не полностью (со свойством "range").
+    Атрибут перезапрашивается, пока не будут получены все значения. Возвращаются данные объекта без свойства "range".
+    range_step - число значений в одном запросе (см. fetch_page_ranges)
+    """
+    if not any(';' in attr for attr in data):
+        return data
+
+    return fetch_page_ranges(connect=connect, _logger=_logger, objects=[data], range_step=range_step)[0]
+
+
+def _hex_handler(values: list[bytes]) -> list[str]:
+    """Правило обработки неизвестного атрибута: значение преобразовывается в hex, для совместимости с JSON"""
+    return [f"hex:{i.hex()}" for i in values]
+
+
+@lru_cache(maxsize=4096)
+def attribute_handler(attr: str) -> tuple[Callable, bool]:
+    """
+    Правило обработки атрибута: функция конвертации значений и указатель, что атрибут однозначный.
+    Последовательность: либо правило для специальной обработки атрибута (ATTR_SPECIAL),
+    либо правило для типа атрибута (TYPE_HANDLERS по ATTR_TYPES), либо значение преобразовывается в hex.
+    Если атрибута нет в ATTR_TYPES, он считается мультистроковым
+
+    Args:
+        attr: Название атрибута, как его вернул сервер
+    """
+    action = ATTR_TYPES.get(attr, ('unknown', False))
+    return ATTR_SPECIAL.get(attr, TYPE_HANDLERS.get(action[0], _hex_handler)), action[1]
+
+
+def decode_column(attr: str, handler: Callable, single: bool, column: list[list]) -> list:
+    """
+    Конвертация значений атрибута нескольких объектов (столбца). Значения всех объектов передаются в правило
+    одним списком и затем разделяются по объектам, если для атрибута не указано правило в ATTR_SPECIAL_COLUMN.
+    Результат совпадает с конвертацией каждого объекта по отдельности
+
+    Args:
+        attr: Название атрибута
+        handler: Функция конвертации значений (attribute_handler)
+        single: Атрибут однозначный (у каждого объекта возвращается первое значение)
+        column: Значения атрибута каждого объекта в исходном виде
+    """
+    special = ATTR_SPECIAL_COLUMN.get(attr)
+    if special is not None:
+        result = special(column)
+    else:
+        counts = list(map(len, column))
+        values = handler([value for values in column for value in values])
+        if single and counts.count(1) == len(counts):
+            return values
+
+        result, start = [], 0
+        for count in counts:
+            result.append(values[start:start + count])
+            start += count
+
+    return [i[0] for i in result] if single else result
+
+
+class DecodePlan:
+    """
+    План конвертации объектов с одинаковым набором атрибутов: правило обработки каждого атрибута,
+    вычисляемые атрибуты (ATTR_EXTEND) и атрибуты, которые должны быть скрыты
+    """
+    __slots__ = ("attributes", "extend", "hidden", "keys", "table", "_extend_keys", "_hidden_keys")
+
+    def __init__(self, attributes: tuple[str, ...], properties: tuple[str, ...], properties_shadow: tuple[str, ...]):
+        # (атрибут, функция конвертации, однозначный)
+        self.attributes = [(attr, *attribute_handler(attr)) for attr in attributes]
+
+        # (исходный атрибут, вычисляемый атрибут, функция). Особый атрибут создаётся, если он был запрошен
+        # или если были запрошены все атрибуты
+        received = {attr.casefold() for attr in attributes}
+        self.extend = [(attr, attr_extend, handler_extend)
+                       for attr, rules in ATTR_EXTEND.items() if attr.casefold() in received
+                       for attr_extend, handler_extend in rules.items()
+                       if attr_extend.lower() in properties or '*' in properties]
+
+        # Атрибуты, которые должны были быть скрыты (только полученные)
+        names = received | {attr_extend.casefold() for _, attr_extend, _ in self.extend}
+        self.hidden = list({attr.casefold(): attr for attr in properties_shadow if attr.casefold() in names}.values())
+
+        # Ключи в нижнем регистре для атрибутов, вычисляемых атрибутов и скрытых атрибутов
+        self.keys = [_casefold(attr) for attr, _, _ in self.attributes]
+        self._extend_keys = [(_casefold(attr), _casefold(attr_extend), handler_extend)
+                             for attr, attr_extend, handler_extend in self.extend]
+        self._hidden_keys = [_casefold(attr) for attr in self.hidden]
+
+        # Общая таблица ключей объектов плана (в порядке, в котором ключи добавлялись бы в DSDict)
+        table = dict(zip(self.keys, attributes))
+        for _, attr_extend, _ in self.extend:
+            table[_casefold(attr_extend)] = attr_extend
+        for key in self._hidden_keys:
+            table.pop(key)
+        self.table = key_table(tuple(table.values()))
+
+    def apply(self, data: dict, lazy: bool = False) -> DSDict:
+        """
+        Конвертация одного объекта (набор атрибутов должен совпадать с набором, для которого составлен план)
+
+        Args:
+            data: Атрибуты объекта в исходном виде
+            lazy: Вернуть DSEntry, атрибуты которого конвертируются при первом обращении
+        """
+        if lazy:
+            return DSEntry(data, self)
+
+        result = {}
+        for (attr, handler, single), key in zip(self.attributes, self.keys):
+            values = handler(data[attr])
+            result[key] = values[0] if single else values
+
+        for key, key_extend, handler_extend in self._extend_keys:
+            result[key_extend] = handler_extend(result[key])
+
+        for key in self._hidden_keys:
+            del result[key]
+
+        return DSDict._from_table(self.table, result)
+
+    def columns(self, objects: list[dict]) -> list[list]:
+        """
+        Конвертация нескольких объектов по столбцам: атрибут за атрибутом (decode_column), вычисляемые атрибуты
+        вычисляются один раз на каждое различное значение исходного атрибута (derive_column).
+        Возвращаются значения столбцов в порядке таблицы ключей (self.table)
+
+        Args:
+            objects: Атрибуты объектов в исходном виде (набор атрибутов каждого объекта совпадает с набором плана)
+        """
+        result = {}
+        for (attr, handler, single), key in zip(self.attributes, self.keys):
+            result[key] = decode_column(attr, handler, single, [data[attr] for data in objects])
+
+        for key, key_extend, handler_extend in self._extend_keys:
+            result[key_extend] = derive_column(handler_extend, result[key])
+
+        for key in self._hidden_keys:
+            del result[key]
+
+        return list(result.values())
+
+    def apply_page(self, objects: list[dict]) -> list[DSDict]:
+        """
+        Конвертация нескольких объектов по столбцам (результат совпадает с apply для каждого объекта)
+
+        Args:
+            objects: Атрибуты объектов в исходном виде (набор атрибутов каждого объекта совпадает с набором плана)
+        """
+        table = self.table
+        columns = self.columns(objects)
+        if not columns:
+            return [DSDict._from_table(table, ()) for _ in objects]
+        return [DSDict._from_table(table, zip(table, row)) for row in zip(*columns)]
+
+
+@lru_cache(maxsize=DECODE_PLAN_CACHE)
+def decode_plan(attributes: tuple[str, ...], properties: tuple[str, ...],
+                properties_shadow: tuple[str, ...]) -> DecodePlan:
+    """
+    План конвертации из кэша. Объекты одного поиска обычно имеют несколько разных наборов атрибутов,
+    поэтому план составляется один раз на набор и применяется ко всем таким объектам
+
+    Args:
+        attributes: Названия атрибутов объекта в порядке получения
+        properties: Список запрошенных атрибутов
+        properties_shadow: Список атрибутов, которые должны быть скрыты
+    """
+    return DecodePlan(attributes, properties, properties_shadow)
+
+
 def object_processing(connect, _logger, data, properties, properties_shadow) -> DSDict:
     """Основная функция конвертации данных полученных объекта полученных из СК"""
-    result = DSDict()
-    # Перебор полученных атрибутов и значений
-    for attr, values in data.items():
-        # Если есть атрибут со свойством "range", атрибут перезапрашивается, пока не будут получены все значения
-        if ';' in attr:
-            temp = attr.split(';')[0]
-            temp, attr = attr, temp
-            values += search_attribute_range(
-                connect=connect, dn=data['distinguishedName'][0].decode("utf-8"), attribute=temp, _logger=_logger
-            )
-
-        # Получение базовых свойств атрибута. Если их нет в библиотеке, атрибут считается мультистроковым
-        action = ATTR_TYPES.get(attr, ('unknown', False))
-
-        # Получение правила обработки атрибута.
-        # Последовательность:
-        # Либо правило для конкретного атрибута
-        # Либо правило для специальной обработки атрибута
-        # Либо значение преобразовывается в hex, для совместимости с JSON
-        handler = ATTR_SPECIAL.get(attr, TYPE_HANDLERS.get(action[0], lambda v: [f"hex:{i.hex()}" for i in v]))
-
-        # Исполнение конвертации значения согласно полученному правилу
-        result[attr] = handler(values)
-
-        # Если атрибут должен содержать одно значение, остаётся только первый элемент
-        result[attr] = result[attr][0] if action[1] else result[attr]
-
-    # Обработка вычисляемых атрибутов
-    for attr, rules in ATTR_EXTEND.items():
-        if attr in result:
-            for attr_extend, handler_extend in rules.items():
-                # Особый атрибут создаётся, если он был запрошен или если были запрошены все атрибуты
-                if attr_extend.lower() in properties or '*' in properties:
-                    result[attr_extend] = handler_extend(result[attr])
-
-    # Удаление всех атрибутов, которые должны были быть скрыты
-    [result.pop(attr) for attr in properties_shadow if attr in result]
+    # Если есть атрибут со свойством "range", значения дозапрашиваются до конвертации
+    data = fetch_attribute_ranges(connect=connect, _logger=_logger, data=data)
+
+    return decode_plan(tuple(data), tuple(properties), tuple(properties_shadow)).apply(data)
 
+
+def decode_page(objects: list[dict], properties: list, properties_shadow: list,
+                lazy: bool = False) -> list[DSDict]:
+    """
+    Функция конвертации страницы объектов, полученных из СК. Обращения к СК не выполняются
+    (значения со свойством "range" должны быть дозапрошены через fetch_attribute_ranges),
+    поэтому функция может быть исполнена в отдельном процессе
+
+    Args:
+        objects: Атрибуты объектов страницы в исходном виде
+        properties: Список запрошенных атрибутов
+        properties_shadow: Список атрибутов, которые должны быть скрыты
+        lazy: Вернуть объекты DSEntry, атрибуты которых конвертируются при первом обращении
+    """
+    properties = tuple(properties)
+    properties_shadow = tuple(properties_shadow)
+    plans = [decode_plan(tuple(data), properties, properties_shadow) for data in objects]
+    if lazy:
+        return [plan.apply(data, lazy=True) for plan, data in zip(plans, objects)]
+
+    # Объекты с одинаковым планом конвертации конвертируются вместе по столбцам
+    groups = {}  # План конвертации - номера объектов на странице
+    for offset, plan in enumerate(plans):
+        groups.setdefault(id(plan), (plan, []))[1].append(offset)
+
+    result = [None] * len(objects)
+    for plan, offsets in groups.values():
+        for offset, data in zip(offsets, plan.apply_page([objects[offset] for offset in offsets])):
+            result[offset] = data
+    return result
+
+
+def decode_page_columns(objects: list[dict], properties: list, properties_shadow: list) -> DSResultSet:
+    """
+    Функция конвертации страницы объектов, полученных из СК, в результат по столбцам (DSResultSet).
+    Как и decode_page, может быть исполнена в отдельном процессе
+
+    Args:
+        objects: Атрибуты объектов страницы в исходном виде
+        properties: Список запрошенных атрибутов
+        properties_shadow: Список атрибутов, которые должны быть скрыты
+    """
+    properties = tuple(properties)
+    properties_shadow = tuple(properties_shadow)
+    result = DSResultSet()
+    result.add_page(objects, [decode_plan(tuple(data), properties, properties_shadow) for data in objects])
     return result
 
 
+def page_function(lazy: bool = False, columnar: bool = False) -> Callable:
+    """
+    Функция конвертации страницы поиска
+
+    Args:
+        lazy: Объекты DSEntry, атрибуты которых конвертируются при первом обращении
+        columnar: Результат по столбцам (DSResultSet). Имеет приоритет над lazy
+    """
+    if columnar:
+        return decode_page_columns
+    return partial(decode_page, lazy=True) if lazy else decode_page
+
+
 # Регулярное выражение для поиска атрибута и оператора
 ESCAPE_START_FILTER = re.compile("!?[A-Za-z0-9]*[0-9.:]*?[><~]?=")
 # Регулярное выражение для разбивки минимального элемента ldap-фильтра на части:
@@ -207,22 +621,19 @@ def isolation_filter(ldap_filter: str) -> str:
     return skeleton
 
 
-def search_object(connect, _logger, ldap_filter, search_base, properties, type_object: DS_TYPE_OBJECT_SYSTEM = 'object',
-                  search_scope: DS_TYPE_SCOPE = "subtree", only_one: bool = False,
-                  result_set_size: int | None = None) -> list[DSDict]:
+def prepare_search(_logger, ldap_filter: str, properties: list | None, type_object: DS_TYPE_OBJECT_SYSTEM = 'object',
+                   search_scope: DS_TYPE_SCOPE = "subtree") -> tuple[str, list, list, int]:
     """
-    Функция поиска объектов в СК
+    Функция подготовки параметров поиска: LDAP-фильтр с фильтром типа объекта, список запрашиваемых атрибутов,
+    список атрибутов, которые должны быть скрыты, и глубина поиска в виде константы ldap.
+    Обращения к СК не выполняются, поэтому функция используется и синхронным, и асинхронным поиском
 
     Args:
-        connect: Переменная с открытым подключением к СК
         _logger: Переменная с логгером
         ldap_filter: исходный LDAP-фильтр СК
-        search_base: Область поиска в дереве СК
         properties: Список запрошенных атрибутов (* может быть запрошена только отдельно)
         type_object: Искомый тип объекта (по умолчанию object)
         search_scope: Глубина поиска
-        only_one: Указатель, что поиск обязательно должен вернуть только один объект иначе ошибка
-        result_set_size: Ограничение на число объектов, которые должно быть возвращено
     """
     _logger.debug(f"SOURCE ldap_filter: {ldap_filter}")
 
@@ -232,9 +643,6 @@ def search_object(connect, _logger, ldap_filter, search_base, properties, type_o
     # Добавление в LDAP-фильтр дополнительных правил фильтрации, в зависимости от type_object
     ldap_filter = DataDSLDAP[type_object.upper()].unit(ldap_filter)
 
-    if only_one and '*' in ldap_filter:
-        raise RuntimeError(f"При точеном поиске недопустим параметр разрешающий нестрогий поиск (*): {ldap_filter}")
-
     # Далее формируется список запрошенных атрибутов и атрибутов,
     # которые должны быть скрыты, если они нужны для создания особых атрибутов, но не были запрошены
     if not properties:
@@ -274,66 +682,252 @@ def search_object(connect, _logger, ldap_filter, search_base, properties, type_o
     else:
         raise RuntimeError(f"Неизвестный тип области поиска: {search_scope}")
 
+    return ldap_filter, properties, properties_shadow, search_scope
+
+
+def page_size_for(page_size: int | None, result_set_size: int | None = None, count: int = 0) -> int:
+    """
+    Размер очередной страницы поиска: page_size (или DEFAULT_PAGE_SIZE), но не больше числа объектов,
+    которое осталось получить до result_set_size. Поэтому ограниченный поиск не запрашивает у сервера лишние объекты
+
+    Args:
+        page_size: Размер страницы (например, MaxPageSize контроллера домена)
+        result_set_size: Ограничение на число объектов, которые должно быть возвращено
+        count: Число уже полученных объектов
+    """
+    size = page_size or DEFAULT_PAGE_SIZE
+    if result_set_size:
+        size = min(size, result_set_size - count)
+    return max(size, 1)
+
+
+async def search_all(session, _logger, ldap_filter, search_base, properties,
+                     type_object: DS_TYPE_OBJECT_SYSTEM = 'object', search_scope: DS_TYPE_SCOPE = "subtree",
+                     only_one: bool = False, result_set_size: int | None = None, page_size: int | None = None,
+                     range_step: int | None = None, serverctrls: list | None = None, lazy: bool = False,
+                     columnar: bool = False) -> list[DSDict] | DSResultSet:
+    """
+    Поиск объектов с получением всех страниц (общая корутина search_object и AsyncDSHook).
+    session - сессия, которая исполняет запросы (BlockingSession или сессия AsyncDSHook),
+    остальные аргументы совпадают с search_object
+    """
+    if only_one and '*' in isolation_filter(ldap_filter):
+        raise RuntimeError(f"При точеном поиске недопустим параметр разрешающий нестрогий поиск (*): {ldap_filter}")
+
+    # Сбор всех страниц поиска в один список
+    total_results = DSResultSet() if columnar else []
+    async for page in paged_search(session=session, _logger=_logger, ldap_filter=ldap_filter, search_base=search_base,
+                                   properties=properties, type_object=type_object, search_scope=search_scope,
+                                   result_set_size=result_set_size, page_size=page_size, range_step=range_step,
+                                   serverctrls=serverctrls, lazy=lazy, columnar=columnar):
+        total_results.extend(page)
+
+    # Вызвать исключение, если ожидается один объект, но результат не соответствует
+    if only_one:
+        if len(total_results) == 0:
+            raise RuntimeError("Объект не найден")
+        if len(total_results) > 1:
+            raise RuntimeError("Найдено больше одного объекта")
+
+    return total_results
+
+
+def search_object(connect, _logger, ldap_filter, search_base, properties, type_object: DS_TYPE_OBJECT_SYSTEM = 'object',
+                  search_scope: DS_TYPE_SCOPE = "subtree", only_one: bool = False,
+                  result_set_size: int | None = None, cancel_token: CancelToken | None = None,
+                  page_size: int | None = None, range_step: int | None = None,
+                  serverctrls: list | None = None, lazy: bool = False,
+                  columnar: bool = False) -> list[DSDict] | DSResultSet:
+    """
+    Функция поиска объектов в СК
+
+    Args:
+        connect: Переменная с открытым подключением к СК
+        _logger: Переменная с логгером
+        ldap_filter: исходный LDAP-фильтр СК
+        search_base: Область поиска в дереве СК
+        properties: Список запрошенных атрибутов (* может быть запрошена только отдельно)
+        type_object: Искомый тип объекта (по умолчанию object)
+        search_scope: Глубина поиска
+        only_one: Указатель, что поиск обязательно должен вернуть только один объект иначе ошибка
+        result_set_size: Ограничение на число объектов, которые должно быть возвращено
+        cancel_token: Токен отмены поиска
+        page_size: Размер страницы поиска (по умолчанию DEFAULT_PAGE_SIZE)
+        range_step: Число значений атрибута в одном дозапросе (по умолчанию - сколько разрешит сервер)
+        serverctrls: Дополнительные элементы управления запроса (например, ASQControl)
+        lazy: Вернуть объекты DSEntry, атрибуты которых конвертируются при первом обращении
+            (если нужны только некоторые атрибуты найденных объектов)
+        columnar: Вернуть результат по столбцам (DSResultSet) вместо списка объектов
+    """
+    return run_blocking(search_all(session=BlockingSession(connect, _logger, cancel_token), _logger=_logger,
+                                   ldap_filter=ldap_filter, search_base=search_base, properties=properties,
+                                   type_object=type_object, search_scope=search_scope, only_one=only_one,
+                                   result_set_size=result_set_size, page_size=page_size, range_step=range_step,
+                                   serverctrls=serverctrls, lazy=lazy, columnar=columnar))
+
+
+async def paged_search(session, _logger, ldap_filter, search_base, properties,
+                       type_object: DS_TYPE_OBJECT_SYSTEM = 'object', search_scope: DS_TYPE_SCOPE = "subtree",
+                       result_set_size: int | None = None, decoder: Callable | None = None,
+                       page_size: int | None = None, range_step: int | None = None, serverctrls: list | None = None,
+                       lazy: bool = False, columnar: bool = False) -> AsyncIterator[list[DSDict] | DSResultSet]:
+    """
+    Постраничный поиск объектов (общая корутина iter_search_object и AsyncDSHook).
+    Запросы исполняет session (BlockingSession или сессия AsyncDSHook), она же конвертирует страницы и проверяет
+    токен отмены. Остальные аргументы совпадают с iter_search_object
+    """
+    ldap_filter, properties, properties_shadow, search_scope = prepare_search(
+        _logger=_logger, ldap_filter=ldap_filter, properties=properties, type_object=type_object,
+        search_scope=search_scope)
+
     _logger.info(f"Get {type_object}: search_base: {search_base}, search_scope: {search_scope}, "
                  f"ldap_filter: {ldap_filter}, properties: {properties}")
 
-    # Размер очереди по умолчанию
-    req_ctrl = SimplePagedResultsControl(criticality=False, size=1499, cookie='')
+    # Функция конвертации страницы (при lazy объекты конвертируются при обращении к атрибутам)
+    page_func = page_function(lazy=lazy, columnar=columnar)
 
-    # Цикл на получение всех объект
-    total_results = []
-    while True:
-        # Запрос на получение результатов
-        msgid = connect.search_ext(base=search_base, scope=search_scope, filterstr=ldap_filter, attrlist=properties,
-                                   serverctrls=[req_ctrl])
+    req_ctrl = SimplePagedResultsControl(criticality=False, size=page_size_for(page_size, result_set_size),
+                                         cookie='')
 
-        # Вычленение результатов
-        _, objects, _, server_sprc = connect.result3(msgid)
+    # Cookie страницы, которая ещё не была запрошена. Требуется для закрытия очереди на сервере
+    cookie = None
+    count = 0  # Число уже возвращённых объектов
+    try:
+        # Цикл на получение всех объект
+        while True:
+            if session.cancel_token:
+                session.cancel_token.raise_if_cancelled()
 
-        # Поиск response control с cookie
-        pctrls = [c for c in server_sprc if c.controlType == SimplePagedResultsControl.controlType]
+            # Размер страницы уменьшается до числа объектов, которые осталось получить
+            req_ctrl.size = page_size_for(page_size, result_set_size, count)
 
-        # Обработка найденных объектов
-        for one_object in objects:
-            if one_object[0]:
-                # Если указан лимит на объекты, будет прерывание, если лимит уже исчерпан
-                if result_set_size and len(total_results) >= result_set_size:
-                    break
+            # Запрос на получение результатов
+            msgid = await session.search(base=search_base, scope=search_scope, filterstr=ldap_filter,
+                                         attrlist=properties, serverctrls=[req_ctrl] + (serverctrls or []))
 
-                # Обработка и сохранение объекта
-                total_results.append(object_processing(connect=connect, data=one_object[1], properties=properties,
-                                                       properties_shadow=properties_shadow, _logger=_logger))
+            # Вычленение результатов
+            _, objects, _, server_sprc = await session.result(msgid)
 
-        # Если cookie есть
-        if pctrls:
-            # Если лимит уже использован и cookie остался, отправляется запрос прерывания очереди
-            if result_set_size and len(total_results) >= result_set_size and pctrls[0].cookie:
-                # Корректно закрываем paged search sequence на сервере
-                abandon_ctrl = SimplePagedResultsControl(criticality=True, size=0, cookie=pctrls[0].cookie)
+            # Поиск response control с cookie
+            pctrls = [c for c in server_sprc if c.controlType == SimplePagedResultsControl.controlType]
+            cookie = pctrls[0].cookie if pctrls else None
 
-                connect.search_ext(base=search_base, scope=search_scope, filterstr=ldap_filter, attrlist=properties,
-                                   serverctrls=[abandon_ctrl], sizelimit=0)
+            # Отбор найденных объектов (ссылки на другие разделы каталога пропускаются)
+            objects = [one_object[1] for one_object in objects if one_object[0]]
+
+            # Если указан лимит на объекты, лишние объекты отбрасываются
+            if result_set_size:
+                objects = objects[:result_set_size - count]
+            count += len(objects)
+
+            if objects:
+                # Значения со свойством "range" дозапрашиваются в текущей сессии до конвертации страницы
+                objects = await fetch_ranges(session=session, _logger=_logger, objects=objects, range_step=range_step)
+
+                # Обработка объектов страницы
+                if decoder:
+                    yield await session.convert(decoder, page_func, objects, properties, properties_shadow)
+                else:
+                    yield await session.convert(page_func, objects, properties, properties_shadow)
+
+            # Если лимит уже использован, очередь прерывается (cookie закрывается в finally)
+            if result_set_size and count >= result_set_size:
                 break
 
-            if pctrls[0].cookie:
-                # Копирование cookie из элемента управления ответом в элемент управления запросом
-                req_ctrl.cookie = pctrls[0].cookie
+            # Если cookie есть, он копируется из элемента управления ответом в элемент управления запросом
+            if cookie:
+                req_ctrl.cookie = cookie
             else:
                 break
-        else:
-            break
+    finally:
+        # Если cookie остался (лимит исчерпан или перебор страниц прерван), отправляется запрос прерывания очереди
+        if cookie:
+            # Корректно закрываем paged search sequence на сервере
+            abandon_ctrl = SimplePagedResultsControl(criticality=True, size=0, cookie=cookie)
+            session.close_paged(base=search_base, scope=search_scope, filterstr=ldap_filter, attrlist=properties,
+                                serverctrls=[abandon_ctrl] + (serverctrls or []), sizelimit=0)
+
+
+def iter_search_object(connect, _logger, ldap_filter, search_base, properties,
+                       type_object: DS_TYPE_OBJECT_SYSTEM = 'object', search_scope: DS_TYPE_SCOPE = "subtree",
+                       result_set_size: int | None = None, decoder: Callable | None = None,
+                       cancel_token: CancelToken | None = None, page_size: int | None = None,
+                       range_step: int | None = None, serverctrls: list | None = None,
+                       lazy: bool = False, columnar: bool = False) -> Iterator[list[DSDict] | DSResultSet]:
+    """
+    Функция постраничного поиска объектов в СК. Каждая страница SimplePagedResults возвращается сразу после обработки,
+    поэтому в памяти одновременно находится только одна страница.
+    Если перебор страниц будет прерван до завершения, очередь страниц на сервере будет закрыта.
+    Если операция отменена через cancel_token, запрос прерывается на сервере не позднее чем через CANCEL_POLL секунд
 
-    # Вызвать исключение, если ожидается один объект, но результат не соответствует
-    if only_one:
-        if len(total_results) == 0:
-            raise RuntimeError("Объект не найден")
-        if len(total_results) > 1:
-            raise RuntimeError("Найдено больше одного объекта")
+    Args:
+        connect: Переменная с открытым подключением к СК
+        _logger: Переменная с логгером
+        ldap_filter: исходный LDAP-фильтр СК
+        search_base: Область поиска в дереве СК
+        properties: Список запрошенных атрибутов (* может быть запрошена только отдельно)
+        type_object: Искомый тип объекта (по умолчанию object)
+        search_scope: Глубина поиска
+        result_set_size: Ограничение на число объектов, которые должно быть возвращено
+        decoder: Функция исполнения конвертации страницы: decoder(decode_page, objects, properties, properties_shadow).
+            Например, для конвертации в пуле процессов. Возвращённое значение передаётся как страница
+        cancel_token: Токен отмены поиска
+        page_size: Размер страницы поиска (по умолчанию DEFAULT_PAGE_SIZE). Если указан result_set_size,
+            каждая страница запрашивается не больше оставшегося числа объектов
+        range_step: Число значений атрибута в одном дозапросе (по умолчанию - сколько разрешит сервер)
+        serverctrls: Дополнительные элементы управления запроса (передаются вместе с SimplePagedResultsControl)
+        lazy: Вернуть объекты DSEntry, атрибуты которых конвертируются при первом обращении
+        columnar: Вернуть страницы по столбцам (DSResultSet)
+
+    Returns:
+        Генератор страниц (списков объектов)
+    """
+    return iter_blocking(paged_search(session=BlockingSession(connect, _logger, cancel_token), _logger=_logger,
+                                      ldap_filter=ldap_filter, search_base=search_base, properties=properties,
+                                      type_object=type_object, search_scope=search_scope,
+                                      result_set_size=result_set_size, decoder=decoder, page_size=page_size,
+                                      range_step=range_step, serverctrls=serverctrls, lazy=lazy, columnar=columnar))
 
-    return total_results
+
+def wait_result(connect, _logger, msgid: int, cancel_token: CancelToken | None = None) -> tuple:
+    """
+    Функция ожидания результата запроса.
+    Если указан cancel_token, результат ожидается интервалами по CANCEL_POLL секунд.
+    При отмене запрос прерывается на сервере (abandon) и вызывается OperationCancelled
+
+    Args:
+        connect: Переменная с открытым подключением к СК
+        _logger: Переменная с логгером
+        msgid: ID запроса
+        cancel_token: Токен отмены
+    """
+    if not cancel_token:
+        return connect.result3(msgid)
+
+    while True:
+        try:
+            return connect.result3(msgid, timeout=CANCEL_POLL)
+        except ldap.TIMEOUT:
+            if cancel_token.cancelled:
+                _logger.info(f"Search was cancelled, abandon msgid: {msgid}")
+                connect.abandon_ext(msgid)
+                cancel_token.raise_if_cancelled()
+
+
+def range_attribute(attr_name: str, start: int, step: int | None = None) -> str:
+    """
+    Название атрибута с запрашиваемым диапазоном значений. Если step не указан, конец диапазона не ограничивается (*),
+    и сервер возвращает столько значений, сколько разрешает его MaxValRange
+
+    Args:
+        attr_name: Название атрибута
+        start: Номер первого значения
+        step: Число значений в одном запросе
+    """
+    return f"{attr_name};range={start}-{start + step - 1 if step else '*'}"
 
 
-def search_attribute_range(connect, _logger, dn: str, attribute: str) -> list:
+def search_attribute_range(connect, _logger, dn: str, attribute: str, step: int | None = None) -> list:
     """
     Функция получения всех оставшихся значений из переменной состоящей из страниц
 
@@ -342,39 +936,27 @@ def search_attribute_range(connect, _logger, dn: str, attribute: str) -> list:
         _logger: Переменная с логированием
         dn: distinguishedName объекта
         attribute: Название атрибута, для которого необходимо запросит оставшиеся значения из атрибута
+        step: Число значений в одном запросе (по умолчанию - сколько разрешит сервер)
     """
     all_range = []
 
     attr_name = attribute.split(";")[0]
-    step = 1499  # Размер шага (шаг не может превышать размер правил DS)
     start = int(attribute.split(';range=')[1].split('-')[1]) + 1  # От кого числа в массиве начинается
-    end = start + step  # До кого числа возвращаться
 
-    search_base = ldap.SCOPE_SUBTREE
+    search_scope = ldap.SCOPE_BASE
     ldap_filter = "(objectClass=*)"
 
-    while True:
-        attribute = f"{attr_name};range={start}-{end}"
+    while start is not None:
+        attribute = range_attribute(attr_name, start, step)
 
-        _logger.debug(f"Get range: search_base: {search_base}, search_scope: {dn}, "
+        _logger.debug(f"Get range: search_base: {dn}, search_scope: {search_scope}, "
                       f"ldap_filter: {ldap_filter}, properties: {[attribute]}")
 
-        res = connect.search_s(dn, search_base, ldap_filter, [attribute])[0][1]
-
-        am = [i for i in res.keys() if f'{attr_name};range=' in i][0]
-
-        if res[am]:
-            all_range += res[am]
-        else:
-            break
+        res = connect.search_s(dn, search_scope, ldap_filter, [attribute])
 
-        start, end = am.split(';range=')[1].split('-')
-
-        if '*' in end:
-            break
-        else:
-            start = int(end) + 1
-            end = int(end) + step + 1
+        values, start = read_range(res[0][1], attr_name) if res else ([], None)
+        all_range += values
+        step = next_step(step, len(values))
 
     return all_range
 
@@ -449,20 +1031,107 @@ def c_sid_byte_to_string(data: bytes) -> str:
     return string
 
 
+# Форматы subauthority атрибута objectSid по их числу (значения little-endian по 4 байта)
+_SID_SUBAUTHORITY = [struct.Struct(f'<{length}L') for length in range(256)]
+
+
+def c_sid_byte_to_string_batch(values: list[bytes]) -> list[str]:
+    """
+    Пакетное конвертирование objectSid из байта в строку (результат совпадает с c_sid_byte_to_string).
+    Значения неверного формата передаются в c_sid_byte_to_string
+    """
+    result = []
+    for data in values:
+        if len(data) < 8 or data[0] != 1 or len(data) != 8 + 4 * data[1]:
+            result.append(c_sid_byte_to_string(data))
+            continue
+        authority = 'S-1-%d' % int.from_bytes(data[2:8], 'big')
+        result.append('-'.join([authority, *map(str, _SID_SUBAUTHORITY[data[1]].unpack_from(data, 8))]))
+
+    return result
+
+
+# Порядок байтов GUID (little-endian в первых трёх полях) в записи GUID в виде строки
+_GUID_ORDER = [3, 2, 1, 0, 5, 4, 7, 6, 8, 9, 10, 11, 12, 13, 14, 15]
+
+
+def c_guid_byte_to_string_batch(values: list[bytes]) -> list[str]:
+    """
+    Пакетное конвертирование objectGUID из байта в строку (результат совпадает с str(uuid.UUID(bytes_le=...))).
+    Если numpy установлен, байты большого пакета переставляются одной операцией
+    """
+    if numpy is not None and len(values) >= NUMPY_BATCH and all(len(data) == 16 for data in values):
+        line = numpy.frombuffer(b''.join(values), dtype=numpy.uint8).reshape(-1, 16)[:, _GUID_ORDER].tobytes().hex()
+        return [f'{line[i:i + 8]}-{line[i + 8:i + 12]}-{line[i + 12:i + 16]}-'
+                f'{line[i + 16:i + 20]}-{line[i + 20:i + 32]}'
+                for i in range(0, len(line), 32)]
+
+    result = []
+    for data in values:
+        if len(data) != 16:
+            result.append(str(uuid.UUID(bytes_le=data)))
+            continue
+        line = (data[3::-1] + data[5:3:-1] + data[7:5:-1] + data[8:]).hex()
+        result.append(f'{line[:8]}-{line[8:12]}-{line[12:16]}-{line[16:20]}-{line[20:]}')
+
+    return result
+
+
 def c_datetime_unicode_to_python(data: bytes) -> datetime:
     """Конвертование даты формата Unicode в datetime"""
     return datetime.strptime(data.decode("utf-8"), "%Y%m%d%H%M%S.0Z")
 
 
+def c_datetime_unicode_to_python_batch(values: list[bytes]) -> list[datetime]:
+    """
+    Пакетное конвертирование даты формата Unicode в datetime (результат совпадает с c_datetime_unicode_to_python).
+    Значения вида YYYYMMDDHHMMSS.0Z разбираются по позициям, остальные (и недопустимые даты) - через strptime
+    """
+    result = []
+    for data in values:
+        if len(data) == 17 and data[14:] == b'.0Z' and data[:14].isdigit():
+            try:
+                result.append(datetime(int(data[:4]), int(data[4:6]), int(data[6:8]),
+                                       int(data[8:10]), int(data[10:12]), int(data[12:14])))
+                continue
+            except ValueError:
+                pass
+        result.append(c_datetime_unicode_to_python(data))
+
+    return result
+
+
+# Значения даты формата Windows, которые возвращаются как int
+_WIN_DATETIME_EXCEPTIONS = [b'0', b'9223372036850000000', b'9223372036854775807', b'-9223372036854775808']
+
+
 def c_datetime_win_to_python(data: bytes) -> datetime | int:
     """Конвертирование даты формата Windows в datetime. Если переданы числа исключения, то они возвращаются как int"""
-    if data in [b'0', b'9223372036850000000', b'9223372036854775807', b'-9223372036854775808']:
+    if data in _WIN_DATETIME_EXCEPTIONS:
         return int(data.decode("utf-8"))
 
     return (datetime(1601, 1, 1, tzinfo=datetime.now().astimezone().tzinfo) +
             timedelta(seconds=int(data) / 10_000_000))
 
 
+def c_datetime_win_to_python_batch(values: list[bytes]) -> list[datetime | int]:
+    """
+    Пакетное конвертирование даты формата Windows в datetime (результат совпадает с c_datetime_win_to_python).
+    Начало отсчёта в текущем часовом поясе вычисляется один раз на пакет
+    """
+    result = []
+    start = None
+    for data in values:
+        if data in _WIN_DATETIME_EXCEPTIONS:
+            result.append(int(data.decode("utf-8")))
+            continue
+        if start is None:
+            start = datetime(1601, 1, 1, tzinfo=datetime.now().astimezone().tzinfo)
+        result.append(start + timedelta(seconds=int(data) / 10_000_000))
+
+    return result
+
+
 def return_groupscope(flags) -> str:
     """Конвертирование базового обозначения типа УЗ в классический AD"""
     if 'ACCOUNT_GROUP' in flags:
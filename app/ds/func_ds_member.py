@@ -0,0 +1,149 @@
+"""
+Функции получения членов группы.
+
+Способ поиска выбирается по размеру группы и возможностям контроллера домена (rootDSE):
+- "empty" - в группе нет членов, поиск не выполняется;
+- "asq" - контроллер поддерживает Attribute Scoped Query (ASQ_OID): поиск с глубиной base по самой группе,
+  сервер постранично возвращает объекты, перечисленные в атрибуте member;
+- "dn" - ASQ не поддерживается, но членов не больше MEMBER_PROBE: поиск по их distinguishedName;
+- "memberof" - иначе: поиск по (memberOf=<группа>) в области каталога.
+
+Размер группы оценивается одним запросом первых MEMBER_PROBE значений member. Во всех случаях возвращаются только
+объекты типа member из области каталога
+"""
+import ldap
+import ldap.filter
+from ldap.controls import RequestControl
+
+from .ds_dict import DSDict
+from .ds_result_set import DSResultSet
+from .cancel_token import CancelToken
+from .func_ds_get import BlockingSession, run_blocking
+
+# OID элемента управления Attribute Scoped Query
+ASQ_OID = "1.2.840.113556.1.4.1504"
+
+# Число значений member, которое читается для оценки размера группы
+MEMBER_PROBE = 50
+
+
+def _ber_length(length: int) -> bytes:
+    """Длина элемента BER (короткая или длинная форма)"""
+    if length < 0x80:
+        return bytes([length])
+    data = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(data)]) + data
+
+
+class ASQControl(RequestControl):
+    """Элемент управления Attribute Scoped Query: поиск по объектам, перечисленным в атрибуте source_attribute"""
+    controlType = ASQ_OID
+
+    def __init__(self, source_attribute: str = "member", criticality: bool = True):
+        self.source_attribute = source_attribute
+        self.criticality = criticality
+
+    def encodeControlValue(self) -> bytes:
+        # SEQUENCE { sourceAttribute OCTET STRING }
+        value = self.source_attribute.encode("utf-8")
+        value = b"\x04" + _ber_length(len(value)) + value
+        return b"\x30" + _ber_length(len(value)) + value
+
+
+def probe_attribute() -> str:
+    """Атрибут запроса для оценки размера группы"""
+    return f"member;range=0-{MEMBER_PROBE - 1}"
+
+
+def read_probe(data: dict) -> list[str] | None:
+    """
+    Члены группы из ответа на запрос probe_attribute: список distinguishedName или None,
+    если членов больше MEMBER_PROBE
+
+    Args:
+        data: Атрибуты группы из ответа сервера
+    """
+    for attr, values in data.items():
+        name = attr.casefold()
+        # Сервер, который не поддерживает диапазоны, возвращает все значения
+        if name == "member":
+            return [i.decode("utf-8") for i in values] if len(values) <= MEMBER_PROBE else None
+        if name.startswith("member;range="):
+            end = name.split(';range=')[1].split('-')[1]
+            return [i.decode("utf-8") for i in values] if '*' in end else None
+    return []
+
+
+async def read_members(session, group_dn: str) -> list[str] | None:
+    """
+    Оценка размера группы (см. read_probe). Общая корутина DSHook и AsyncDSHook
+
+    Args:
+        session: Сессия, которая исполняет запросы (BlockingSession или сессия AsyncDSHook)
+        group_dn: distinguishedName группы
+    """
+    msgid = await session.search(base=group_dn, scope=ldap.SCOPE_BASE, filterstr="(objectClass=*)",
+                                 attrlist=[probe_attribute()])
+    _, res, _, _ = await session.result(msgid)
+    return read_probe(res[0][1]) if res else []
+
+
+def probe_members(connect, _logger, group_dn: str, cancel_token: CancelToken | None = None) -> list[str] | None:
+    """
+    Оценка размера группы в текущем потоке (см. read_members)
+
+    Args:
+        connect: Переменная с открытой сессией к СК
+        _logger: Переменная с логированием
+        group_dn: distinguishedName группы
+        cancel_token: Токен отмены поиска
+    """
+    return run_blocking(read_members(BlockingSession(connect, _logger, cancel_token), group_dn))
+
+
+def member_strategy(members: list[str] | None, supports_asq: bool) -> str:
+    """
+    Выбор способа поиска членов группы
+
+    Args:
+        members: Результат оценки размера группы (read_probe)
+        supports_asq: Контроллер домена поддерживает ASQ
+    """
+    if members == []:
+        return "empty"
+    if supports_asq:
+        return "asq"
+    if members is not None:
+        return "dn"
+    return "memberof"
+
+
+def member_search(strategy: str, group_dn: str, base: str, members: list[str] | None) -> dict:
+    """
+    Параметры поиска членов группы (ldap_filter, search_base, search_scope, serverctrls) для выбранного способа
+
+    Args:
+        strategy: Способ поиска (member_strategy)
+        group_dn: distinguishedName группы
+        base: Область каталога
+        members: Результат оценки размера группы (read_probe)
+    """
+    if strategy == "asq":
+        return {"ldap_filter": "(objectClass=*)", "search_base": group_dn, "search_scope": "base",
+                "serverctrls": [ASQControl("member")]}
+    if strategy == "dn":
+        ldap_filter = ''.join(f"(distinguishedName={ldap.filter.escape_filter_chars(dn)})" for dn in members)
+        return {"ldap_filter": f"(|{ldap_filter})", "search_base": base, "search_scope": "subtree",
+                "serverctrls": None}
+    return {"ldap_filter": f"(memberOf={group_dn})", "search_base": base, "search_scope": "subtree",
+            "serverctrls": None}
+
+
+def members_in_base(objects: list[DSDict] | DSResultSet, base: str) -> list[DSDict] | DSResultSet:
+    """Члены группы из области каталога (ASQ возвращает объекты из всего раздела каталога)"""
+    base = base.casefold()
+    if isinstance(objects, DSResultSet):
+        return objects.take(index for index, dn in enumerate(objects.column('distinguishedName', ''))
+                            if dn.casefold() == base or dn.casefold().endswith(',' + base))
+    return [data for data in objects if data['distinguishedName'].casefold() == base
+            or data['distinguishedName'].casefold().endswith(',' + base)]
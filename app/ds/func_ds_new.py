@@ -9,6 +9,7 @@ import ldap
 
 from .data import DS_TYPE_OBJECT
 from .convertors_value import convert_object_class, convert_value
+from .ds_changes import notify_change
 
 
 def ds_new(connect, _logger, dry_run: bool, type_object: DS_TYPE_OBJECT, path: str, name: str, display_name: str = None,
@@ -71,5 +72,6 @@ def ds_new(connect, _logger, dry_run: bool, type_object: DS_TYPE_OBJECT, path: s
 
     if not dry_run:
         connect.add_s(dn, list_object)
+        notify_change(dn)
     else:
         _logger.warning("Enabled dry run")
@@ -0,0 +1,65 @@
+"""
+Функции разбиения поиска по поддереву на независимые части для параллельного исполнения.
+
+Поддерево области поиска делится на части:
+- сама область поиска (base);
+- поддерево каждого непосредственного дочернего объекта области (subtree).
+
+Каждый объект поддерева попадает ровно в одну часть. Дочерний объект не может считаться листом: атрибут
+msDS-Approx-Immed-Subordinates приблизителен (OU с вложенными объектами может вернуть 0), а вложенные объекты бывают
+и у объектов, не являющихся контейнерами (msFVE-RecoveryInformation у компьютера). Поэтому частью subtree становится
+каждый дочерний объект, а число вложенных объектов используется только для порядка исполнения частей.
+Если дочерних объектов больше MAX_PARTITIONS, поддерево ищется одной частью
+"""
+import threading
+from typing import Callable
+
+# Атрибуты, запрашиваемые для дочерних объектов области поиска
+CHILD_PROPERTIES = ["distinguishedName", "msDS-Approx-Immed-Subordinates"]
+
+# Наибольшее число частей subtree: при большем числе дочерних объектов (например, плоская OU пользователей)
+# отдельный поиск на каждый объект дороже выгоды от параллельного исполнения
+MAX_PARTITIONS = 256
+
+
+def raw_page(func: Callable, objects: list[dict], properties: list, properties_shadow: list) -> list[dict]:
+    """Страница без конвертации (передаётся как decoder в iter_search_object)"""
+    return objects
+
+
+def _subordinates(data: dict) -> int:
+    """Приблизительное число вложенных объектов (0, если сервер его не вернул)"""
+    subordinates = data.get("msDS-Approx-Immed-Subordinates")
+    return int(subordinates[0]) if subordinates else 0
+
+
+def plan_partitions(search_base: str, children: list[dict]) -> list[tuple[str, str]]:
+    """
+    Функция формирования частей поиска: список (область поиска, глубина поиска)
+
+    Args:
+        search_base: Область поиска
+        children: Дочерние объекты области поиска в исходном виде (атрибуты CHILD_PROPERTIES)
+    """
+    if len(children) > MAX_PARTITIONS:
+        return [(search_base, "subtree")]
+
+    # Вероятно большие части исполняются первыми
+    children = sorted(children, key=_subordinates, reverse=True)
+    partitions = [(data["distinguishedName"][0].decode("utf-8"), "subtree") for data in children]
+    return partitions + [(search_base, "base")]
+
+
+class PartitionQueue:
+    """Очередь частей поиска, общая для параллельных сессий"""
+
+    def __init__(self, partitions: list[tuple[str, str]]):
+        # Сначала исполняются части subtree (они больше), часть base - последней
+        self._items = sorted(partitions, key=lambda i: i[1] != "subtree")
+        self._lock = threading.Lock()
+
+    def get(self) -> tuple[str, str] | None:
+        """Следующая часть или None, если части закончились"""
+        with self._lock:
+            return self._items.pop(0) if self._items else None
+
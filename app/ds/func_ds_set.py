@@ -10,6 +10,7 @@ from datetime import datetime
 from .data import DS_TYPE_OBJECT_SYSTEM
 from .ds_dict import DSDict
 from .func_ds_get import search_object, gen_filter_to_id
+from .ds_changes import notify_change
 from .func_ds_gen import gen_uac, gen_gt, gen_change_pwd_at_logon, gen_account_exp_date
 from .convertors_value import convert_value
 
@@ -119,7 +120,8 @@ def ds_set(connect, _logger, type_object: DS_TYPE_OBJECT_SYSTEM, dry_run: bool,
         search_base=base,
         properties=[k for (_, k, _) in list_object] + special_attr,
         type_object=type_object,
-        only_one=True
+        only_one=True,
+        lazy=True
     )[0]
 
     # С учётом полученных результатов, специальные атрибуты обрабатываются исходя из исходных значений
@@ -164,5 +166,6 @@ def ds_set(connect, _logger, type_object: DS_TYPE_OBJECT_SYSTEM, dry_run: bool,
 
     if not dry_run:
         connect.modify_s(result['distinguishedName'], list_object)
+        notify_change(result['distinguishedName'])
     else:
         _logger.warning("Enabled dry run")
@@ -6,6 +6,7 @@ import ldap
 from .data import DS_ACTION_MEMBER
 from .ds_dict import DSDict
 from .func_ds_get import search_object, gen_filter_to_id
+from .ds_changes import notify_change
 
 
 def ds_set_member(connect, _logger, dry_run: bool, base: str,
@@ -45,6 +46,7 @@ def ds_set_member(connect, _logger, dry_run: bool, base: str,
             properties=['distinguishedName'],
             type_object='group',
             only_one=True,
+            lazy=True,
         )[0]
 
     # Если член группы передан как строка, он конвертируется в массив
@@ -77,6 +79,7 @@ def ds_set_member(connect, _logger, dry_run: bool, base: str,
                 properties=['distinguishedName', 'objectClass'],
                 type_object='member',
                 only_one=True,
+                lazy=True,
             )[0]
             members_id.append(s_object['distinguishedName'])
 
@@ -104,6 +107,8 @@ def add_member(connect, _logger, group: str, member: str, dry_run: bool):
             connect.modify_s(group, [(ldap.MOD_ADD, 'member', [member.encode("utf-8")])])
         except ldap.ALREADY_EXISTS:
             _logger.debug("Object already in group")
+        # Изменяется и атрибут memberOf члена группы
+        notify_change(group, member)
     else:
         _logger.warning("Enabled dry run")
 
@@ -131,5 +136,6 @@ def remove_member(connect, _logger, group: str, member: str, dry_run: bool):
             _logger.debug("User not found in group")
         except ldap.UNWILLING_TO_PERFORM:
             _logger.warning("UNWILLING_TO_PERFORM - Object not in group")
+        notify_change(group, member)
     else:
         _logger.warning("Enabled dry run")
@@ -1,5 +1,6 @@
 import os
 import sys
+import asyncio
 import importlib
 
 from fastapi import FastAPI, Request
@@ -9,10 +10,26 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from app.systems.config import AppConfig
 from app.systems.logging import logger, s_id_ctx_var, setup_logging
+from app.moduls.json_encoder import set_serializer
+from app.moduls.process_pool import configure_processes, start_processes
+from app.moduls.compression import set_compression
+from app.ds.ds_search_base import set_root_dse_ttl, warm_capabilities
 
 # Настройка root'ового logging, для перехвата всех данных выводимых в логгер
 setup_logging()
 
+# Выбор сериализатора ответов присосок
+set_serializer(AppConfig.APP__SERIALIZER)
+
+# Выбор разрешённых кодировок сжатия ответов присосок
+set_compression(AppConfig.APP__COMPRESSION)
+
+# Число процессов пула для присосок, нагружающих CPU
+configure_processes(AppConfig.APP__PROCESSES)
+
+# Время жизни кэша rootDSE контроллеров домена
+set_root_dse_ttl(AppConfig.APP__ROOT_DSE_TTL)
+
 # Если в конфигурации есть запуск SCHEDULERS, то инициализируется приложение
 if any([AppConfig.SCHEDULERS__ENABLED, AppConfig.SCHEDULERS_DS__ENABLED]):
     scheduler = AsyncIOScheduler(
@@ -25,6 +42,14 @@ if any([AppConfig.SCHEDULERS__ENABLED, AppConfig.SCHEDULERS_DS__ENABLED]):
     )
 
 
+def warm_transit_hosts():
+    """Заполнение кэша rootDSE для контроллеров домена, указанных в [schedulers_ds][TRANSIT]"""
+    for transit in AppConfig.SCHEDULERS_DS__TRANSIT.values():
+        hosts = transit.get('host') or []
+        hosts = hosts.split(',') if isinstance(hosts, str) else hosts
+        warm_capabilities([host.strip() for host in hosts if host.strip()], port=transit.get('port') or 636)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(f"  COMPOSITION__ENABLED: {AppConfig.COMPOSITION__ENABLED}")
@@ -33,6 +58,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"   SCHEDULERS__ENABLED: {AppConfig.SCHEDULERS__ENABLED}")
     logger.info(f"SCHEDULERS_DS__ENABLED: {AppConfig.SCHEDULERS_DS__ENABLED}")
 
+    # Процессы пула создаются через fork, поэтому запускаются до первых потоков приложения
+    start_processes()
+
     # Блок настройки NGINX-файла
     if AppConfig.WEB__NGINX_FILE:
         logger.info(f"Generate NGINX Conf: {AppConfig.WEB__NGINX_FILE}")
@@ -59,6 +87,12 @@ async def lifespan(app: FastAPI):
     else:
         logger.info(f"Skip Generate NGINX Conf")
 
+    # Кэширование rootDSE выполняется в фоне, запуск приложения его не ожидает.
+    # Ссылка на задачу хранится до остановки приложения, иначе задача может быть удалена сборщиком мусора
+    warm_task = None
+    if AppConfig.SCHEDULERS_DS__TRANSIT and any([AppConfig.SUCKERS_DS__ENABLED, AppConfig.SCHEDULERS_DS__ENABLED]):
+        warm_task = asyncio.create_task(asyncio.to_thread(warm_transit_hosts))
+
     # Блок включения приложения
 
     # Если шедуллер активен
@@ -80,6 +114,10 @@ async def lifespan(app: FastAPI):
     else:
         yield  # Запуск самого FastAPI
 
+    # Ошибки кэширования только логируются (см. warm_capabilities)
+    if warm_task:
+        await warm_task
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -114,9 +152,9 @@ if AppConfig.SUCKERS__ENABLED:
 if AppConfig.SUCKERS_DS__ENABLED:
     from app.sites.ds import router_ds
 
-    for i in ["add_group_member", "get_computer", "get_contact", "get_group", "get_group_member", "get_object",
-              "get_user", "move_object", "new_contact", "new_group", "new_user", "remove_computer", "remove_contact",
-              "remove_group", "remove_group_member", "remove_object", "remove_user", "rename_object",
+    for i in ["add_group_member", "batch", "get_computer", "get_contact", "get_group", "get_group_member",
+              "get_object", "get_user", "move_object", "new_contact", "new_group", "new_user", "remove_computer",
+              "remove_contact", "remove_group", "remove_group_member", "remove_object", "remove_user", "rename_object",
               "set_account_password", "set_account_unlock", "set_computer", "set_contact", "set_group", "set_object",
               "set_user"]:
         importlib.import_module(f"app.sites.ds.{i}")
@@ -20,7 +20,7 @@ def permission_user(permission: list[str]):
     async def checker(user=Depends(get_current_user)):
         try:
             with DSHook(login=user['tent_login'], password=user['tent_pass'],
-                        base=AppConfig.SECURITY__BASE, host=AppConfig.SECURITY__HOST) as ds:
+                        base=AppConfig.SECURITY__BASE, host=AppConfig.SECURITY__HOST, lazy=True) as ds:
                 l_user = ds.get_object(
                     ldap_filter=f"(&(objectCategory=person)(objectClass=user)(userPrincipalName=%s)(|%s))"
                                 % (user['tent_login'], ''.join([f'(memberOf={i})' for i in permission])),
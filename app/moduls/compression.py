@@ -0,0 +1,133 @@
+"""
+Сжатие ответа присосок при стриминге, выбираемое клиентом через заголовок Accept-Encoding.
+
+Каждая отправленная часть ответа дожимается до границы блока (flush), поэтому клиент сразу получает
+и части результата, и точки ожидания, а соединение не разрывается по таймауту.
+- gzip - стандартная библиотека zlib;
+- zstd - если установлен пакет zstandard.
+"""
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstandard не является обязательной зависимостью
+    zstandard = None
+
+
+class GzipEncoder:
+    """Сжатие gzip"""
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        """Сжатие части ответа с дожатием до границы блока"""
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Завершение сжатого потока"""
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class ZstdEncoder:
+    """Сжатие zstd"""
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Кодировки в порядке предпочтения, если клиент не указал приоритет
+ENCODERS = {
+    ZstdEncoder.name: ZstdEncoder,
+    GzipEncoder.name: GzipEncoder,
+}
+
+
+# Разрешённые кодировки (по умолчанию ответы не сжимаются, см. set_compression)
+_allowed = []
+
+
+def set_compression(names: str | list[str] | None) -> None:
+    """
+    Выбор разрешённых кодировок сжатия ответов присосок
+
+    Args:
+        names: Список кодировок (строкой через запятую или списком). Если пусто, ответы не сжимаются
+    """
+    global _allowed
+
+    names = [i.strip().lower() for i in names.split(',') if i.strip()] if isinstance(names, str) else list(names or [])
+    for name in names:
+        if name not in ENCODERS:
+            raise ValueError(f"Unknown compression: {name}")
+    _allowed = names
+
+
+def available_encodings() -> list[str]:
+    """Список разрешённых кодировок, для которых установлены зависимости"""
+    return [name for name in ENCODERS if name in _allowed and (name != ZstdEncoder.name or zstandard is not None)]
+
+
+def negotiate_encoding(accept_encoding: str | None):
+    """
+    Выбор сжатия по заголовку Accept-Encoding (с учётом q-параметров). Если сжатие не подходит, возвращается None
+
+    Args:
+        accept_encoding: Значение заголовка Accept-Encoding
+    """
+    if not accept_encoding:
+        return None
+
+    available = available_encodings()
+
+    # Приоритет каждой кодировки. "*" задаёт приоритет кодировок, которые не указаны явно
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, *params = [i.strip() for i in part.split(';')]
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        weights[name.lower()] = q
+
+    candidates = [(-weights.get(name, weights.get('*', 0.0)), index, name) for index, name in enumerate(available)]
+    candidates = [i for i in candidates if i[0] < 0]
+
+    if not candidates:
+        return None
+    return ENCODERS[min(candidates)[2]]()
+
+
+async def compress_stream(stream, encoder):
+    """
+    Сжатие стриминга ответа. Каждая часть отправляется сразу после сжатия
+
+    Args:
+        stream: Асинхронный генератор частей ответа (str или bytes)
+        encoder: Объект сжатия (GzipEncoder или ZstdEncoder)
+    """
+    try:
+        async for chunk in stream:
+            yield encoder.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        yield encoder.finish()
+    finally:
+        # Если стриминг прерван, исходный генератор закрывается сразу (исполняются его блоки finally)
+        await stream.aclose()
+
+
+def client_accept_encoding() -> str:
+    """Значение Accept-Encoding для клиентов Тентакли на httpx (zstd распаковывается, если установлен zstandard)"""
+    return "zstd, gzip" if zstandard is not None else "gzip"
@@ -1,8 +1,20 @@
 """
 Функция преобразования данных Python в совместимые с JSON-форматом данные
+
+Сериализация ответов присосок выполняется за один проход через выбранный бэкенд:
+- orjson - если библиотека установлена (нативная скорость);
+- json - стандартная библиотека (используется, если orjson не установлен или не смог преобразовать значение).
 """
+import json
 from datetime import datetime, date
-from app.ds import DSDict
+
+from app.ds import DSDict, DSResultSet
+
+try:
+    import orjson
+except ImportError:  # orjson не является обязательной зависимостью
+    orjson = None
+
 
 def json_encoder(obj):
     """Функция конвертации значений в подходящий для JSON формата"""
@@ -21,4 +33,111 @@ def json_encoder(obj):
     if isinstance(obj, DSDict):
         return obj.original_dict()
 
-    raise TypeError(repr(obj) + " is not JSON serializable")
\ No newline at end of file
+    if isinstance(obj, DSResultSet):
+        return [json_encoder(v) for v in obj.records()]
+
+    raise TypeError(repr(obj) + " is not JSON serializable")
+
+
+def _default(obj):
+    """
+    Преобразование значений, которые бэкенд не умеет сериализовать сам.
+    Вызывается бэкендом только для таких значений, поэтому копия всего дерева не создаётся
+    """
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+
+    # orjson читает хранилище словаря напрямую (ключи в нижнем регистре), поэтому DSDict передаётся с исходными ключами
+    if isinstance(obj, DSDict):
+        return dict(obj.items())
+
+    # Результат по столбцам сериализуется обычными словарями, объекты DSDict не создаются
+    if isinstance(obj, DSResultSet):
+        return obj.records()
+
+    # Наследники базовых типов (при OPT_PASSTHROUGH_SUBCLASS)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, list):
+        return list(obj)
+
+    raise TypeError(repr(obj) + " is not JSON serializable")
+
+
+class JSONSerializer:
+    """Сериализатор на основе стандартной библиотеки json"""
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        """Преобразование значения в JSON"""
+        return json.dumps(obj, default=_default, separators=(',', ':')).encode("utf-8")
+
+    def dumps_items(self, items: list | tuple) -> bytes:
+        """Преобразование элементов списка в JSON, разделённый запятыми, без открывающей и закрывающей скобок"""
+        return self.dumps(items)[1:-1]
+
+
+class ORJSONSerializer(JSONSerializer):
+    """Сериализатор на основе orjson. Значения, которые orjson не может преобразовать, передаются в json"""
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("orjson is not installed")
+        self._option = orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_default, option=self._option)
+        except orjson.JSONEncodeError:
+            # Например, целое число больше 64 бит
+            return super().dumps(obj)
+
+
+# Доступные сериализаторы
+SERIALIZERS = {
+    JSONSerializer.name: JSONSerializer,
+    ORJSONSerializer.name: ORJSONSerializer,
+}
+
+# Сериализатор по умолчанию: самый быстрый из установленных
+_serializer = ORJSONSerializer() if orjson else JSONSerializer()
+
+
+def set_serializer(name: str | None = None) -> None:
+    """
+    Выбор сериализатора ответов присосок
+
+    Args:
+        name: Имя сериализатора ("json" или "orjson"). Если не указан, выбирается самый быстрый из установленных
+    """
+    global _serializer
+
+    if not name:
+        _serializer = ORJSONSerializer() if orjson else JSONSerializer()
+    elif name in SERIALIZERS:
+        _serializer = SERIALIZERS[name]()
+    else:
+        raise ValueError(f"Unknown serializer: {name}")
+
+
+def get_serializer() -> JSONSerializer:
+    """Получение текущего сериализатора"""
+    return _serializer
+
+
+def dumps(obj) -> bytes:
+    """Преобразование значения в JSON текущим сериализатором"""
+    return _serializer.dumps(obj)
+
+
+def dumps_items(items: list | tuple) -> bytes:
+    """Преобразование элементов списка в JSON текущим сериализатором (без открывающей и закрывающей скобок)"""
+    return _serializer.dumps_items(items)
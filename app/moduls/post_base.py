@@ -1,32 +1,281 @@
 """
 Функция создания эндпоинтов в виде готовых Присосок, с учётом всей специфики работы Тентакли
 """
-import json
+import time
+import inspect
+import functools
+import contextvars
+import threading
 from typing import Callable, Union, Type
 
 import asyncio
 from pydantic import BaseModel
 from fastapi import APIRouter, status, Depends, Request
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
+from app.ds import CancelToken, DSResultSet, cancel_token_ctx_var
 from app.moduls.auth import get_current_user
 from app.systems.logging import logger
-from app.moduls.json_encoder import json_encoder
+from app.moduls.response_format import JSONFormat, negotiate, format_ctx_var
+from app.moduls.process_pool import Prepared, PreparedList, run_prepared, require_processes
+from app.moduls.compression import negotiate_encoding, compress_stream
+from app.moduls import single_flight
+from app.moduls.response_cache import ResponseCache
+from app.moduls.worker_pool import WorkerPool, PoolSlot, PoolOverloaded, slot_ctx_var
 
 STEP = 1500  # Общая переменная шага для списков, которые будут возвращены
-BEFORE_ANSWERING = 150  # Количество токенов, которое должно быть отсчитано, прежде чем сервер пошлёт сообщение
-# Токены истекают каждую 0.1 секунды
+HEARTBEAT = 15.0  # Интервал в секундах, через который отправляется точка, пока функция эндпоинта исполняется
+# Интервал должен быть меньше proxy_read_timeout у NGINX (32s), иначе соединение будет разорвано
 
 # Допустимые типы данных, которые могут быть возвращены эндпоинтом
 ReturnType = Union[int, str, float, list, tuple, dict, bool, None]
 
+# Указатель завершения генератора присоски
+_END = object()
+
+# Параметры исполнения присосок, назначенные для всего APIRouter
+_ROUTER_OPTIONS: dict[APIRouter, dict] = {}
+
+
+def configure_router(router: APIRouter, heartbeat: float | None = None, workers: int | None = None,
+                     queue_size: int = 0, queue_timeout: float = 0, name: str | None = None) -> None:
+    """
+    Функция назначения параметров исполнения для всех присосок APIRouter.
+    Вызывается до create_post, значения применяются к эндпоинтам, созданным после вызова
+
+    Args:
+        router: APIRouter
+        heartbeat: Интервал в секундах между точками ожидания (если None, используется HEARTBEAT)
+        workers: Число потоков собственного пула APIRouter. Если None, присоски исполняются в общем пуле asyncio
+        queue_size: Число запросов, которые могут ожидать свободного потока пула
+        queue_timeout: Время ожидания свободного потока в секундах (0 - без ограничения)
+        name: Имя пула (выводится в статистике и в именах потоков). Если None, берётся prefix APIRouter (root)
+    """
+    pool = None
+    if workers:
+        pool = WorkerPool(name=name or router.prefix.replace('/', '') or 'root', workers=workers,
+                          queue_size=queue_size, queue_timeout=queue_timeout)
+
+    _ROUTER_OPTIONS[router] = {'heartbeat': heartbeat, 'pool': pool}
+
+
+def _run(slot: PoolSlot | None, func: Callable, /, *args, **kwargs) -> asyncio.Future:
+    """Исполнение функции в потоке: в пуле APIRouter, если слот получен, иначе в общем пуле asyncio"""
+    if slot:
+        return slot.run(func, *args, **kwargs)
+    return asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(contextvars.copy_context().run, func, *args, **kwargs))
+
+
+def _next_chunk(iterator, slot: PoolSlot | None = None) -> asyncio.Future:
+    """Запуск получения следующей части результата из генератора присоски"""
+    if inspect.isasyncgen(iterator):
+        return asyncio.ensure_future(anext(iterator, _END))
+    return _run(slot, next, iterator, _END)
+
+
+def _close_iterator(iterator) -> None:
+    """
+    Закрытие генератора присоски, если стриминг был прерван. При закрытии генератора исполняются его блоки finally
+    (например, закрывается сессия с DS). Генератор закрывается в отдельном потоке, так как в момент прерывания
+    он может ещё исполняться
+    """
+    if inspect.isasyncgen(iterator):
+        asyncio.ensure_future(iterator.aclose())
+        return
+
+    def close():
+        while True:
+            try:
+                iterator.close()
+                return
+            except ValueError:  # Генератор ещё исполняется в другом потоке
+                time.sleep(0.1)
+
+    threading.Thread(target=close, daemon=True).start()
+
+
+async def _wait_task(task: asyncio.Future, heartbeat: float, beat: str):
+    """
+    Ожидание завершения задания. Ожидание завершается сразу, как только задание исполнилось.
+    Если за интервал heartbeat задание не исполнилось, возвращается beat
+    """
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=heartbeat)
+        if done:
+            return
+        yield beat
+
+
+async def _replay(body: bytes):
+    """Отправка сохранённого ответа"""
+    yield body
+
+
+async def stream_result(s_func: Callable, s_param: dict | None, heartbeat: float = HEARTBEAT, fmt=None,
+                        slot: PoolSlot | None = None, processes: bool = False,
+                        on_success: Callable[[], None] | None = None):
+    """
+    Функция стриминга ответа клиенту.
+    Стримится один большой ответ, в рамках которого и получен ли успешный ответ в рамках запроса.
+    Если функция генератор (обычный или асинхронный), каждая полученная часть сразу отправляется в массив details.
+    Часть-список добавляется в массив поэлементно (например, страница объектов из DS)
+
+    Args:
+        s_func: Функция для исполнения
+        s_param: Входные параметры функции
+        heartbeat: Интервал в секундах между точками ожидания
+        fmt: Формат ответа из app.moduls.response_format (если None, используется исходный JSON)
+        slot: Слот пула APIRouter. Освобождается после завершения стриминга
+        processes: Исполнение функции и сериализация результата в пуле процессов (см. app.moduls.process_pool)
+        on_success: Вызывается перед окончанием ответа, если функция исполнена без ошибки (например, для кэша ответов)
+    """
+    fmt = fmt or JSONFormat()
+    # Формат ответа доступен в потоке присоски (например, для конвертации страниц DS в пуле процессов)
+    format_ctx_var.set(fmt.name)
+    # Токен отмены доступен в потоке присоски: DSHook прерывает поиск в DS, если клиент отключился
+    cancel_token = CancelToken()
+    cancel_token_ctx_var.set(cancel_token)
+    # Слот пула доступен асинхронной присоске: её блокирующие вызовы исполняются в потоках своего APIRouter
+    slot_ctx_var.set(slot)
+
+    try:
+        logger.info("======Function======")
+        # Отправляется объявление словаря и ключа для отправки точки, пока на эндпоинте идёт обработка
+        yield fmt.head()
+
+        s_result = None
+        task = None
+        iterator = None
+        try:
+            if inspect.isasyncgenfunction(s_func):
+                iterator = s_func(**s_param) if s_param else s_func()
+                task = _next_chunk(iterator, slot)
+            elif processes:
+                task = _run(slot, run_prepared, s_func, s_param, fmt.name, STEP)
+            else:
+                task = _run(slot, s_func, **(s_param or {}))
+
+            # Исполнение функции эндпоинта в фоновом режиме
+            async for beat in _wait_task(task, heartbeat, fmt.beat()):
+                yield beat
+            s_result = task.result()
+
+            # Если функция вернула генератор, ожидается получение его первой части
+            if inspect.isgenerator(s_result):
+                iterator = s_result
+                task = _next_chunk(iterator, slot)
+                async for beat in _wait_task(task, heartbeat, fmt.beat()):
+                    yield beat
+                s_result = task.result()
+
+            # Если функция исполнена в процессе, уже сериализованные части отправляются как части генератора
+            if isinstance(s_result, PreparedList):
+                iterator = (chunk for chunk in s_result)
+                s_result = next(iterator, _END)
+
+            error = False
+        # Перехват события дисконнекта клиента
+        except asyncio.CancelledError:
+            logger.warning("StreamingResponse was cancelled: client/proxy disconnected")
+            # Отмена задания
+            cancel_token.cancel()
+            if task:
+                task.cancel()
+            if iterator is not None:
+                _close_iterator(iterator)
+            raise RuntimeError("StreamingResponse was cancelled: client/proxy disconnected")
+        except Exception as e:
+            logger.warning(f"Stream interrupted: {e}")
+            s_result = e
+            error = True
+
+        # Если функция генератор, части отправляются по мере их получения
+        if iterator is not None and not error:
+            # Конец блока waiting и начало массива. Указатель ошибки передаётся после всех частей,
+            # так как ошибка может возникнуть во время их получения
+            yield fmt.stream_begin()
+
+            count = 0
+            finished = False
+            try:
+                while s_result is not _END:
+                    # Часть, уже сериализованная в формат ответа (в пуле процессов), отправляется без изменений
+                    if isinstance(s_result, Prepared):
+                        if s_result.count:
+                            yield fmt.separator(first=not count) + s_result
+                            count += s_result.count
+                        s_result = []
+
+                    items = s_result if isinstance(s_result, (list, DSResultSet)) else [s_result]
+
+                    for l in range(0, len(items), STEP):
+                        yield fmt.list_items(items[l:l + STEP], first=not count)
+                        count += len(items[l:l + STEP])
+
+                    task = _next_chunk(iterator, slot)
+                    # Пока часть не получена, поддерживается соединение (в JSON - пробел внутри массива)
+                    async for beat in _wait_task(task, heartbeat, fmt.list_beat()):
+                        yield beat
+                    s_result = task.result()
+
+                finished = True
+                yield fmt.stream_end()  # конец массива и указатель ошибки
+            except asyncio.CancelledError:
+                logger.warning("StreamingResponse was cancelled: client/proxy disconnected")
+                cancel_token.cancel()
+                task.cancel()
+                raise RuntimeError("StreamingResponse was cancelled: client/proxy disconnected")
+            except Exception as e:
+                # Ошибка после начала отправки массива: клиент получит ошибку вместо результата
+                logger.warning(f"Stream interrupted: {e}")
+                finished = True
+                error = True
+                yield fmt.stream_error(str(e))
+            finally:
+                if not finished:
+                    _close_iterator(iterator)
+
+        else:
+            # Конец блока waiting, ключ успешной или не успешной завершённости функции эндпоинта
+            # и открытие блока для результата исполнения запроса на эндпоинте
+            yield fmt.status(error)
+
+            # Если будет список с элементами больше чем STEP, то он будет отправляться по частям
+            if isinstance(s_result, (list, DSResultSet)):
+                yield fmt.list_begin()  # начало массива
+
+                for l in range(0, len(s_result), STEP):
+                    yield fmt.list_items(s_result[l:l + STEP], first=not l)
+
+                yield fmt.list_end()  # конец массива
+
+            else:
+                yield fmt.value(s_result)
+
+        if on_success and not error:
+            on_success()
+
+        yield fmt.tail()
+        logger.info("======End======")
+    finally:
+        # Если стриминг прерван, незавершённые операции с DS прерываются
+        cancel_token.cancel()
+        # Слот пула освобождается, когда исполнятся все переданные в пул задания
+        if slot:
+            slot.close()
+
 
 def create_post(router: APIRouter,
                 endpoint: str, func: Callable, base_model: Type[BaseModel] | None = None,
-                access: list[str] = None) -> None:
+                access: list[str] = None, heartbeat: float | None = None, admission: bool = True,
+                processes: bool = False, coalesce: bool = False, cache: ResponseCache | None = None) -> None:
     """
     Функция генерации присосок.
     Если присоска предполагает возращение списка, он будет возращён частями, если элементов больше 1500 (по умолчанию).
+    Если функция присоски генератор (обычный или асинхронный), каждая часть отправляется клиенту сразу после получения.
+    Формат ответа выбирается клиентом через заголовок Accept (см. app.moduls.response_format).
 
     Args:
         endpoint: Имя эндпоинта. Может быть либо /, либо без указания глубины (дополнительного использования /)
@@ -34,6 +283,15 @@ def create_post(router: APIRouter,
         func: Функция для исполнения
         router: APIRouter
         access: Список ID-клиентов, которые могут быть воспользоваться эндпоинтом (используется если включена аутентификация)
+        heartbeat: Интервал в секундах между точками ожидания. Если не указан, берётся из configure_router или HEARTBEAT
+        admission: Исполнение в пуле APIRouter (см. configure_router). Если False, присоска исполняется
+            в общем пуле asyncio и не ожидает очереди (например, присоска мониторинга)
+        processes: Исполнение функции и сериализация результата в пуле процессов (для присосок, нагружающих CPU).
+            Функция должна быть объявлена на уровне модуля, генератор исполняется в процессе полностью
+        coalesce: Объединение одинаковых одновременных запросов (см. app.moduls.single_flight). Запросы с теми же
+            входными данными и форматом ответа, полученные во время исполнения, получают тот же ответ.
+            Только для присосок, которые не изменяют данные
+        cache: Кэш ответов (см. app.moduls.response_cache). Только для присосок, которые не изменяют данные
     """
 
     if '/' == endpoint:
@@ -47,6 +305,17 @@ def create_post(router: APIRouter,
 
     route_name = router.prefix.replace('/', '')
 
+    # Интервал точек ожидания: явно переданный, затем назначенный для APIRouter, затем по умолчанию
+    if heartbeat is None:
+        heartbeat = _ROUTER_OPTIONS.get(router, {}).get('heartbeat') or HEARTBEAT
+
+    pool = _ROUTER_OPTIONS.get(router, {}).get('pool') if admission else None
+
+    if processes and inspect.isasyncgenfunction(func):
+        raise ValueError(f"Асинхронный генератор не может быть исполнен в пуле процессов: {endpoint}")
+    if processes:
+        require_processes()
+
     def create_handler():
         """Функция создания функции для эндпоинта"""
 
@@ -54,71 +323,6 @@ def create_post(router: APIRouter,
                                         user=Depends(get_current_user(access))):
             """Функция исполняющаяся внутри эндпоинта"""
 
-            async def stream_result(s_func, s_param):
-                """
-                Функция стриминга ответа клиенту.
-                Стримится один большой JSON, в рамках которого и получен ли успешный ответ в рамках запроса
-                """
-                logger.info("======Function======")
-                # Отправляется объявление словаря и ключа для отправки точки, пока на эндпоинте идёт обработка
-                yield '{"waiting": "'
-
-                s_result = None
-                try:
-                    if s_param:
-                        task = asyncio.create_task(asyncio.to_thread(s_func, **s_param))
-                    else:
-                        task = asyncio.create_task(asyncio.to_thread(s_func))
-
-                    # Исполнение функции эндпоинта в фоновом режиме и проверка каждые 100 мс исполнилась ли функция
-                    # Если все BEFORE_ANSWERING будут потрачены, то будет отправлена точка
-                    pause_active = BEFORE_ANSWERING
-                    while not task.done():
-                        await asyncio.sleep(0.1)
-                        pause_active -= 1
-
-                        if pause_active <= 0:
-                            pause_active = BEFORE_ANSWERING
-                            yield '.'
-
-                    s_result = await task
-                    error = False
-                # Перехват события дисконнекта клиента
-                except asyncio.CancelledError:
-                    logger.warning("StreamingResponse was cancelled: client/proxy disconnected")
-                    # Отмена задания
-                    task.cancel()
-                    raise RuntimeError("StreamingResponse was cancelled: client/proxy disconnected")
-                except Exception as e:
-                    logger.warning(f"Stream interrupted: {e}")
-                    s_result = e
-                    error = True
-
-                # Конец блока waiting, ключ успешной или не успешной завершённости функции эндпоинта
-                # и открытие блока для результата исполнения запроса на эндпоинте
-                yield f'", "error": {str(error).lower()}, "details": '
-
-                # Если будет список с элементами больше чем STEP, то он будет отправляться по частям
-                if isinstance(s_result, list):
-                    yield "["  # начало массива
-
-                    for l in range(0, len(s_result), STEP):
-                        end = l + STEP
-                        split = ',' if end <= len(s_result) else ''
-                        yield ','.join([json.dumps(json_encoder(i)) for i in s_result[l:end]]) + split
-
-                    yield "]"  # конец массива
-
-                elif s_result is None:
-                    yield "null"
-                elif isinstance(s_result, dict):
-                    yield json.dumps(json_encoder(s_result))
-                else:
-                    yield str(json.dumps(str(s_result), ensure_ascii=False))
-
-                yield "}"
-                logger.info("======End======")
-
             # Основная функция исполнения эндпоинта
             try:
                 # Преобразование полученных значений если они были переданы
@@ -129,14 +333,65 @@ def create_post(router: APIRouter,
                 else:
                     input_dada = None
 
+                # Формат ответа выбирается по заголовку Accept (по умолчанию исходный JSON)
+                fmt = negotiate(request.headers.get('accept'))
+
+                key = None
+                if coalesce or cache:
+                    key = single_flight.flight_key(f"{router.prefix}{endpoint}", fmt.name, input_dada)
+
+                # Ответ из кэша отправляется сразу. Если такой же запрос уже исполняется, клиент подключается к нему.
+                # В обоих случаях поток пула не занимается
+                body = cache.get(key) if cache else None
+                stream = _replay(body) if body is not None else None
+                if stream is None and coalesce:
+                    stream = single_flight.join(key)
+                slot = None
+
+                if stream is None:
+                    # Ожидание свободного потока в пуле APIRouter. Если очередь заполнена, клиент сразу получает 503
+                    slot = await pool.acquire() if pool else None
+
+                    # За время ожидания такой же запрос мог быть уже запущен
+                    stream = single_flight.join(key) if coalesce else None
+                    if stream is not None and slot:
+                        slot.close()
+                        slot = None
+
+                if stream is None:
+                    recorder = cache.recorder(key, input_dada) if cache else None
+                    stream = stream_result(func, input_dada, heartbeat=heartbeat, fmt=fmt, slot=slot,
+                                           processes=processes, on_success=recorder.success if recorder else None)
+                    if recorder:
+                        stream = recorder.record(stream)
+                    if coalesce:
+                        # Стриминг исполняется отдельно от клиента и сам освобождает слот после завершения
+                        stream = single_flight.start(key, stream)
+                        slot = None
+
+                headers = {
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no",
+                    "Vary": "Accept, Accept-Encoding",
+                }
+
+                # Сжатие ответа выбирается по заголовку Accept-Encoding. Каждая часть сжимается и отправляется сразу
+                encoder = negotiate_encoding(request.headers.get('accept-encoding'))
+                if encoder:
+                    stream = compress_stream(stream, encoder)
+                    headers["Content-Encoding"] = encoder.name
+
                 return StreamingResponse(
-                    stream_result(func, input_dada),
-                    media_type="text/event-stream",
-                    headers={
-                        "Cache-Control": "no-cache",
-                        "X-Accel-Buffering": "no",
-                    }
+                    stream,
+                    media_type=fmt.media_type,
+                    headers=headers,
+                    # Если стриминг так и не был начат (клиент отключился), слот освобождается после ответа
+                    background=BackgroundTask(slot.close) if slot else None
                 )
+            except PoolOverloaded as result:
+                logger.warning(f"Rejected: {result}")
+                return JSONResponse(content=str(result), status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    headers={"Retry-After": str(result.retry_after)})
             except Exception as result:
                 logger.error(f"ERROR: {result}")
                 return JSONResponse(content=str(result), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
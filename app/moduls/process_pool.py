@@ -0,0 +1,153 @@
+"""
+Исполнение присосок и конвертации страниц DS в пуле процессов.
+
+Конвертация объектов DS и сериализация больших ответов - работа на чистом Python, которая в потоках удерживает GIL
+и замедляет все остальные запросы того же воркера uvicorn. В пуле процессов такая работа исполняется параллельно,
+а в основной процесс возвращаются уже сериализованные байты (Prepared), которые сразу отправляются клиенту.
+
+Функции, передаваемые в пул, должны быть доступны для импорта (объявлены на уровне модуля).
+Код сессии (s_id_ctx_var) передаётся в процесс, поэтому логи процесса содержат ID запроса.
+
+Процессы создаются через fork, поэтому пул запускается при старте приложения (start_processes), пока в процессе
+ещё нет других потоков: fork процесса с потоками может оставить в дочернем процессе захваченные блокировки
+(логирование, python-ldap). Присоски, которые используют пул, отмечают это при импорте (require_processes)
+"""
+import os
+import inspect
+import threading
+import multiprocessing
+from typing import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+from app.ds import DSResultSet
+from app.systems.logging import s_id_ctx_var
+from app.moduls.response_format import get_format, format_ctx_var
+
+_EXECUTOR: ProcessPoolExecutor | None = None
+_WORKERS = 0  # Число процессов (0 - по числу ядер)
+_REQUIRED = False  # Пул используется присосками и запускается при старте приложения
+_LOCK = threading.Lock()
+
+
+class Prepared(bytes):
+    """Часть элементов списка, уже сериализованная в формат ответа (без разделителя)"""
+    format: str = None  # Имя формата ответа
+    count: int = 0  # Число элементов
+
+    @classmethod
+    def encode(cls, format_name: str, items: list) -> "Prepared":
+        """Сериализация части элементов списка в указанный формат ответа"""
+        prepared = cls(get_format(format_name).encode_items(items))
+        prepared.format = format_name
+        prepared.count = len(items)
+        return prepared
+
+
+class PreparedList(list):
+    """Результат присоски, исполненной в процессе: список сериализованных частей (Prepared)"""
+
+
+def configure_processes(workers: int = 0) -> None:
+    """
+    Назначение числа процессов пула. Вызывается до первого использования пула
+
+    Args:
+        workers: Число процессов. При 0 используется число ядер
+    """
+    global _WORKERS
+    _WORKERS = workers
+
+
+def require_processes() -> None:
+    """Отметка, что пул используется (вызывается при импорте присосок): процессы запускаются в start_processes"""
+    global _REQUIRED
+    _REQUIRED = True
+
+
+def start_processes() -> None:
+    """
+    Запуск процессов пула, если он используется. Вызывается при старте приложения (lifespan) до запуска потоков:
+    при fork все процессы пула создаются сразу при первой задаче
+    """
+    if _REQUIRED:
+        _get_executor().submit(os.getpid).result()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Пул процессов (создаётся при первом обращении, если не был запущен в start_processes)"""
+    global _EXECUTOR
+
+    with _LOCK:
+        if _EXECUTOR is None:
+            # fork: процессы получают уже загруженные пользовательские присоски и настроенное логирование
+            _EXECUTOR = ProcessPoolExecutor(max_workers=_WORKERS or os.cpu_count(),
+                                            mp_context=multiprocessing.get_context("fork"))
+        return _EXECUTOR
+
+
+def _call(s_id: str, func: Callable, args: tuple, kwargs: dict):
+    """Исполнение функции в процессе с кодом сессии родительского запроса"""
+    s_id_ctx_var.set(s_id)
+    return func(*args, **kwargs)
+
+
+def run_in_process(func: Callable, *args, **kwargs):
+    """
+    Исполнение функции в пуле процессов с ожиданием результата.
+    Вызывается из потока присоски, поэтому ожидание не блокирует цикл событий
+
+    Args:
+        func: Функция, доступная для импорта
+        args: Позиционные аргументы функции
+        kwargs: Именованные аргументы функции
+    """
+    return _get_executor().submit(_call, s_id_ctx_var.get(), func, args, kwargs).result()
+
+
+def _prepare_page(format_name: str, func: Callable, args: tuple) -> Prepared:
+    """Конвертация страницы и её сериализация в процессе"""
+    return Prepared.encode(format_name, func(*args))
+
+
+def page_decoder(func: Callable, *args) -> Prepared:
+    """
+    Конвертация страницы DS в пуле процессов. Передаётся в DSHook(page_decoder=...) внутри присоски,
+    тогда генераторы iter_* возвращают страницы, уже сериализованные в формат ответа текущего запроса
+
+    Args:
+        func: Функция конвертации страницы (decode_page)
+        args: Аргументы функции (объекты страницы и параметры конвертации)
+    """
+    return run_in_process(_prepare_page, format_ctx_var.get(), func, args)
+
+
+def _prepare_result(format_name: str, step: int, func: Callable, params: dict | None):
+    """
+    Исполнение присоски в процессе. Список (или части генератора) сериализуются в формат ответа частями по step,
+    остальные значения возвращаются как есть
+    """
+    result = func(**params) if params else func()
+
+    if not isinstance(result, (list, DSResultSet)) and not inspect.isgenerator(result):
+        return result
+
+    chunks = PreparedList()
+    for part in (result if inspect.isgenerator(result) else [result]):
+        items = part if isinstance(part, (list, DSResultSet)) else [part]
+        for l in range(0, len(items), step):
+            chunks.append(Prepared.encode(format_name, items[l:l + step]))
+    return chunks
+
+
+def run_prepared(func: Callable, params: dict | None, format_name: str, step: int):
+    """
+    Исполнение присоски в пуле процессов (режим create_post(processes=True)).
+    Генератор исполняется в процессе полностью, части отправляются клиенту после его завершения
+
+    Args:
+        func: Функция присоски, доступная для импорта
+        params: Входные параметры функции
+        format_name: Имя формата ответа
+        step: Число элементов списка в одной части
+    """
+    return run_in_process(_prepare_result, format_name, step, func, params)
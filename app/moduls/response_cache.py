@@ -0,0 +1,211 @@
+"""
+Кэш ответов присосок, которые только читают данные.
+
+Ответ сохраняется целиком в уже сериализованном виде (байты формата ответа) и повторно отправляется клиенту,
+если тот же запрос (те же входные данные, включая учётные данные, и тот же формат) получен до истечения TTL.
+Размер кэша ограничен числом записей и общим размером в байтах, при превышении удаляются давно не использованные
+записи (LRU). Ответы с ошибкой не сохраняются.
+
+Записи сбрасываются при изменении объектов через DSHook этого же экземпляра Тентакли (app.ds.add_change_listener):
+удаляются записи, область поиска которых содержит изменённый объект или в ответе которых он упоминается.
+"""
+import json
+import time
+import threading
+from typing import Callable
+from collections import OrderedDict
+
+from app.ds import add_change_listener
+
+# Все созданные кэши, для вывода статистики
+_CACHES: list["ResponseCache"] = []
+
+
+def _in_scope(dn: str, scope: str) -> bool:
+    """Объект находится в области каталога (сама область или вложенный объект). Значения приведены к casefold"""
+    return dn == scope or dn.endswith(f",{scope}")
+
+
+class _Entry:
+    __slots__ = ("body", "expires", "scope", "_text")
+
+    def __init__(self, body: bytes, expires: float, scope: str | None):
+        self.body = body
+        self.expires = expires
+        self.scope = scope.casefold() if scope else None
+        self._text = None
+
+    def text(self) -> str:
+        """Текст ответа для поиска изменённых объектов. Формируется только при изменениях в DS"""
+        if self._text is None:
+            self._text = self.body.decode("utf-8", errors="ignore").casefold()
+        return self._text
+
+    def touched(self, dns: list[str]) -> bool:
+        """Изменение затрагивает ответ: объект в области поиска или упоминается в ответе"""
+        if self.scope is None:
+            return True
+        for dn in dns:
+            if _in_scope(dn, self.scope):
+                return True
+            # В JSON не ASCII-символы и спецсимволы DN могут быть экранированы
+            if dn in self.text() or json.dumps(dn)[1:-1] in self.text():
+                return True
+        return False
+
+
+class Recorder:
+    """Запись ответа одного запроса в кэш"""
+
+    def __init__(self, cache: "ResponseCache", key: str, scope: str | None):
+        self._cache = cache
+        self._key = key
+        self._scope = scope
+        self._generation = cache.generation
+        self._success = False
+
+    def success(self):
+        """Отметка, что ответ сформирован без ошибки. Вызывается из stream_result"""
+        self._success = True
+
+    async def record(self, stream):
+        """
+        Стриминг ответа с его сохранением. Ответ сохраняется, если стриминг завершён без ошибки
+        и за время исполнения не было изменений в DS
+
+        Args:
+            stream: Стриминг ответа присоски (stream_result)
+        """
+        chunks = []
+        size = 0
+        try:
+            async for chunk in stream:
+                yield chunk
+                if chunks is not None:
+                    chunk = chunk.encode("utf-8") if isinstance(chunk, str) else bytes(chunk)
+                    size += len(chunk)
+                    if size <= self._cache.max_bytes:
+                        chunks.append(chunk)
+                    else:
+                        # Ответ больше кэша целиком не сохраняется, накопление прекращается
+                        chunks = None
+        finally:
+            await stream.aclose()
+
+        if self._success and chunks is not None:
+            self._cache.put(self._key, b''.join(chunks), self._scope, self._generation)
+
+
+class ResponseCache:
+    def __init__(self, name: str, ttl: float, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 scope: Callable[[dict | None], str | None] | None = None):
+        """
+        Кэш сериализованных ответов присосок с TTL и ограничением размера (LRU)
+
+        Args:
+            name: Имя кэша в статистике
+            ttl: Время жизни записи в секундах
+            max_entries: Максимальное число записей
+            max_bytes: Максимальный общий размер ответов в байтах
+            scope: Функция получения области каталога (distinguishedName) из входных данных присоски.
+                Запись сбрасывается при изменении объектов в этой области. Если область не определена (None),
+                запись сбрасывается при любом изменении
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._scope = scope
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Номер изменения: ответы, при формировании которых были изменения в DS, не сохраняются
+        self.generation = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+        add_change_listener(self.invalidate)
+        _CACHES.append(self)
+
+    def get(self, key: str) -> bytes | None:
+        """Получение ответа. Если записи нет или TTL истёк, возвращается None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.body
+
+    def recorder(self, key: str, data: dict | None) -> Recorder:
+        """
+        Запись ответа запроса в кэш
+
+        Args:
+            key: Ключ запроса (single_flight.flight_key)
+            data: Входные данные присоски
+        """
+        return Recorder(self, key, self._scope(data) if self._scope else None)
+
+    def put(self, key: str, body: bytes, scope: str | None, generation: int) -> None:
+        """Сохранение ответа с удалением давно не использованных записей"""
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(body, time.monotonic() + self.ttl, scope)
+            self._size += len(body)
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self._size -= len(self._entries.pop(key).body)
+
+    def invalidate(self, dns: list[str]) -> None:
+        """
+        Сброс записей, которые затрагивает изменение объектов
+
+        Args:
+            dns: distinguishedName изменённых объектов
+        """
+        dns = [dn.casefold() for dn in dns]
+        with self._lock:
+            self.generation += 1
+            for key in [key for key, entry in self._entries.items() if entry.touched(dns)]:
+                self._remove(key)
+                self._invalidations += 1
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+def caches_stats() -> list[dict]:
+    """Статистика всех кэшей"""
+    return [cache.stats() for cache in _CACHES]
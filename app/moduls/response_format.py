@@ -0,0 +1,345 @@
+"""
+Форматы ответа присосок, выбираемые клиентом через заголовок Accept.
+
+Во всех форматах сохраняется смысл ответа: ожидание (waiting), указатель ошибки (error) и результат (details).
+- json (text/event-stream, application/json) - исходный формат: один JSON
+  {"waiting": "...", "error": ..., "details": ...};
+- ndjson (application/x-ndjson) - по одному JSON-объекту на строку;
+- msgpack (application/x-msgpack) - те же объекты, что и в ndjson, в виде последовательности MessagePack-кадров;
+- columnar (application/vnd.tentacula.columnar+json) - исходный формат, но списки словарей передаются блоками
+  {"columns": [...], "rows": [[...], ...]}, в которых ключи указываются один раз на блок.
+
+Порядок объектов ndjson и msgpack:
+    {"waiting": "."} - точка ожидания (может повторяться в любой момент);
+    {"error": false} - указатель ошибки (после ожидания);
+    {"details": <значение>} - результат. Если результат список, передаётся {"details": []},
+    после чего каждый элемент списка передаётся отдельным объектом {"item": <элемент>};
+    {"end": true} - ответ полностью передан.
+Если ошибка возникла после начала передачи списка, повторно передаются {"error": true} и {"details": "<текст>"}.
+
+Список, который функция возвращает частями, в json и columnar передаётся до указателя ошибки:
+    {"waiting": "...", "details": [...], "error": false}
+Так ключ error передаётся один раз, уже после всех элементов. Если ошибка возникла после начала передачи списка,
+ответ завершается ключами "error": true и "message": "<текст>", а в details остаются переданные элементы.
+"""
+import json
+import contextvars
+
+from app.ds import DSResultSet
+from app.moduls.json_encoder import dumps, dumps_items, _default
+
+try:
+    import msgpack
+except ImportError:  # msgpack не является обязательной зависимостью
+    msgpack = None
+
+
+def _str_details(value) -> str:
+    """Результат, который не является списком, словарём или None, передаётся строкой"""
+    return str(value)
+
+
+class JSONFormat:
+    """Исходный формат ответа: один JSON, который стримится частями"""
+    name = "json"
+    media_type = "text/event-stream"
+    accept = ("text/event-stream", "application/json")
+
+    def head(self):
+        """Начало ответа"""
+        return '{"waiting": "'
+
+    def beat(self):
+        """Точка ожидания, пока функция исполняется"""
+        return '.'
+
+    def status(self, error: bool):
+        """Завершение ожидания и указатель ошибки"""
+        return f'", "error": {str(error).lower()}, "details": '
+
+    def value(self, value):
+        """Результат, который не является списком"""
+        if value is None:
+            return "null"
+        if isinstance(value, dict):
+            return dumps(value)
+        return json.dumps(_str_details(value), ensure_ascii=False)
+
+    def list_begin(self):
+        """Начало списка"""
+        return "["
+
+    def list_items(self, items: list, first: bool):
+        """Часть элементов списка"""
+        return self.separator(first) + self.encode_items(items)
+
+    def separator(self, first: bool):
+        """Разделитель перед частью элементов списка"""
+        return b'' if first else b','
+
+    def encode_items(self, items: list) -> bytes:
+        """Преобразование части элементов списка без разделителя (может исполняться в отдельном процессе)"""
+        return dumps_items(items)
+
+    def list_beat(self):
+        """Поддержание соединения внутри списка (пробел допустим внутри JSON-массива)"""
+        return ' '
+
+    def list_end(self):
+        """Конец списка"""
+        return "]"
+
+    def stream_begin(self):
+        """Завершение ожидания и начало списка, который передаётся частями (указатель ошибки передаётся в конце)"""
+        return '", "details": ['
+
+    def stream_end(self):
+        """Конец списка, который передан частями, и указатель ошибки"""
+        return '], "error": false'
+
+    def stream_error(self, message: str):
+        """Ошибка после начала передачи списка: текст ошибки передаётся ключом message после переданных элементов"""
+        return f'], "error": true, "message": {json.dumps(message, ensure_ascii=False)}'
+
+    def tail(self):
+        """Конец ответа"""
+        return "}"
+
+
+def _columnar_block(items: list | DSResultSet) -> dict:
+    """
+    Преобразование части списка в блок: ключи один раз, значения массивами. Отсутствующий у объекта ключ передаётся
+    как null, а номер строки - в списке missing этого столбца (missing передаётся, только если такие ключи есть).
+    Пустой список передаётся блоком без столбцов и строк, как и пустой DSResultSet
+    """
+    if isinstance(items, DSResultSet):
+        return items.columnar_block()
+
+    if not all(isinstance(i, dict) for i in items):
+        return {"values": items}
+
+    columns = {}
+    for item in items:
+        for key in item.keys():
+            columns.setdefault(key, len(columns))
+
+    rows = []
+    missing = [[] for _ in columns]
+    for index, item in enumerate(items):
+        row = [None] * len(columns)
+        for key, value in item.items():
+            row[columns[key]] = value
+        rows.append(row)
+        if len(item) < len(columns):
+            keys = set(item.keys())
+            for key, column in columns.items():
+                if key not in keys:
+                    missing[column].append(index)
+
+    block = {"columns": list(columns), "rows": rows}
+    if any(missing):
+        block["missing"] = missing
+    return block
+
+
+class ColumnarFormat(JSONFormat):
+    """Исходный формат, в котором списки словарей передаются блоками столбцов"""
+    name = "columnar"
+    media_type = "application/vnd.tentacula.columnar+json"
+    accept = (media_type,)
+
+    def encode_items(self, items: list) -> bytes:
+        return dumps(_columnar_block(items))
+
+
+class NDJSONFormat:
+    """Формат с одним JSON-объектом на строку"""
+    name = "ndjson"
+    media_type = "application/x-ndjson"
+    accept = (media_type, "application/jsonl")
+
+    def _frame(self, key: str, value) -> bytes:
+        return b'{"' + key.encode() + b'":' + dumps(value) + b'}\n'
+
+    def head(self):
+        return b''
+
+    def beat(self):
+        return b'{"waiting":"."}\n'
+
+    def status(self, error: bool):
+        return self._frame("error", error)
+
+    def value(self, value):
+        if value is not None and not isinstance(value, dict):
+            value = _str_details(value)
+        return self._frame("details", value)
+
+    def list_begin(self):
+        return self._frame("details", [])
+
+    def list_items(self, items: list, first: bool):
+        return self.encode_items(items)
+
+    def separator(self, first: bool):
+        return b''
+
+    def encode_items(self, items: list) -> bytes:
+        if isinstance(items, DSResultSet):
+            items = items.records()
+        return b''.join([self._frame("item", i) for i in items])
+
+    def list_beat(self):
+        return self.beat()
+
+    def list_end(self):
+        return b''
+
+    def stream_begin(self):
+        return self.status(False) + self.list_begin()
+
+    def stream_end(self):
+        return self.list_end()
+
+    def stream_error(self, message: str):
+        return self.status(True) + self._frame("details", message)
+
+    def tail(self):
+        return self._frame("end", True)
+
+
+def _msgpack_default(obj):
+    """Преобразование значений, которые msgpack не умеет сериализовать сам (strict_types: наследники dict и tuple)"""
+    if isinstance(obj, tuple):
+        return list(obj)
+    return _default(obj)
+
+
+class MsgPackFormat(NDJSONFormat):
+    """Последовательность MessagePack-кадров с теми же объектами, что и в ndjson"""
+    name = "msgpack"
+    media_type = "application/x-msgpack"
+    accept = (media_type, "application/msgpack", "application/vnd.msgpack")
+
+    def __init__(self):
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        self._packer = msgpack.Packer(default=_msgpack_default, strict_types=True, datetime=False)
+
+    def _frame(self, key: str, value) -> bytes:
+        return self._packer.pack({key: value})
+
+
+# Имя формата ответа текущего запроса. Назначается при стриминге ответа и доступно в потоке присоски
+format_ctx_var = contextvars.ContextVar("response_format", default=JSONFormat.name)
+
+# Форматы в порядке предпочтения, если клиент не указал приоритет
+FORMATS = [JSONFormat, NDJSONFormat, MsgPackFormat, ColumnarFormat]
+
+
+def available_formats() -> list:
+    """Список форматов, для которых установлены зависимости"""
+    return [f for f in FORMATS if f is not MsgPackFormat or msgpack is not None]
+
+
+def get_format(name: str | None = None):
+    """
+    Получение формата по имени
+
+    Args:
+        name: Имя формата (json, ndjson, msgpack, columnar). Если не указан, используется json
+    """
+    for f in FORMATS:
+        if f.name == (name or JSONFormat.name):
+            return f()
+    raise ValueError(f"Unknown response format: {name}")
+
+
+def negotiate(accept: str | None):
+    """
+    Выбор формата ответа по заголовку Accept (с учётом q-параметров).
+    Если подходящий формат не найден, используется исходный формат json
+
+    Args:
+        accept: Значение заголовка Accept
+    """
+    if not accept:
+        return JSONFormat()
+
+    candidates = []
+    for index, part in enumerate(accept.split(',')):
+        media_type, *params = [i.strip() for i in part.split(';')]
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            candidates.append((-q, index, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        for f in available_formats():
+            if media_type in f.accept:
+                return f()
+
+    return JSONFormat()
+
+
+def decode_response(content: bytes, media_type: str | None) -> dict:
+    """
+    Преобразование ответа присоски любого формата в словарь {"waiting": ..., "error": ..., "details": ...}
+
+    Args:
+        content: Тело ответа
+        media_type: Значение заголовка Content-Type ответа
+    """
+    media_type = (media_type or JSONFormat.media_type).split(';')[0].strip().lower()
+
+    if media_type in NDJSONFormat.accept:
+        frames = [json.loads(line) for line in content.splitlines() if line.strip()]
+    elif media_type in MsgPackFormat.accept:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(content)
+        frames = list(unpacker)
+    else:
+        result = json.loads(content)
+        # Ошибка после начала передачи списка: вместо переданных элементов возвращается текст ошибки
+        if result.get("error") and "message" in result:
+            result["details"] = result.pop("message")
+        if media_type in ColumnarFormat.accept and isinstance(result.get("details"), list) and not result["error"]:
+            result["details"] = _columnar_rows(result["details"])
+        return result
+
+    result = {"waiting": "", "error": None, "details": None}
+    for frame in frames:
+        if "waiting" in frame:
+            result["waiting"] += frame["waiting"]
+        elif "error" in frame:
+            result["error"] = frame["error"]
+        elif "details" in frame:
+            result["details"] = frame["details"]
+        elif "item" in frame:
+            result["details"].append(frame["item"])
+
+    return result
+
+
+def _columnar_rows(blocks: list) -> list:
+    """Восстановление списка из блоков столбцов. Ключи из missing не восстанавливаются, значения null сохраняются"""
+    items = []
+    for block in blocks:
+        if "columns" in block:
+            columns = block["columns"]
+            if "missing" not in block:
+                items.extend(dict(zip(columns, row)) for row in block["rows"])
+                continue
+            missing = [set(rows) for rows in block["missing"]]
+            items.extend({k: v for k, v, absent in zip(columns, row, missing) if index not in absent}
+                         for index, row in enumerate(block["rows"]))
+        else:
+            items.extend(block["values"])
+    return items
@@ -0,0 +1,123 @@
+"""
+Объединение одинаковых одновременных запросов к присоскам (single-flight).
+
+Первый запрос (ведущий) запускает исполнение присоски, а запросы с теми же входными данными, полученные до его
+завершения, подключаются к уже идущему исполнению. Все части ответа сохраняются, поэтому каждый подключившийся
+клиент получает ответ целиком с самого начала, а далее - новые части по мере их получения.
+Исполнение прерывается, только если отключились все клиенты.
+"""
+import os
+import json
+import asyncio
+import hashlib
+
+from app.systems.logging import logger
+
+# Соль ключей, чтобы учётные данные из входных данных нельзя было восстановить по ключу
+_SALT = os.urandom(16)
+
+# Исполняющиеся запросы
+_FLIGHTS: dict[str, "Flight"] = {}
+
+# Статистика
+_STATS = {"leaders": 0, "followers": 0}
+
+
+class Flight:
+    def __init__(self, key: str):
+        """Одно исполнение присоски, к которому могут подключиться несколько клиентов"""
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.task: asyncio.Task | None = None
+        self._subscribers = 0
+        self._changed = asyncio.Event()
+
+    def _publish(self, chunk=None):
+        """Сохранение новой части ответа и уведомление клиентов"""
+        if chunk is not None:
+            self.chunks.append(chunk)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _produce(self, stream):
+        """Получение частей ответа из стриминга присоски"""
+        try:
+            async for chunk in stream:
+                self._publish(chunk)
+        except Exception as e:
+            logger.warning(f"Coalesced stream interrupted: {e}")
+        finally:
+            self.done = True
+            _FLIGHTS.pop(self.key, None)
+            self._publish()
+
+    async def subscribe(self):
+        """Получение всех частей ответа, начиная с первой"""
+        self._subscribers += 1
+        index = 0
+        try:
+            while True:
+                changed = self._changed
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.done:
+                    return
+                await changed.wait()
+        finally:
+            self._subscribers -= 1
+            # Если отключились все клиенты, исполнение присоски прерывается
+            if not self._subscribers and not self.done and self.task:
+                self.task.cancel()
+
+
+def flight_key(endpoint: str, format_name: str, data: dict | None) -> str:
+    """
+    Ключ запроса: эндпоинт, формат ответа и нормализованные входные данные (вместе с учётными данными).
+    Входные данные хешируются с солью процесса и не сохраняются в открытом виде
+
+    Args:
+        endpoint: Путь эндпоинта
+        format_name: Имя формата ответа
+        data: Входные данные присоски
+    """
+    normalized = json.dumps([endpoint, format_name, data], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(normalized.encode("utf-8"), key=_SALT, digest_size=32).hexdigest()
+
+
+def join(key: str):
+    """
+    Подключение к исполняющемуся запросу с тем же ключом. Если такого запроса нет, возвращается None
+
+    Args:
+        key: Ключ запроса (flight_key)
+    """
+    flight = _FLIGHTS.get(key)
+    if flight is None:
+        return None
+
+    _STATS["followers"] += 1
+    logger.info("Coalesced with in-flight request")
+    return flight.subscribe()
+
+
+def start(key: str, stream):
+    """
+    Запуск исполнения присоски, к которому смогут подключиться одинаковые запросы
+
+    Args:
+        key: Ключ запроса (flight_key)
+        stream: Стриминг ответа присоски (stream_result)
+    """
+    flight = Flight(key)
+    _FLIGHTS[key] = flight
+    _STATS["leaders"] += 1
+
+    flight.task = asyncio.create_task(flight._produce(stream))
+    return flight.subscribe()
+
+
+def stats() -> dict:
+    """Статистика объединения запросов"""
+    return {"in_flight": len(_FLIGHTS), **_STATS}
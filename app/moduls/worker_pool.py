@@ -0,0 +1,179 @@
+"""
+Пулы потоков присосок с ограниченной очередью ожидания.
+
+Каждый APIRouter (root, /ds, /sucker, /composition) получает собственный пул, поэтому медленные запросы
+одного APIRouter (например, поиск в DS на недоступном контроллере домена) не занимают потоки остальных.
+Запрос, для которого нет свободного потока, ожидает в очереди. Если очередь заполнена или время ожидания истекло,
+запрос сразу отклоняется (PoolOverloaded), а клиент получает 503 с заголовком Retry-After.
+"""
+import math
+import time
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+# Все созданные пулы, для вывода статистики
+_POOLS: list["WorkerPool"] = []
+
+# Слот пула APIRouter текущего запроса. Асинхронные присоски передают его как executor (например, в AsyncDSHook),
+# чтобы их блокирующие вызовы исполнялись в потоках своего APIRouter
+slot_ctx_var = contextvars.ContextVar("pool_slot", default=None)
+
+
+class PoolOverloaded(Exception):
+    """Исключение при отказе в исполнении: очередь пула заполнена или время ожидания в очереди истекло"""
+
+    def __init__(self, pool: "WorkerPool"):
+        self.pool = pool
+        self.retry_after = pool.retry_after()
+        super().__init__(f"Pool '{pool.name}' is overloaded, retry after {self.retry_after} s")
+
+
+class PoolSlot(Executor):
+    """
+    Разрешение на исполнение одной присоски в пуле.
+    Слот освобождается, когда стриминг завершён (close) и все переданные в пул задания исполнились.
+    Поэтому задание, которое продолжает исполняться после дисконнекта клиента, продолжает занимать слот.
+    Слот является concurrent.futures.Executor и может передаваться в loop.run_in_executor
+    """
+
+    def __init__(self, pool: "WorkerPool"):
+        self._pool = pool
+        self._pending = 0
+        self._closed = False
+        self._released = False
+        self._start = time.monotonic()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        """
+        Передача функции в поток пула с копией текущего контекста (сохраняется s_id_ctx_var для логов).
+        Вызывается из потока цикла событий
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+
+        self._pending += 1
+        future = self._pool.executor.submit(ctx.run, functools.partial(fn, *args, **kwargs))
+        # Завершение отслеживается по заданию в потоке, а не по asyncio.Future, которое может быть отменено раньше
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._done))
+        return future
+
+    def run(self, func, /, *args, **kwargs) -> asyncio.Future:
+        """Исполнение функции в потоке пула"""
+        return asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def _done(self):
+        self._pending -= 1
+        self._release()
+
+    def close(self):
+        """Завершение работы присоски. Повторный вызов ничего не делает"""
+        self._closed = True
+        self._release()
+
+    def _release(self):
+        if self._closed and not self._pending and not self._released:
+            self._released = True
+            self._pool._release(time.monotonic() - self._start)
+
+
+class WorkerPool:
+    def __init__(self, name: str, workers: int, queue_size: int, queue_timeout: float):
+        """
+        Пул потоков для исполнения присосок одного APIRouter
+
+        Args:
+            name: Имя пула (выводится в статистике и в именах потоков)
+            workers: Число потоков. Одновременно исполняется не больше workers присосок
+            queue_size: Число запросов, которые могут ожидать свободного потока. При 0 запрос отклоняется сразу
+            queue_timeout: Время ожидания в очереди в секундах. При 0 ожидание не ограничено
+        """
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"tentacula_{name}")
+
+        self._active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+        # Статистика
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_avg = 0.0  # Экспоненциальное среднее времени исполнения присоски
+
+        _POOLS.append(self)
+
+    async def acquire(self) -> PoolSlot:
+        """Получение слота. Если свободного потока нет, запрос ожидает в очереди или отклоняется (PoolOverloaded)"""
+        start = time.monotonic()
+
+        if self._active < self.workers and not self._waiters:
+            self._active += 1
+        else:
+            if len(self._waiters) >= self.queue_size:
+                self._rejected += 1
+                raise PoolOverloaded(self)
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, self.queue_timeout or None)
+            except asyncio.TimeoutError:
+                self._rejected += 1
+                raise PoolOverloaded(self)
+            except asyncio.CancelledError:
+                # Клиент отключился в момент, когда слот уже был передан
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        wait = time.monotonic() - start
+        self._admitted += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        return PoolSlot(self)
+
+    def _release(self, hold: float | None = None):
+        """Освобождение слота: он передаётся первому ожидающему в очереди, либо число занятых слотов уменьшается"""
+        if hold is not None:
+            self._hold_avg = hold if not self._hold_avg else self._hold_avg * 0.9 + hold * 0.1
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def retry_after(self) -> int:
+        """Рекомендуемая пауза в секундах перед повторным запросом: среднее время исполнения присоски"""
+        return max(1, math.ceil(self._hold_avg))
+
+    def stats(self) -> dict:
+        """Статистика пула"""
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "wait_time_avg": self._wait_total / self._admitted if self._admitted else 0.0,
+            "wait_time_max": self._wait_max,
+            "hold_time_avg": self._hold_avg,
+        }
+
+
+def pools_stats() -> list[dict]:
+    """Статистика всех пулов"""
+    return [pool.stats() for pool in _POOLS]
@@ -10,6 +10,7 @@ from cryptography.hazmat.primitives import hashes
 from sqlalchemy import Column, Integer, String, DateTime, JSON, select, func, delete
 
 from app.sds import SDSHook
+from app.ds import AsyncDSHook
 from app.systems.config import AppConfig
 from app.systems.logging import logger, s_id_ctx_var
 from app.systems.database import Base
@@ -17,6 +18,12 @@ from app.moduls.json_encoder import json_encoder
 from app.systems.database import AsyncSessionLocal
 from app.main import scheduler
 
+# Запросы чтения, которые при прямом подключении к DS исполняются в цикле событий (AsyncDSHook), без отдельного потока
+ASYNC_QUERIES = {"get_object", "get_user", "get_group", "get_computer", "get_contact", "get_group_member"}
+
+# Параметры подключения, которые передаются в AsyncDSHook
+_ASYNC_PARAMS = ("login", "password", "host", "port", "base", "dry_run", "log_level")
+
 # Переменная для отслеживания заданий работающих в фоновом режиме
 background_tasks: set[asyncio.Task] = set()
 
@@ -92,6 +99,19 @@ def run_ds(uuid_session, type_query, param_conn, param_query):
         return result
 
 
+def is_async_query(type_query, param_conn) -> bool:
+    """Запрос чтения с прямым подключением к DS (без Тентакли, таблицы заданий и Airflow)"""
+    return (type_query in ASYNC_QUERIES
+            and all(param_conn.get(k) for k in ("login", "password", "host"))
+            and not any(param_conn.get(k) for k in ("url", "public_key", "airflow_conn_id", "airflow_conn")))
+
+
+async def run_ds_async(type_query, param_conn, param_query):
+    """Функция исполнения запроса чтения к СК в цикле событий"""
+    async with AsyncDSHook(**{k: v for k, v in param_conn.items() if k in _ASYNC_PARAMS and v is not None}) as ds:
+        return await getattr(ds, type_query)(**param_query)
+
+
 async def task_processing(source_uuid: str, task_id: int):
     """Функция исполнения выбранного задания. В ID события добавляется ID строки из таблицы заданий"""
     uuid_session = f"{source_uuid}-{task_id}"
@@ -124,11 +144,14 @@ async def task_processing(source_uuid: str, task_id: int):
 
                 logger.info('Transit Param Connect: %s', param_conn)
 
-            # Исполнение запроса
-            result = await asyncio.to_thread(
-                run_ds,
-                uuid_session, type_query, param_conn, param_query
-            )
+            # Исполнение запроса. Запросы чтения к DS ожидают результат в цикле событий, остальные - в потоке
+            if is_async_query(type_query, param_conn):
+                result = await run_ds_async(type_query, param_conn, param_query)
+            else:
+                result = await asyncio.to_thread(
+                    run_ds,
+                    uuid_session, type_query, param_conn, param_query
+                )
 
             task.result = json_encoder(result)
             task.status = 'complete'
@@ -18,6 +18,9 @@ from cryptography.hazmat.primitives import serialization
 
 from app.ds import DSHook, DSDict
 from app.ds import DS_TYPE_SCOPE, DS_TYPE_OBJECT, DS_GROUP_SCOPE, DS_GROUP_CATEGORY
+from app.moduls.response_format import get_format, decode_response
+from app.moduls.compression import client_accept_encoding
+from app.ds.ds_health import health
 
 
 def mask_protect_data(value: dict, hide_pass: bool = True) -> dict:
@@ -186,7 +189,7 @@ class SDSHook:
                  db_port: int = 5432, database: str = None, db_pre_execution_delay: float = 0.1,
                  db_execution_delay: float = 0.1, url: str | list = None, cert_root: str = None, cert_file: str = None,
                  cert_key: str = None, tent_login: str = None, tent_pass: str = None, airflow_conn_id: str = None,
-                 airflow_conn=None) -> None:
+                 airflow_conn=None, response_format: str = None) -> None:
         """
         Класс создаёт сессию с DS, в рамках который будет исполнен запрос к каталогу
         (запрос описывается в рамках наследованных функций).
@@ -220,6 +223,7 @@ class SDSHook:
             airflow_conn: Выгруженное подключение из Apache Airflow
             tent_login: Логин для авторизации на эндпоинте Тентакли
             tent_pass: Пароль для авторизации на эндпоинте Тентакли
+            response_format: Формат ответа эндпоинтов Тентакли: json (по умолчанию), ndjson, msgpack или columnar
         """
 
         # Если все ключи переданы через Airflow
@@ -250,6 +254,7 @@ class SDSHook:
                 timeout = timeout or _data.get("timeout", None)
                 db_pre_execution_delay = db_pre_execution_delay or _data.get("db_pre_execution_delay", None)
                 db_execution_delay = db_execution_delay or _data.get("db_execution_delay", None)
+                response_format = response_format or _data.get("response_format", None)
 
                 db_login = db_login or _data.get("db_login", None)
                 db_password = db_password or _data.get("db_password", None)
@@ -296,6 +301,7 @@ class SDSHook:
         self._log_level = log_level
         self._tent_login = tent_login
         self._tent_pass = tent_pass
+        self._response_format = get_format(response_format)
 
         # Создание уникального имени для логов
         self._logger = logging.getLogger(self.__class__.__name__)
@@ -396,10 +402,10 @@ class SDSHook:
 
         # Обращение к СК через Тентаклю
         if self._type_conn == self.CONN_TENT:
-            # Перебор полученного списка Тентаклей, для поиска доступной
-            for url in self._url:
+            # Перебор полученного списка Тентаклей, для поиска доступной (сначала доступные по реестру хостов)
+            for base_url in health.order(self._url):
                 try:
-                    url = f'{url}/{type_query}'
+                    url = f'{base_url}/{type_query}'
 
                     auth_data = [f"Run URL Connect: {url}"]
 
@@ -422,11 +428,22 @@ class SDSHook:
                     response = self._connect_tent.post(url, json={
                         **mask_protect_data(self._param_conn, hide_pass=False),
                         **mask_protect_data(param_query, hide_pass=False)
-                    })
-
+                    }, headers={'Accept': self._response_format.media_type,
+                                'Accept-Encoding': client_accept_encoding()})
+
+                    # Ответ 5xx - ошибка хоста, остальные ответы означают, что хост доступен
+                    if response.is_server_error:
+                        health.record_failure(base_url)
+                    else:
+                        health.record_success(base_url)
                     break
                 except httpx.ConnectError as e:
+                    health.record_failure(base_url)
                     self._logger.warning(f"Host {url}: {e}")
+                except httpx.TransportError:
+                    # Запрос мог быть исполнен (например, истёк таймаут ответа), поэтому другой адрес не пробуется
+                    health.record_failure(base_url)
+                    raise
 
             else:
                 raise TimeoutError(f"Can't contact HTTP servers")
@@ -434,7 +451,7 @@ class SDSHook:
             # Проверка полученных результатов
             try:
                 response.raise_for_status()
-                result = response.json()
+                result = decode_response(response.content, response.headers.get('content-type'))
                 if result['error']:
                     raise RuntimeError(result['details'])
             except Exception as e:
@@ -3,10 +3,16 @@ from pydantic import BaseModel
 import httpx, ssl
 
 from app.systems.logging import logger
-from app.moduls.post_base import create_post
+from app.moduls.post_base import create_post, configure_router
+from app.moduls.response_format import decode_response
+from app.moduls.compression import client_accept_encoding
+from app.ds.ds_health import health
 from app.systems.config import AppConfig
 
 router_composition = APIRouter()
+configure_router(router_composition, heartbeat=AppConfig.COMPOSITION__HEARTBEAT, workers=AppConfig.COMPOSITION__WORKERS,
+                 queue_size=AppConfig.COMPOSITION__QUEUE_SIZE, queue_timeout=AppConfig.COMPOSITION__QUEUE_TIMEOUT,
+                 name="composition")
 
 
 class SpecData(BaseModel):
@@ -48,12 +54,20 @@ def composition(url_: str, path_: str, json_: dict):
 
     url_ = [url_] if isinstance(url_, str) else url_
 
-    for url in url_:
+    # Сначала пробуются доступные адреса (см. app.ds.ds_health)
+    for url in health.order(url_):
         try:
             client = httpx.Client(transport=transport)
-            response = client.post(url + path_, json=json_)
+            # Ответ запрашивается в сжатом виде (httpx распаковывает его автоматически)
+            response = client.post(url + path_, json=json_, headers={'Accept-Encoding': client_accept_encoding()})
+            # Ответ 5xx - ошибка хоста, остальные ответы означают, что хост доступен
+            if response.is_server_error:
+                health.record_failure(url)
+            else:
+                health.record_success(url)
             response.raise_for_status()
-            data = response.json()
+            # Ответ Тентакли может быть в любом из поддерживаемых форматов
+            data = decode_response(response.content, response.headers.get('content-type'))
 
             if not data['error']:
                 return data['details']
@@ -62,7 +76,12 @@ def composition(url_: str, path_: str, json_: dict):
                 raise RuntimeError("Error answer in TRANSIT")
 
         except httpx.ConnectError as e:
+            health.record_failure(url)
             logger.warning(f"Host {url}: {e}")
+        except httpx.TransportError:
+            # Запрос мог быть исполнен (например, истёк таймаут ответа), поэтому другой адрес не пробуется
+            health.record_failure(url)
+            raise
 
     return None
 
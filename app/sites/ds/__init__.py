@@ -1,3 +1,32 @@
 from fastapi import APIRouter
 
-router_ds = APIRouter(prefix="/ds")
\ No newline at end of file
+from app.moduls.post_base import configure_router
+from app.moduls.process_pool import page_decoder, require_processes
+from app.moduls.response_cache import ResponseCache
+from app.ds.ds_pool import DSConnectionPool
+from app.systems.config import AppConfig
+
+router_ds = APIRouter(prefix="/ds")
+configure_router(router_ds, heartbeat=AppConfig.SUCKERS_DS__HEARTBEAT, workers=AppConfig.SUCKERS_DS__WORKERS,
+                 queue_size=AppConfig.SUCKERS_DS__QUEUE_SIZE, queue_timeout=AppConfig.SUCKERS_DS__QUEUE_TIMEOUT)
+
+# Конвертация страниц DS в пуле процессов для генераторов iter_*, если включено
+PAGE_DECODER = page_decoder if AppConfig.SUCKERS_DS__PROCESSES else None
+if PAGE_DECODER:
+    require_processes()
+
+# Пул сессий с DS, если включен
+DS_POOL = None
+if AppConfig.SUCKERS_DS__POOL_SIZE:
+    DS_POOL = DSConnectionPool(max_per_host=AppConfig.SUCKERS_DS__POOL_SIZE,
+                               idle_timeout=AppConfig.SUCKERS_DS__POOL_IDLE_TIMEOUT,
+                               max_lifetime=AppConfig.SUCKERS_DS__POOL_MAX_LIFETIME)
+
+# Кэш ответов присосок чтения, если включен. Запись сбрасывается при изменении объектов в области поиска (base),
+# если область не указана - при любом изменении
+RESPONSE_CACHE = None
+if AppConfig.SUCKERS_DS__CACHE_TTL:
+    RESPONSE_CACHE = ResponseCache(name="ds", ttl=AppConfig.SUCKERS_DS__CACHE_TTL,
+                                   max_entries=AppConfig.SUCKERS_DS__CACHE_MAX_ENTRIES,
+                                   max_bytes=AppConfig.SUCKERS_DS__CACHE_MAX_BYTES,
+                                   scope=lambda data: (data or {}).get('base'))
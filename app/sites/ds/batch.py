@@ -0,0 +1,156 @@
+"""
+Присоска исполнения нескольких операций DSHook в одной сессии.
+
+Операции исполняются по порядку. Подряд идущие операции чтения отправляются в DS одновременно (до PIPELINE запросов).
+Порядок относительно изменений соблюдается явно:
+- операция изменения начинается только после завершения всех предыдущих операций;
+- любая операция после изменения (в том числе операция со ссылкой на его результат) начинается только после
+  завершения этого изменения, поэтому чтение видит результат предыдущих изменений.
+Результат каждой операции отправляется в массив details сразу после получения (в порядке операций):
+{"index", "id", "type_query", "error", "details"}.
+
+Если включено references, параметры операции могут ссылаться на результат предыдущей операции с указанным id:
+{"$ref": "<id>"} или {"$ref": "<id>.0.distinguishedName"} (путь по индексам списков и ключам словарей)
+"""
+from typing import AsyncIterator
+
+import asyncio
+from pydantic import BaseModel
+
+from app.moduls.post_base import create_post
+from app.moduls.worker_pool import slot_ctx_var
+from . import router_ds, DS_POOL
+from app.ds import AsyncDSHook
+from app.systems.config import AppConfig
+from app.systems.logging import logger
+
+# Операции чтения (могут исполняться одновременно)
+READS = {"get_object", "get_user", "get_group", "get_computer", "get_contact", "get_group_member"}
+
+# Операции изменения (исполняются по одной)
+WRITES = {"set_object", "set_user", "set_group", "set_computer", "set_contact", "set_account_password",
+          "set_account_unlock", "add_group_member", "remove_group_member", "move_object", "rename_object",
+          "new_user", "new_group", "new_contact", "remove_object", "remove_user", "remove_group", "remove_computer",
+          "remove_contact"}
+
+PIPELINE = 8  # Максимальное число одновременных операций чтения
+MAX_OPERATIONS = 100  # Максимальное число операций в одном запросе
+
+
+class Operation(BaseModel):
+    type_query: str
+    param_query: dict = {}
+    id: str = None
+
+
+class SpecData(BaseModel):
+    login: str
+    password: str
+    host: str | list[str]
+    base: str = None
+    log_level: int = None
+
+    operations: list[Operation]
+    references: bool = False
+    stop_on_error: bool = True
+
+
+def _resolve(value, results: dict):
+    """Замена ссылок {"$ref": "<id>.<путь>"} на результаты предыдущих операций"""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            name, *path = str(value["$ref"]).split('.')
+            if name not in results:
+                raise RuntimeError(f"Unknown reference: {value['$ref']}")
+            value = results[name]
+            for step in path:
+                value = value[int(step)] if isinstance(value, (list, tuple)) else value[step]
+            return value
+        return {k: _resolve(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    return value
+
+
+def _refs(value) -> set[str]:
+    """id операций, на которые ссылаются параметры"""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"}:
+            return {str(value["$ref"]).split('.')[0]}
+        return set().union(*(_refs(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(_refs(v) for v in value))
+    return set()
+
+
+async def batch(login: str, password: str, host: str | list[str], operations: list[dict], base: str = None,
+                log_level: int = None, references: bool = False,
+                stop_on_error: bool = True) -> AsyncIterator[dict]:
+    if len(operations) > MAX_OPERATIONS:
+        raise RuntimeError(f"Too many operations: {len(operations)} (max {MAX_OPERATIONS})")
+    for operation in operations:
+        if operation['type_query'] not in READS | WRITES:
+            raise RuntimeError(f"Unknown operation: {operation['type_query']}")
+
+    async with AsyncDSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                           pool=DS_POOL, executor=slot_ctx_var.get()) as ds:
+        results = {}  # Результаты операций по id
+        pending = []  # Исполняющиеся операции в порядке отправки: (index, операция, задание)
+
+        async def run(operation: dict):
+            param_query = operation.get('param_query') or {}
+            if references:
+                param_query = _resolve(param_query, results)
+            return await getattr(ds, operation['type_query'])(**param_query)
+
+        async def complete(index: int, operation: dict, task: asyncio.Task) -> dict:
+            """Ожидание результата операции"""
+            try:
+                result = await task
+                error = False
+                if operation.get('id'):
+                    results[operation['id']] = result
+            except Exception as e:
+                logger.warning(f"Operation {index} ({operation['type_query']}) failed: {e}")
+                result = str(e)
+                error = True
+            return {"index": index, "id": operation.get('id'), "type_query": operation['type_query'],
+                    "error": error, "details": result}
+
+        try:
+            for index, operation in enumerate(operations):
+                # Операция ожидает предыдущие, если это изменение, если среди них есть незавершённое изменение,
+                # если она ссылается на их результат или если достигнут предел одновременных операций
+                depends = _refs(operation.get('param_query')) if references else set()
+                while pending and (operation['type_query'] in WRITES or len(pending) >= PIPELINE
+                                   or any(i[1]['type_query'] in WRITES for i in pending)
+                                   or depends & {i[1].get('id') for i in pending}):
+                    item = await complete(*pending.pop(0))
+                    yield item
+                    if item['error'] and stop_on_error:
+                        return
+
+                pending.append((index, operation, asyncio.ensure_future(run(operation))))
+
+                # Уже полученные результаты отправляются сразу
+                while pending and pending[0][2].done():
+                    item = await complete(*pending.pop(0))
+                    yield item
+                    if item['error'] and stop_on_error:
+                        return
+
+            while pending:
+                item = await complete(*pending.pop(0))
+                yield item
+                if item['error'] and stop_on_error:
+                    return
+        finally:
+            # Если исполнение прервано, оставшиеся операции отменяются до закрытия сессии
+            for _, _, task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*(task for _, _, task in pending), return_exceptions=True)
+
+
+create_post(endpoint="batch", func=batch, access=AppConfig.SUCKERS_DS__LIST_OF_PERMITTED,
+            base_model=SpecData, router=router_ds)
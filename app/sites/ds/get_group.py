@@ -1,8 +1,11 @@
+from typing import AsyncIterator
+
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
-from app.ds import DSDict, DSHook, DS_TYPE_SCOPE
+from app.moduls.worker_pool import slot_ctx_var
+from . import router_ds, PAGE_DECODER, RESPONSE_CACHE, DS_POOL
+from app.ds import DSDict, AsyncDSHook, DS_TYPE_SCOPE
 from app.systems.config import AppConfig
 
 
@@ -20,21 +23,23 @@ class SpecData(BaseModel):
     result_set_size: int | None = None
 
 
-def get_group(login: str, password: str, host: str | list[str], base: str = None, identity: str | dict = None,
-              ldap_filter: str = None, properties: str | list | tuple = None,
-              search_scope: DS_TYPE_SCOPE = "subtree", log_level: int = None,
-              result_set_size: int | None = None) -> list[DSDict]:
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
-        result = ds.get_group(
-            identity=identity,
-            ldap_filter=ldap_filter,
-            properties=properties,
-            search_scope=search_scope,
-            result_set_size=result_set_size,
-        )
-
-    return result
+async def get_group(login: str, password: str, host: str | list[str], base: str = None, identity: str | dict = None,
+                    ldap_filter: str = None, properties: str | list | tuple = None,
+                    search_scope: DS_TYPE_SCOPE = "subtree", log_level: int = None,
+                    result_set_size: int | None = None) -> AsyncIterator[list[DSDict]]:
+    async with AsyncDSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                           page_decoder=PAGE_DECODER, pool=DS_POOL, executor=slot_ctx_var.get(),
+                           parallel_search=AppConfig.SUCKERS_DS__PARALLEL_SEARCH) as ds:
+        async for page in ds.iter_group(
+                identity=identity,
+                ldap_filter=ldap_filter,
+                properties=properties,
+                search_scope=search_scope,
+                result_set_size=result_set_size,
+        ):
+            yield page
 
 
 create_post(endpoint="get_group", func=get_group, access=AppConfig.SUCKERS_DS__LIST_OF_PERMITTED,
-            base_model=SpecData, router=router_ds)
+            base_model=SpecData, router=router_ds, coalesce=AppConfig.SUCKERS_DS__COALESCE,
+            cache=RESPONSE_CACHE)
@@ -1,8 +1,11 @@
+from typing import AsyncIterator
+
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
-from app.ds import DSDict, DSHook
+from app.moduls.worker_pool import slot_ctx_var
+from . import router_ds, RESPONSE_CACHE, DS_POOL
+from app.ds import DSDict, AsyncDSHook
 from app.systems.config import AppConfig
 
 
@@ -16,15 +19,15 @@ class SpecData(BaseModel):
     identity: str | dict
 
 
-def get_group_member(login: str, password: str, host: str | list[str], identity: str | dict,
-                     base: str = None, log_level: int = None) -> list[DSDict]:
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
-        result = ds.get_group_member(
+async def get_group_member(login: str, password: str, host: str | list[str], identity: str | dict,
+                           base: str = None, log_level: int = None) -> AsyncIterator[list[DSDict]]:
+    async with AsyncDSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                           pool=DS_POOL, executor=slot_ctx_var.get()) as ds:
+        yield await ds.get_group_member(
             identity=identity
         )
 
-    return result
-
 
 create_post(endpoint="get_group_member", func=get_group_member, access=AppConfig.SUCKERS_DS__LIST_OF_PERMITTED,
-            base_model=SpecData, router=router_ds)
+            base_model=SpecData, router=router_ds, coalesce=AppConfig.SUCKERS_DS__COALESCE,
+            cache=RESPONSE_CACHE)
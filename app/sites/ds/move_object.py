@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
+from . import router_ds, DS_POOL
 from app.ds import DSHook
 from app.systems.config import AppConfig
 
@@ -19,7 +19,8 @@ class SpecData(BaseModel):
 
 def move_object(login: str, password: str, host: str | list[str], identity: str | dict, target_path: str, base: str = None,
                 log_level: int = None):
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
+    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                pool=DS_POOL) as ds:
         ds.move_object(
             identity=identity,
             target_path=target_path
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
+from . import router_ds, DS_POOL
 from app.ds import DSHook, DS_GROUP_SCOPE, DS_GROUP_CATEGORY
 from app.systems.config import AppConfig
 
@@ -24,7 +24,8 @@ class SpecData(BaseModel):
 def new_group(login: str, password: str, host: str | list[str], path: str, name: str, sam_account_name: str,
               group_scope: DS_GROUP_SCOPE, group_category: DS_GROUP_CATEGORY,
               other_attributes: dict[str, list] = None, base: str = None, log_level: int = None):
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
+    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                pool=DS_POOL) as ds:
         ds.new_group(
             path=path,
             name=name,
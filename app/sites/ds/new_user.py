@@ -2,7 +2,7 @@ from datetime import datetime
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
+from . import router_ds, DS_POOL
 from app.ds import DSHook
 from app.systems.config import AppConfig
 
@@ -32,7 +32,8 @@ def new_user(login: str, password: str, host: str | list[str], path: str, name:
              password_never_expires: bool = None, account_not_delegated: bool = None,
              change_password_at_logon: bool = None, account_expiration_date: bool | datetime = None,
              other_attributes: dict[str, list] = None, base: str = None, log_level: int = None):
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
+    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                pool=DS_POOL) as ds:
         ds.new_user(
             path=path,
             name=name,
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
+from . import router_ds, DS_POOL
 from app.ds import DSHook
 from app.systems.config import AppConfig
 
@@ -18,7 +18,8 @@ class SpecData(BaseModel):
 
 def remove_computer(login: str, password: str, host: str | list[str], identity: str | dict, base: str = None,
                     log_level: int = None):
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
+    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                pool=DS_POOL) as ds:
         ds.remove_computer(
             identity=identity
         )
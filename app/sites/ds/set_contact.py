@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
+from . import router_ds, DS_POOL
 from app.ds import DSHook
 from app.systems.config import AppConfig
 
@@ -25,7 +25,8 @@ def set_contact(login: str, password: str, host: str | list[str], identity: str
                 remove: dict[str, list | bool | str] = None, add: dict[str, list | bool | str] = None,
                 replace: dict[str, list | bool | str] = None, clear: list[str] = None,
                 display_name: str = None, log_level: int = None):
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
+    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                pool=DS_POOL) as ds:
         ds.set_contact(
             identity=identity,
             remove=remove,
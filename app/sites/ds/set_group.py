@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 
 from app.moduls.post_base import create_post
-from . import router_ds
+from . import router_ds, DS_POOL
 from app.ds import DSHook, DS_GROUP_SCOPE, DS_GROUP_CATEGORY
 from app.systems.config import AppConfig
 
@@ -29,7 +29,8 @@ def set_group(login: str, password: str, host: str | list[str], identity: str |
               display_name: str = None,
               group_scope: DS_GROUP_SCOPE = None, group_category: DS_GROUP_CATEGORY = None,
               log_level: int = None):
-    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level) as ds:
+    with DSHook(login=login, password=password, host=host, port=636, base=base, log_level=log_level,
+                pool=DS_POOL) as ds:
         ds.set_group(
             identity=identity,
             remove=remove,
@@ -5,10 +5,17 @@ from fastapi.routing import APIRoute
 from pydantic import BaseModel
 
 from app.main import app
-from app.moduls.post_base import create_post
+from app.moduls.post_base import create_post, configure_router
+from app.moduls.worker_pool import pools_stats
+from app.moduls import single_flight
+from app.moduls.response_cache import caches_stats
+from app.ds.ds_pool import ds_pools_stats
+from app.ds.ds_health import health
 from app.systems.config import AppConfig
 
 router_root = APIRouter()
+configure_router(router_root, heartbeat=AppConfig.APP__HEARTBEAT, workers=AppConfig.APP__WORKERS,
+                 queue_size=AppConfig.APP__QUEUE_SIZE, queue_timeout=AppConfig.APP__QUEUE_TIMEOUT)
 
 
 def root():
@@ -43,3 +50,18 @@ def root():
 
 create_post(endpoint="/", func=root, access=AppConfig.SECURITY__LIST_OF_PERMITTED,
             base_model=None, router=router_root)
+
+
+def metrics():
+    """
+    Функция мониторинга: загрузка пулов присосок (занятые потоки, глубина очереди, время ожидания, отказы)
+    объединение одинаковых запросов, кэши ответов (попадания, промахи, вытеснения, сбросы), пулы сессий с DS
+    и доступность хостов
+    """
+    return {"pools": pools_stats(), "single_flight": single_flight.stats(), "caches": caches_stats(),
+            "ds_connections": ds_pools_stats(), "hosts": health.stats()}
+
+
+# Присоска мониторинга исполняется вне пулов, чтобы отвечать и при их перегрузке
+create_post(endpoint="metrics", func=metrics, access=AppConfig.SECURITY__LIST_OF_PERMITTED,
+            base_model=None, router=router_root, admission=False)
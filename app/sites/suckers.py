@@ -1,19 +1,26 @@
 import os
+import sys
 import importlib
 
 from fastapi import APIRouter
 
+from app.moduls.post_base import configure_router
 from app.systems.config import AppConfig
 
 # APIRouter для пользовательских присосок
 router_sucker = APIRouter(prefix="/sucker")
+configure_router(router_sucker, heartbeat=AppConfig.SUCKERS__HEARTBEAT, workers=AppConfig.SUCKERS__WORKERS,
+                 queue_size=AppConfig.SUCKERS__QUEUE_SIZE, queue_timeout=AppConfig.SUCKERS__QUEUE_TIMEOUT)
 
 # Импорт пользовательских присосок из папки
 for filename in os.listdir(AppConfig.SUCKERS__FOLDER):
     if filename.endswith(".py") and filename != "__init__.py":
         module_path = os.path.join(AppConfig.SUCKERS__FOLDER, filename)
-        module_name = filename[:-3]
+        # Имя модуля указывается в пространстве приложения, чтобы не пересекаться с установленными пакетами
+        module_name = f"app.suckers.{filename[:-3]}"
 
         spec = importlib.util.spec_from_file_location(module_name, module_path)
         module = importlib.util.module_from_spec(spec)
+        # Модуль регистрируется, чтобы его функции были доступны пулу процессов (create_post(processes=True))
+        sys.modules[module_name] = module
         spec.loader.exec_module(module)  # Загрузка модуля
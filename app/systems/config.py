@@ -137,6 +137,21 @@ class _AppConfig:
             self.APP__SECRET_KEY = base64.b64decode(self.APP__SECRET_KEY.encode('utf-8'))
             self.APP__SECRET_KEY = serialization.load_pem_private_key(self.APP__SECRET_KEY, password=None)
 
+        self.APP__SERIALIZER = _read_any(config=_config, chapter='app', name='SERIALIZER', default='')
+
+        self.APP__COMPRESSION = _read_any(config=_config, chapter='app', name='COMPRESSION', default='')
+
+        self.APP__HEARTBEAT = _read_any(config=_config, chapter='app', name='HEARTBEAT', type_=float, default=15.0)
+
+        self.APP__WORKERS = _read_any(config=_config, chapter='app', name='WORKERS', type_=int, default=16)
+        self.APP__QUEUE_SIZE = _read_any(config=_config, chapter='app', name='QUEUE_SIZE', type_=int, default=64)
+        self.APP__QUEUE_TIMEOUT = _read_any(config=_config, chapter='app', name='QUEUE_TIMEOUT', type_=float,
+                                            default=10.0)
+
+        self.APP__PROCESSES = _read_any(config=_config, chapter='app', name='PROCESSES', type_=int, default=0)
+        self.APP__ROOT_DSE_TTL = _read_any(config=_config, chapter='app', name='ROOT_DSE_TTL', type_=float,
+                                           default=3600.0)
+
         # [security]
         self.SECURITY__AUTHENTICATION_TYPE = _read_any(config=_config, chapter='security', name='AUTHENTICATION_TYPE')
         if self.SECURITY__AUTHENTICATION_TYPE not in ["CERTIFICATE", "NONE", "LDAP_MEMBERS"]:
@@ -174,17 +189,57 @@ class _AppConfig:
 
         self.COMPOSITION__LIST_OF_PERMITTED = _read_json(config=_config, chapter='composition',
                                                          name='LIST_OF_PERMITTED', default='[]')
+        self.COMPOSITION__HEARTBEAT = _read_any(config=_config, chapter='composition', name='HEARTBEAT', type_=float,
+                                                default=self.APP__HEARTBEAT)
+        self.COMPOSITION__WORKERS = _read_any(config=_config, chapter='composition', name='WORKERS', type_=int,
+                                              default=self.APP__WORKERS)
+        self.COMPOSITION__QUEUE_SIZE = _read_any(config=_config, chapter='composition', name='QUEUE_SIZE', type_=int,
+                                                 default=self.APP__QUEUE_SIZE)
+        self.COMPOSITION__QUEUE_TIMEOUT = _read_any(config=_config, chapter='composition', name='QUEUE_TIMEOUT',
+                                                    type_=float, default=self.APP__QUEUE_TIMEOUT)
 
         # [suckers]
         self.SUCKERS__ENABLED = _read_bool(config=_config, chapter='suckers', name='ENABLED', default=False)
         if self.SUCKERS__ENABLED:
             self.SUCKERS__FOLDER = _read_any(config=_config, chapter='suckers', name='FOLDER').rstrip("/")
             os.makedirs(self.SUCKERS__FOLDER, exist_ok=True)
+        self.SUCKERS__HEARTBEAT = _read_any(config=_config, chapter='suckers', name='HEARTBEAT', type_=float,
+                                            default=self.APP__HEARTBEAT)
+        self.SUCKERS__WORKERS = _read_any(config=_config, chapter='suckers', name='WORKERS', type_=int,
+                                          default=self.APP__WORKERS)
+        self.SUCKERS__QUEUE_SIZE = _read_any(config=_config, chapter='suckers', name='QUEUE_SIZE', type_=int,
+                                             default=self.APP__QUEUE_SIZE)
+        self.SUCKERS__QUEUE_TIMEOUT = _read_any(config=_config, chapter='suckers', name='QUEUE_TIMEOUT', type_=float,
+                                                default=self.APP__QUEUE_TIMEOUT)
 
         # [suckers_ds]
         self.SUCKERS_DS__ENABLED = _read_bool(config=_config, chapter='suckers_ds', name='ENABLED', default=False)
         self.SUCKERS_DS__LIST_OF_PERMITTED = _read_json(config=_config, chapter='suckers_ds', name='LIST_OF_PERMITTED',
                                                         default='[]')
+        self.SUCKERS_DS__HEARTBEAT = _read_any(config=_config, chapter='suckers_ds', name='HEARTBEAT', type_=float,
+                                               default=self.APP__HEARTBEAT)
+        self.SUCKERS_DS__WORKERS = _read_any(config=_config, chapter='suckers_ds', name='WORKERS', type_=int,
+                                             default=self.APP__WORKERS)
+        self.SUCKERS_DS__QUEUE_SIZE = _read_any(config=_config, chapter='suckers_ds', name='QUEUE_SIZE', type_=int,
+                                                default=self.APP__QUEUE_SIZE)
+        self.SUCKERS_DS__QUEUE_TIMEOUT = _read_any(config=_config, chapter='suckers_ds', name='QUEUE_TIMEOUT',
+                                                   type_=float, default=self.APP__QUEUE_TIMEOUT)
+        self.SUCKERS_DS__PROCESSES = _read_bool(config=_config, chapter='suckers_ds', name='PROCESSES', default=False)
+        self.SUCKERS_DS__COALESCE = _read_bool(config=_config, chapter='suckers_ds', name='COALESCE', default=False)
+        self.SUCKERS_DS__CACHE_TTL = _read_any(config=_config, chapter='suckers_ds', name='CACHE_TTL', type_=float,
+                                               default=0)
+        self.SUCKERS_DS__CACHE_MAX_ENTRIES = _read_any(config=_config, chapter='suckers_ds', name='CACHE_MAX_ENTRIES',
+                                                       type_=int, default=1024)
+        self.SUCKERS_DS__CACHE_MAX_BYTES = _read_any(config=_config, chapter='suckers_ds', name='CACHE_MAX_BYTES',
+                                                     type_=int, default=64 * 1024 * 1024)
+        self.SUCKERS_DS__POOL_SIZE = _read_any(config=_config, chapter='suckers_ds', name='POOL_SIZE', type_=int,
+                                               default=10)
+        self.SUCKERS_DS__POOL_IDLE_TIMEOUT = _read_any(config=_config, chapter='suckers_ds', name='POOL_IDLE_TIMEOUT',
+                                                       type_=float, default=300)
+        self.SUCKERS_DS__POOL_MAX_LIFETIME = _read_any(config=_config, chapter='suckers_ds', name='POOL_MAX_LIFETIME',
+                                                       type_=float, default=3600)
+        self.SUCKERS_DS__PARALLEL_SEARCH = _read_any(config=_config, chapter='suckers_ds', name='PARALLEL_SEARCH',
+                                                     type_=int, default=1)
 
         # [schedulers]
         self.SCHEDULERS__ENABLED = _read_bool(config=_config, chapter='schedulers', name='ENABLED', default=False)
@@ -194,11 +249,16 @@ class _AppConfig:
 
         # [schedulers_ds]
         self.SCHEDULERS_DS__ENABLED = _read_bool(config=_config, chapter='schedulers_ds', name='ENABLED', default=False)
-        if self.SCHEDULERS_DS__ENABLED:
+        # Правила TRANSIT читаются и для присосок DS: по ним при старте заполняется кэш rootDSE
+        self.SCHEDULERS_DS__TRANSIT = {}
+        if self.SCHEDULERS_DS__ENABLED or (
+                self.SUCKERS_DS__ENABLED and _read_any(config=_config, chapter='schedulers_ds', name='TRANSIT',
+                                                       default='')):
             self.SCHEDULERS_DS__TRANSIT = _read_any(config=_config, chapter='schedulers_ds', name='TRANSIT')
             self.SCHEDULERS_DS__TRANSIT = _read_file('cat ' + self.SCHEDULERS_DS__TRANSIT)
             self.SCHEDULERS_DS__TRANSIT = json.loads(self.SCHEDULERS_DS__TRANSIT)
 
+        if self.SCHEDULERS_DS__ENABLED:
             if not all([self.APP__DB_ASYNC_URL, self.APP__SECRET_KEY]):
                 raise AttributeError("Schedulers_ds requires APP__DB_ASYNC_URL and APP__SECRET_KEY")
 
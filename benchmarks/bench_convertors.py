@@ -0,0 +1,139 @@
+"""
+Сравнение прежних конвертеров значений (по одному значению: struct.unpack на каждый subauthority objectSid,
+uuid.UUID для objectGUID, datetime.now().astimezone() для каждой даты формата Windows, strptime, перебор
+_TYPES_OBJECT для objectClass) с пакетными конвертерами app.ds.func_ds_get и конвертацией страницы по столбцам.
+Результаты сравниваются на равенство. Если numpy установлен, objectGUID большого пакета конвертируются через него.
+
+Запуск из корня рабочей области: python -m benchmarks.bench_convertors
+"""
+import struct
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.ds import DSDict
+from app.ds import func_ds_get
+from app.ds.func_ds_get import (ATTR_TYPES, ATTR_EXTEND, TYPE_HANDLERS, decode_page, c_sid_byte_to_string_batch,
+                                c_guid_byte_to_string_batch, c_datetime_win_to_python_batch,
+                                c_datetime_unicode_to_python_batch)
+from app.ds.convertors_value import _TYPES_OBJECT, _UAC_FLAGS
+
+from benchmarks.bench_decode import synthetic_object, sid, PROPERTIES, PROPERTIES_SHADOW, PAGE
+
+SIZE = 100_000  # Число значений и объектов
+
+
+def legacy_sid(data: bytes) -> str:
+    version = struct.unpack('B', data[0:1])[0]
+    assert version == 1, version
+    length = struct.unpack('B', data[1:2])[0]
+    authority = struct.unpack(b'>Q', b'\x00\x00' + data[2:8])[0]
+    string = 'S-%d-%d' % (version, authority)
+    data = data[8:]
+    assert len(data) == 4 * length
+    for i in range(length):
+        value = struct.unpack('<L', data[4 * i:4 * (i + 1)])[0]
+        string += '-%d' % value
+    return string
+
+
+def legacy_win(data: bytes) -> datetime | int:
+    if data in [b'0', b'9223372036850000000', b'9223372036854775807', b'-9223372036854775808']:
+        return int(data.decode("utf-8"))
+    return datetime(1601, 1, 1, tzinfo=datetime.now().astimezone().tzinfo) + timedelta(seconds=int(data) / 10_000_000)
+
+
+def legacy_unicode(data: bytes) -> datetime:
+    return datetime.strptime(data.decode("utf-8"), "%Y%m%d%H%M%S.0Z")
+
+
+def legacy_object_class(flags: list) -> str | list:
+    for key, item in _TYPES_OBJECT.items():
+        if sorted(flags) == sorted(item):
+            return key
+    return flags
+
+
+# Прежние правила обработки атрибутов
+LEGACY_TYPE_HANDLERS = dict(TYPE_HANDLERS)
+LEGACY_TYPE_HANDLERS["2.5.5.11"] = lambda v: [legacy_unicode(i) for i in v]
+LEGACY_TYPE_HANDLERS["2.5.5.16"] = lambda v: [legacy_win(i) for i in v]
+LEGACY_TYPE_HANDLERS["2.5.5.17"] = lambda v: [legacy_sid(i) for i in v]
+LEGACY_ATTR_SPECIAL = DSDict({
+    "objectGUID": lambda v: [str(uuid.UUID(bytes_le=i)) for i in v],
+    "objectClass": lambda v: legacy_object_class([i.decode("utf-8") for i in v]),
+})
+LEGACY_ATTR_EXTEND = {attr: dict(rules) for attr, rules in ATTR_EXTEND.items()}
+LEGACY_ATTR_EXTEND["userAccountControl"]["FlagsUAC"] = lambda v: [name for name, bit in _UAC_FLAGS.items() if v & bit]
+
+
+def legacy_hex(values: list[bytes]) -> list[str]:
+    return [f"hex:{i.hex()}" for i in values]
+
+
+def legacy_object_processing(data, properties, properties_shadow) -> DSDict:
+    """Прежняя конвертация объекта (по одному объекту, прежние конвертеры значений)"""
+    result = DSDict()
+    for attr, values in data.items():
+        action = ATTR_TYPES.get(attr, ('unknown', False))
+        handler = LEGACY_ATTR_SPECIAL.get(attr, LEGACY_TYPE_HANDLERS.get(action[0], legacy_hex))
+        result[attr] = handler(values)
+        result[attr] = result[attr][0] if action[1] else result[attr]
+
+    for attr, rules in LEGACY_ATTR_EXTEND.items():
+        if attr in result:
+            for attr_extend, handler_extend in rules.items():
+                if attr_extend.lower() in properties or '*' in properties:
+                    result[attr_extend] = handler_extend(result[attr])
+
+    [result.pop(attr) for attr in properties_shadow if attr in result]
+    return result
+
+
+def legacy_pages(pages: list) -> list:
+    return [[legacy_object_processing(data, PROPERTIES + ["flagsuac"], PROPERTIES_SHADOW) for data in page]
+            for page in pages]
+
+
+def current_pages(pages: list) -> list:
+    return [decode_page(page, PROPERTIES + ["flagsuac"], PROPERTIES_SHADOW) for page in pages]
+
+
+def measure(func, *args) -> float:
+    """Время исполнения в секундах (лучшее из трёх запусков)"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func(*args)
+        spent = time.perf_counter() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def main():
+    values = {
+        "objectSid": (legacy_sid, c_sid_byte_to_string_batch, [sid(i) for i in range(SIZE)]),
+        "objectGUID": (lambda i: str(uuid.UUID(bytes_le=i)), c_guid_byte_to_string_batch,
+                       [uuid.UUID(int=i * 7919).bytes_le for i in range(SIZE)]),
+        "pwdLastSet": (legacy_win, c_datetime_win_to_python_batch,
+                       [str(133800000000000000 + i * 12345679).encode() for i in range(SIZE)]),
+        "whenCreated": (legacy_unicode, c_datetime_unicode_to_python_batch,
+                        [f"2024{1 + i % 12:02}{1 + i % 28:02}{i % 24:02}{i % 60:02}{i % 59:02}.0Z".encode()
+                         for i in range(SIZE)]),
+    }
+
+    objects = [synthetic_object(i) for i in range(SIZE)]
+    pages = [objects[i:i + PAGE] for i in range(0, SIZE, PAGE)]
+    assert [[list(i.items()) for i in page] for page in current_pages(pages)] == \
+           [[list(i.items()) for i in page] for page in legacy_pages(pages)]
+
+    print(f"{SIZE} values, numpy: {'yes' if func_ds_get.numpy is not None else 'no'}")
+    print(f"{'':>12}  {'legacy':>8}  {'current':>8}")
+    for name, (legacy, batch, data) in values.items():
+        assert batch(data) == [legacy(i) for i in data]
+        print(f"{name:>12}: {measure(lambda: [legacy(i) for i in data]):6.3f} s  {measure(batch, data):6.3f} s")
+    print(f"{'decode page':>12}: {measure(legacy_pages, pages):6.3f} s  {measure(current_pages, pages):6.3f} s")
+
+
+if __name__ == "__main__":
+    main()
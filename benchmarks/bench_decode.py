@@ -0,0 +1,107 @@
+"""
+Сравнение конвертации страниц объектов DS: прежний object_processing (поиск правила для каждого атрибута каждого
+объекта) против плана конвертации, составленного один раз на набор атрибутов (app.ds.func_ds_get.decode_plan),
+на синтетических страницах в исходном виде (как их возвращает python-ldap).
+
+Запуск из корня рабочей области: python -m benchmarks.bench_decode
+"""
+import struct
+import time
+import uuid
+
+from app.ds import DSDict
+from app.ds.func_ds_get import ATTR_TYPES, ATTR_SPECIAL, TYPE_HANDLERS, ATTR_EXTEND, decode_page, decode_plan
+
+SIZES = [10_000, 100_000]  # Число объектов
+PAGE = 1000  # Размер страницы
+
+# Запрошенные атрибуты и скрытые атрибуты, как их формирует prepare_search для get_user(properties=[...])
+PROPERTIES = ["distinguishedname", "name", "objectclass", "objectguid", "givenname", "samaccountname", "objectsid",
+              "sn", "userprincipalname", "enabled", "whencreated", "pwdlastset", "memberof", "proxyaddresses",
+              "useraccountcontrol", "extensionattribute1"]
+PROPERTIES_SHADOW = []
+
+
+def sid(i: int) -> bytes:
+    return struct.pack('B', 1) + struct.pack('B', 5) + b'\x00\x00\x00\x00\x00\x05' + \
+        struct.pack('<LLLLL', 21, 1004336348, 1177238915, 682003330, 1000 + i)
+
+
+def synthetic_object(i: int) -> dict:
+    """Объект пользователя в исходном виде (значения - списки байтов). У части объектов нет некоторых атрибутов"""
+    data = {
+        "distinguishedName": [f"CN=User {i},OU=Users,DC=example,DC=com".encode()],
+        "name": [f"User {i}".encode()],
+        "objectClass": [b"top", b"person", b"organizationalPerson", b"user"],
+        "objectGUID": [uuid.UUID(int=i).bytes_le],
+        "givenName": [b"User"],
+        "sAMAccountName": [f"user{i}".encode()],
+        "objectSid": [sid(i)],
+        "sn": [str(i).encode()],
+        "userPrincipalName": [f"user{i}@example.com".encode()],
+        "whenCreated": [b"20240916132547.0Z"],
+        "pwdLastSet": [b"133800000000000000"],
+        "memberOf": [f"CN=Group {g},OU=Groups,DC=example,DC=com".encode() for g in range(5)],
+        "userAccountControl": [b"512"],
+    }
+    if i % 3:
+        data["proxyAddresses"] = [f"smtp:user{i}@example.com".encode()]
+    if i % 5 == 0:
+        data["extensionAttribute1"] = [b"\x01\x02\x03"]
+    return data
+
+
+def legacy_object_processing(data, properties, properties_shadow) -> DSDict:
+    """Прежний object_processing (без дозапроса значений)"""
+    result = DSDict()
+    for attr, values in data.items():
+        action = ATTR_TYPES.get(attr, ('unknown', False))
+        handler = ATTR_SPECIAL.get(attr, TYPE_HANDLERS.get(action[0], lambda v: [f"hex:{i.hex()}" for i in v]))
+        result[attr] = handler(values)
+        result[attr] = result[attr][0] if action[1] else result[attr]
+
+    for attr, rules in ATTR_EXTEND.items():
+        if attr in result:
+            for attr_extend, handler_extend in rules.items():
+                if attr_extend.lower() in properties or '*' in properties:
+                    result[attr_extend] = handler_extend(result[attr])
+
+    [result.pop(attr) for attr in properties_shadow if attr in result]
+    return result
+
+
+def legacy(pages: list) -> list:
+    return [[legacy_object_processing(data, PROPERTIES, PROPERTIES_SHADOW) for data in page] for page in pages]
+
+
+def current(pages: list) -> list:
+    return [decode_page(page, PROPERTIES, PROPERTIES_SHADOW) for page in pages]
+
+
+def measure(func, pages: list) -> float:
+    """Время конвертации в секундах (лучшее из трёх запусков)"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func(pages)
+        spent = time.perf_counter() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def main():
+    for size in SIZES:
+        objects = [synthetic_object(i) for i in range(size)]
+        pages = [objects[i:i + PAGE] for i in range(0, size, PAGE)]
+
+        reference = legacy(pages)
+        result = current(pages)
+        assert [[list(o.items()) for o in p] for p in result] == [[list(o.items()) for o in p] for p in reference]
+
+        print(f"{size} objects, plans: {decode_plan.cache_info().currsize}")
+        print(f"{'legacy':>10}: {measure(legacy, pages):7.3f} s")
+        print(f"{'plan':>10}: {measure(current, pages):7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Сравнение прежнего DSDict (casefold при каждом обращении, собственная таблица ключей у каждого объекта)
+с текущим app.ds.DSDict: обращение к ключам, создание объектов и сериализация ответа.
+
+Запуск из корня рабочей области: python -m benchmarks.bench_ds_dict
+"""
+import time
+import tracemalloc
+
+from app.ds import DSDict
+from app.ds.func_ds_get import decode_page, decode_plan
+from app.ds.attributes_type import ATTR_TYPES
+from app.moduls import json_encoder
+from app.moduls.post_base import STEP
+
+from benchmarks.bench_decode import synthetic_object as raw_object, PROPERTIES, PROPERTIES_SHADOW, PAGE
+from benchmarks.bench_serializer import synthetic_object
+
+SIZE = 100_000  # Число объектов
+LOOKUPS = 1_000_000  # Число обращений к ключам
+
+# Ключи, по которым идут обращения (в разном регистре, часть ключей отсутствует)
+LOOKUP_KEYS = ["distinguishedName", "samaccountname", "Enabled", "memberOf", "OBJECTSID", "mail", "whenCreated"]
+
+_no_default = object()
+
+
+class LegacyDSDict(dict):
+    """Прежний DSDict"""
+
+    def __init__(self, seed=None, **kwargs):
+        super().__init__()
+        self._original_keys = {}
+        self.update(seed)
+        self.update(kwargs)
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key.casefold())
+
+    def __setitem__(self, key, value):
+        lower_key = key.casefold()
+        self._original_keys[lower_key] = key
+        return dict.__setitem__(self, lower_key, value)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key.casefold())
+
+    def get(self, key, default=None):
+        return dict.get(self, key.casefold(), default)
+
+    def pop(self, key, default=_no_default):
+        lower_key = key.casefold()
+        self._original_keys.pop(lower_key, None)
+        if default is _no_default:
+            return dict.pop(self, lower_key)
+        return dict.pop(self, lower_key, default)
+
+    def update(self, seed=None, **kwargs):
+        if seed is None:
+            seed = {}
+
+        if hasattr(seed, "items"):
+            for key, value in seed.items():
+                self[key] = value
+        else:
+            for key, value in seed:
+                self[key] = value
+
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def keys(self):
+        return list(self._original_keys[k] for k in dict.keys(self))
+
+    def items(self):
+        return [(self._original_keys[k], v) for k, v in dict.items(self)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def original_dict(self):
+        return {orig_key: self[orig_key] for orig_key in self.keys()}
+
+
+def lookup(objects: list) -> None:
+    keys = LOOKUP_KEYS * (LOOKUPS // len(LOOKUP_KEYS) // len(objects))
+    for data in objects:
+        for key in keys:
+            if key in data:
+                data[key]
+            data.get(key)
+
+
+def attr_types(table) -> None:
+    for _ in range(LOOKUPS // len(LOOKUP_KEYS)):
+        for key in LOOKUP_KEYS:
+            table.get(key, ('unknown', False))
+
+
+def construct(cls, plain: list) -> list:
+    return [cls(data) for data in plain]
+
+
+def iterate(objects: list) -> None:
+    for data in objects:
+        for _ in data.items():
+            pass
+        for _ in data.keys():
+            pass
+
+
+def serialize(objects: list) -> bytes:
+    return b','.join([json_encoder.dumps_items(objects[l:l + STEP]) for l in range(0, len(objects), STEP)])
+
+
+def legacy_apply(plan, data: dict) -> LegacyDSDict:
+    """Прежний DecodePlan.apply (результат собирается через __setitem__ прежнего DSDict)"""
+    result = LegacyDSDict()
+    for attr, handler, single in plan.attributes:
+        values = handler(data[attr])
+        result[attr] = values[0] if single else values
+
+    for attr, attr_extend, handler_extend in plan.extend:
+        result[attr_extend] = handler_extend(result[attr])
+
+    for attr in plan.hidden:
+        result.pop(attr)
+
+    return result
+
+
+def legacy_decode(pages: list) -> list:
+    properties, properties_shadow = tuple(PROPERTIES), tuple(PROPERTIES_SHADOW)
+    return [legacy_apply(decode_plan(tuple(data), properties, properties_shadow), data)
+            for page in pages for data in page]
+
+
+def current_decode(pages: list) -> list:
+    return [data for page in pages for data in decode_page(page, PROPERTIES, PROPERTIES_SHADOW)]
+
+
+def measure(func, *args) -> float:
+    """Время исполнения в секундах (лучшее из трёх запусков)"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func(*args)
+        spent = time.perf_counter() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def memory(func, *args) -> float:
+    """Объём памяти результата в МБ"""
+    tracemalloc.start()
+    result = func(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 2 ** 20
+
+
+def main():
+    plain = [dict(synthetic_object(i).items()) for i in range(SIZE)]
+    legacy_objects = construct(LegacyDSDict, plain)
+    current_objects = construct(DSDict, plain)
+    assert [list(i.items()) for i in current_objects] == [i.items() for i in legacy_objects]
+    assert serialize(current_objects) == serialize(legacy_objects)
+
+    raw = [raw_object(i) for i in range(SIZE)]
+    pages = [raw[i:i + PAGE] for i in range(0, SIZE, PAGE)]
+    legacy_table = LegacyDSDict(ATTR_TYPES.items())
+    assert [i.items() for i in legacy_decode(pages)] == [list(i.items()) for i in current_decode(pages)]
+
+    print(f"{SIZE} objects, {LOOKUPS} lookups")
+    print(f"{'':>16}  {'legacy':>8}  {'current':>8}")
+    for name, legacy_args, current_args in (
+            ("lookup", (lookup, legacy_objects[:1000]), (lookup, current_objects[:1000])),
+            ("ATTR_TYPES.get", (attr_types, legacy_table), (attr_types, ATTR_TYPES)),
+            ("construct", (construct, LegacyDSDict, plain), (construct, DSDict, plain)),
+            ("decode", (legacy_decode, pages), (current_decode, pages)),
+            ("items/keys", (iterate, legacy_objects), (iterate, current_objects)),
+            ("serialize", (serialize, legacy_objects), (serialize, current_objects))):
+        print(f"{name:>16}: {measure(*legacy_args):6.3f} s  {measure(*current_args):6.3f} s")
+
+    print(f"{'decode memory':>16}: {memory(legacy_decode, pages):6.1f} MB  {memory(current_decode, pages):6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
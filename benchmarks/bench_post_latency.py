@@ -0,0 +1,50 @@
+"""
+Замер задержки ответа присоски: ожидание с опросом задания каждые 100 мс против ожидания по событию завершения.
+
+Запуск из корня рабочей области: python -m benchmarks.bench_post_latency
+"""
+import time
+import asyncio
+import statistics
+
+from app.moduls.post_base import stream_result
+
+RUNS = 200  # Число запусков для каждой функции
+
+
+def trivial_sucker():
+    """Присоска, которая отвечает за ~3 мс (как get_user на прогретом контроллере домена)"""
+    time.sleep(0.003)
+    return [{"distinguishedName": "CN=user,DC=example,DC=com"}]
+
+
+async def stream_result_polling(s_func):
+    """Прежняя схема ожидания: проверка завершения задания каждые 100 мс"""
+    yield '{"waiting": "'
+    task = asyncio.create_task(asyncio.to_thread(s_func))
+    while not task.done():
+        await asyncio.sleep(0.1)
+    yield str(await task)
+    yield "}"
+
+
+async def measure(stream) -> float:
+    """Время в миллисекундах от начала запроса до получения последнего фрагмента ответа"""
+    start = time.perf_counter()
+    async for _ in stream:
+        pass
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    legacy = [await measure(stream_result_polling(trivial_sucker)) for _ in range(RUNS)]
+    current = [await measure(stream_result(trivial_sucker, None)) for _ in range(RUNS)]
+
+    for name, values in [("polling 100 ms", legacy), ("event-driven", current)]:
+        values.sort()
+        print(f"{name:>15}: p50 {statistics.median(values):7.2f} ms, "
+              f"p95 {values[int(len(values) * 0.95) - 1]:7.2f} ms, max {values[-1]:7.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Сравнение результата поиска списком DSDict (decode_page) и по столбцам (DSResultSet, decode_page_columns):
+занятая память, время конвертации страниц и время сериализации ответа в формат json и columnar.
+Используются синтетические объекты из bench_decode (часть объектов без некоторых атрибутов).
+
+Запуск из корня рабочей области: python -m benchmarks.bench_result_set
+"""
+import gc
+import time
+import tracemalloc
+
+from app.ds import DSResultSet
+from app.ds.func_ds_get import decode_page, decode_page_columns
+from app.moduls.response_format import get_format
+
+from benchmarks.bench_decode import synthetic_object, PAGE
+
+SIZES = [10_000, 100_000]  # Число объектов
+STEP = 1000  # Число элементов в одной части ответа (как в post_base)
+REPEAT = 7  # Число запусков при измерении времени
+
+# Запрошенные атрибуты, включая вычисляемые
+PROPERTIES = ["distinguishedname", "name", "objectclass", "objectguid", "givenname", "samaccountname", "objectsid",
+              "sn", "userprincipalname", "enabled", "flagsuac", "whencreated", "pwdlastset", "memberof",
+              "proxyaddresses", "useraccountcontrol", "extensionattribute1"]
+PROPERTIES_SHADOW = []
+
+
+def as_list(pages: list) -> list:
+    result = []
+    for page in pages:
+        result.extend(decode_page(page, PROPERTIES, PROPERTIES_SHADOW))
+    return result
+
+
+def as_columns(pages: list) -> DSResultSet:
+    result = DSResultSet()
+    for page in pages:
+        result.extend(decode_page_columns(page, PROPERTIES, PROPERTIES_SHADOW))
+    return result
+
+
+def memory(func, pages: list) -> tuple:
+    """Результат и объём памяти, который он занимает, в МБ"""
+    gc.collect()
+    tracemalloc.start()
+    result = func(pages)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size / 2 ** 20
+
+
+def serialize(fmt, result) -> bytes:
+    return b''.join(fmt.encode_items(result[i:i + STEP]) for i in range(0, len(result), STEP))
+
+
+def measure(func, *args) -> float:
+    """Процессорное время исполнения в секундах (лучшее из REPEAT запусков)"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.process_time()
+        func(*args)
+        spent = time.process_time() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def main():
+    for size in SIZES:
+        objects = [synthetic_object(i) for i in range(size)]
+        pages = [objects[i:i + PAGE] for i in range(0, size, PAGE)]
+
+        rows, rows_memory = memory(as_list, pages)
+        columns, columns_memory = memory(as_columns, pages)
+        assert columns == rows
+
+        print(f"{size} objects")
+        print(f"{'':>10}  {'memory':>9}  {'decode':>8}  {'json':>8}  {'columnar':>8}")
+        for name, func, result, spent_memory in (("list", as_list, rows, rows_memory),
+                                                 ("columns", as_columns, columns, columns_memory)):
+            print(f"{name:>10}: {spent_memory:6.1f} MB  {measure(func, pages):6.3f} s"
+                  f"  {measure(serialize, get_format('json'), result):6.3f} s"
+                  f"  {measure(serialize, get_format('columnar'), result):6.3f} s")
+
+        for name in ("json", "columnar"):
+            fmt = get_format(name)
+            assert serialize(fmt, columns) == serialize(fmt, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Сравнение сериализации ответа присоски: прежний путь (json_encoder + json.dumps + ','.join по каждому элементу)
+против однопроходных сериализаторов из app.moduls.json_encoder на синтетических объектах DS.
+
+Запуск из корня рабочей области: python -m benchmarks.bench_serializer
+"""
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.ds import DSDict
+from app.moduls import json_encoder
+from app.moduls.post_base import STEP
+
+SIZES = [10_000, 100_000]  # Число объектов в ответе
+
+
+def synthetic_object(i: int) -> DSDict:
+    """Объект пользователя, похожий на результат get_user с properties='*'"""
+    tz = timezone(timedelta(hours=3))
+    return DSDict({
+        "distinguishedName": f"CN=User {i},OU=Users,OU=Company,DC=example,DC=com",
+        "cn": f"User {i}",
+        "name": f"User {i}",
+        "displayName": f"User Number {i}",
+        "givenName": "User",
+        "sn": str(i),
+        "sAMAccountName": f"user{i}",
+        "userPrincipalName": f"user{i}@example.com",
+        "objectClass": "user",
+        "objectGUID": "0f2e9c5a-3b1d-4c6e-9a8f-7d6c5b4a3921",
+        "objectSid": f"S-1-5-21-1004336348-1177238915-682003330-{1000 + i}",
+        "userAccountControl": 512,
+        "Enabled": True,
+        "primaryGroupID": 513,
+        "whenCreated": datetime(2024, 9, 16, 13, 25, 47),
+        "whenChanged": datetime(2025, 1, 10, 8, 0, 1),
+        "pwdLastSet": datetime(2025, 1, 1, 12, 30, 15, 123456, tzinfo=tz),
+        "lastLogonTimestamp": datetime(2025, 1, 9, 7, 45, 0, 500000, tzinfo=tz),
+        "accountExpires": 9223372036854775807,
+        "memberOf": [f"CN=Group {g},OU=Groups,DC=example,DC=com" for g in range(10)],
+        "proxyAddresses": [f"smtp:user{i}@example.com", f"SMTP:user{i}@mail.example.com"],
+    })
+
+
+def legacy(result: list) -> bytes:
+    """Прежний путь сериализации из stream_result"""
+    chunks = []
+    for l in range(0, len(result), STEP):
+        chunks.append(','.join([json.dumps(json_encoder.json_encoder(i)) for i in result[l:l + STEP]]))
+    return ','.join(chunks).encode("utf-8")
+
+
+def current(result: list) -> bytes:
+    """Текущий путь сериализации из stream_result"""
+    return b','.join([json_encoder.dumps_items(result[l:l + STEP]) for l in range(0, len(result), STEP)])
+
+
+def measure(func, result: list) -> float:
+    """Время сериализации в секундах (лучшее из трёх запусков)"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func(result)
+        spent = time.perf_counter() - start
+        best = spent if best is None else min(best, spent)
+    return best
+
+
+def main():
+    for size in SIZES:
+        result = [synthetic_object(i) for i in range(size)]
+        reference = json.loads(b"[" + legacy(result) + b"]")
+
+        print(f"{size} objects")
+        print(f"{'legacy':>10}: {measure(legacy, result):7.3f} s")
+
+        for name in json_encoder.SERIALIZERS:
+            try:
+                json_encoder.set_serializer(name)
+            except RuntimeError:
+                print(f"{name:>10}: not installed")
+                continue
+
+            assert json.loads(b"[" + current(result) + b"]") == reference
+            print(f"{name:>10}: {measure(current, result):7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
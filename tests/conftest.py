@@ -0,0 +1,182 @@
+"""
+Общие данные тестов: исходный DSDict и исходная конвертация объектов DS, с которыми сравниваются текущие
+"""
+import struct
+import uuid
+
+import pytest
+
+from app.ds.func_ds_get import ATTR_TYPES, ATTR_SPECIAL, TYPE_HANDLERS, ATTR_EXTEND
+
+_no_default = object()
+
+
+class BaselineDSDict(dict):
+    """Исходный DSDict (до таблиц ключей): с ним сравнивается поведение DSDict, DSEntry и DSResultSet"""
+
+    def __init__(self, seed=None, **kwargs):
+        super().__init__()
+        self._original_keys = {}
+        self.update(seed)
+        self.update(kwargs)
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, key.casefold())
+
+    def __setitem__(self, key, value):
+        lower_key = key.casefold()
+        self._original_keys[lower_key] = key
+        return dict.__setitem__(self, lower_key, value)
+
+    def __delitem__(self, key):
+        lower_key = key.casefold()
+        dict.__delitem__(self, lower_key)
+        self._original_keys.pop(lower_key, None)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key.casefold())
+
+    def __or__(self, other):
+        base = self.copy()
+        base.update(other)
+        return base
+
+    def copy(self):
+        new_dict = BaselineDSDict()
+        new_dict.update(self.items())
+        return new_dict
+
+    def get(self, key, default=None):
+        return dict.get(self, key.casefold(), default)
+
+    def pop(self, key, default=_no_default):
+        lower_key = key.casefold()
+        self._original_keys.pop(lower_key, None)
+        if default is _no_default:
+            return dict.pop(self, lower_key)
+        return dict.pop(self, lower_key, default)
+
+    def setdefault(self, key, default=None):
+        lower_key = key.casefold()
+        if lower_key not in self:
+            self._original_keys[lower_key] = key
+        return dict.setdefault(self, lower_key, default)
+
+    def update(self, seed=None, **kwargs):
+        if seed is None:
+            seed = {}
+
+        if hasattr(seed, "items"):
+            for key, value in seed.items():
+                self[key] = value
+        else:
+            for key, value in seed:
+                self[key] = value
+
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def keys(self):
+        return list(self._original_keys[k] for k in dict.keys(self))
+
+    def items(self):
+        return [(self._original_keys[k], v) for k, v in dict.items(self)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def original_dict(self):
+        return {orig_key: self[orig_key] for orig_key in self.keys()}
+
+
+@pytest.fixture
+def baseline_dict():
+    return BaselineDSDict
+
+
+def assert_same(current, baseline: BaselineDSDict) -> None:
+    """Словарь current ведёт себя так же, как исходный DSDict"""
+    assert current.keys() == baseline.keys()
+    assert current.items() == baseline.items()
+    assert list(current) == list(baseline)
+    assert current.original_dict() == baseline.original_dict()
+    assert len(current) == len(baseline)
+    assert dict(current) == dict(baseline)
+    for key in baseline.keys():
+        for variant in (key, key.upper(), key.lower()):
+            assert variant in current
+            assert current[variant] == baseline[variant]
+            assert current.get(variant) == baseline.get(variant)
+    assert "absent" not in current
+    assert current.get("absent", 1) == baseline.get("absent", 1)
+
+
+@pytest.fixture
+def same():
+    return assert_same
+
+
+def raw_object(i: int) -> dict:
+    """Объект в исходном виде (как его возвращает python-ldap). У части объектов нет некоторых атрибутов"""
+    sid = b'\x01\x05\x00\x00\x00\x00\x00\x05' + struct.pack('<LLLLL', 21, 1004336348, 1177238915, 682003330, 1000 + i)
+    data = {
+        "distinguishedName": [f"CN=User {i},OU=Users,DC=ex,DC=com".encode()],
+        "name": [f"User {i}".encode()],
+        "objectClass": [b"top", b"person", b"organizationalPerson", b"user"],
+        "objectGUID": [uuid.UUID(int=i).bytes_le],
+        "sAMAccountName": [f"user{i}".encode()],
+        "objectSid": [sid],
+        "whenCreated": [b"20240916132547.0Z"],
+        "pwdLastSet": [b"0" if i % 4 == 0 else b"133800000000000000"],
+        "memberOf": [f"CN=Group {g},OU=Groups,DC=ex,DC=com".encode() for g in range(1 + i % 3)],
+        "userAccountControl": [b"514" if i % 2 else b"512"],
+    }
+    if i % 3:
+        data["proxyAddresses"] = [f"smtp:user{i}@ex.com".encode()]
+    if i % 5 == 0:
+        data["extensionAttribute1"] = [b"\x01\x02\x03"]
+    return data
+
+
+@pytest.fixture
+def raw_objects() -> list[dict]:
+    return [raw_object(i) for i in range(20)]
+
+
+# Запрошенные и скрытые атрибуты, как их формирует prepare_search
+PROPERTIES = [
+    (["*"], []),
+    (["distinguishedname", "name", "objectguid", "objectsid", "enabled", "changepasswordatlogon", "memberof"], []),
+    (["distinguishedname", "enabled", "flagsuac"], ["userAccountControl", "objectClass"]),
+]
+
+
+def baseline_decode(data: dict, properties: list, properties_shadow: list) -> BaselineDSDict:
+    """Исходный object_processing (без дозапроса значений)"""
+    result = BaselineDSDict()
+    for attr, values in data.items():
+        action = ATTR_TYPES.get(attr, ('unknown', False))
+        handler = ATTR_SPECIAL.get(attr, TYPE_HANDLERS.get(action[0], lambda v: [f"hex:{i.hex()}" for i in v]))
+        result[attr] = handler(values)
+        result[attr] = result[attr][0] if action[1] else result[attr]
+
+    for attr, rules in ATTR_EXTEND.items():
+        if attr in result:
+            for attr_extend, handler_extend in rules.items():
+                if attr_extend.lower() in properties or '*' in properties:
+                    result[attr_extend] = handler_extend(result[attr])
+
+    [result.pop(attr) for attr in properties_shadow if attr in result]
+    return result
+
+
+@pytest.fixture(params=PROPERTIES, ids=["all", "extended", "shadow"])
+def properties(request) -> tuple[list, list]:
+    """Запрошенные и скрытые атрибуты"""
+    return request.param
+
+
+@pytest.fixture
+def baseline(raw_objects, properties) -> list[BaselineDSDict]:
+    """Объекты raw_objects после исходной конвертации"""
+    return [baseline_decode(data, *properties) for data in raw_objects]
@@ -0,0 +1,124 @@
+"""
+Тесты присоски batch: ссылки на результаты операций, ограничение числа операций и порядок исполнения
+"""
+import asyncio
+
+import pytest
+
+from app.sites.ds import batch as batch_module
+from app.sites.ds.batch import MAX_OPERATIONS, _resolve, _refs, batch
+
+
+class FakeHook:
+    """Замена AsyncDSHook: операции завершаются после паузы, начало и конец операций записываются в events"""
+
+    def __init__(self, **kwargs):
+        self.events = []
+        FakeHook.last = self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, type_query):
+        async def operation(**param_query):
+            identity = param_query.get('identity')
+            self.events.append(("start", type_query, identity))
+            await asyncio.sleep(0.01)
+            self.events.append(("end", type_query, identity))
+            if identity == "missing":
+                raise RuntimeError("Object not found")
+            if type_query.startswith("get_"):
+                return [{"distinguishedName": f"CN={identity},DC=ex,DC=com"}]
+            return True
+        return operation
+
+
+@pytest.fixture(autouse=True)
+def fake_hook(monkeypatch):
+    monkeypatch.setattr(batch_module, "AsyncDSHook", FakeHook)
+
+
+def run(operations: list[dict], **kwargs) -> list[dict]:
+    async def collect():
+        return [item async for item in batch(login="a", password="b", host="dc1", operations=operations, **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_resolve():
+    results = {"u": [{"distinguishedName": "CN=u0,DC=ex,DC=com", "memberOf": ["CN=g0", "CN=g1"]}]}
+    value = {"identity": {"$ref": "u.0.distinguishedName"}, "groups": [{"$ref": "u.0.memberOf.1"}],
+             "all": {"$ref": "u"}, "plain": {"$ref": "u", "other": 1}}
+    assert _resolve(value, results) == {
+        "identity": "CN=u0,DC=ex,DC=com", "groups": ["CN=g1"], "all": results["u"],
+        "plain": {"$ref": "u", "other": 1},
+    }
+    assert _refs(value) == {"u"}
+    assert _refs({"identity": "u0"}) == set()
+
+
+def test_resolve_unknown():
+    with pytest.raises(RuntimeError, match="Unknown reference"):
+        _resolve({"$ref": "nope.0"}, {})
+
+
+def test_max_operations():
+    operations = [{"type_query": "get_user", "param_query": {"identity": "u0"}}] * (MAX_OPERATIONS + 1)
+    with pytest.raises(RuntimeError, match="Too many operations"):
+        run(operations)
+    assert len(run(operations[:MAX_OPERATIONS])) == MAX_OPERATIONS
+
+
+def test_unknown_operation():
+    with pytest.raises(RuntimeError, match="Unknown operation"):
+        run([{"type_query": "__init__"}])
+
+
+def test_references():
+    results = run([
+        {"type_query": "get_user", "param_query": {"identity": "u0"}, "id": "u"},
+        {"type_query": "get_group", "param_query": {"identity": {"$ref": "u.0.distinguishedName"}}},
+    ], references=True)
+    assert [item["error"] for item in results] == [False, False]
+    assert ("start", "get_group", "CN=u0,DC=ex,DC=com") in FakeHook.last.events
+
+
+def test_references_disabled():
+    """Без references параметры передаются как есть"""
+    results = run([{"type_query": "get_user", "param_query": {"identity": {"$ref": "u"}}}])
+    assert FakeHook.last.events[0] == ("start", "get_user", {"$ref": "u"})
+    assert results[0]["error"] is False
+
+
+def test_order_around_writes():
+    """Чтения исполняются одновременно, изменение - после всех предыдущих, следующие операции - после него"""
+    results = run([
+        {"type_query": "get_user", "param_query": {"identity": "u0"}},
+        {"type_query": "get_user", "param_query": {"identity": "u1"}},
+        {"type_query": "set_user", "param_query": {"identity": "u0"}},
+        {"type_query": "get_user", "param_query": {"identity": "u2"}},
+    ])
+    assert [item["index"] for item in results] == [0, 1, 2, 3]
+
+    events = FakeHook.last.events
+    assert events[:2] == [("start", "get_user", "u0"), ("start", "get_user", "u1")]
+    write = events.index(("start", "set_user", "u0"))
+    assert events.index(("end", "get_user", "u0")) < write
+    assert events.index(("end", "get_user", "u1")) < write
+    assert events.index(("end", "set_user", "u0")) < events.index(("start", "get_user", "u2"))
+
+
+def test_stop_on_error():
+    operations = [
+        {"type_query": "get_user", "param_query": {"identity": "missing"}},
+        {"type_query": "set_user", "param_query": {"identity": "u0"}},
+    ]
+    results = run(operations)
+    assert [(item["index"], item["error"]) for item in results] == [(0, True)]
+    assert results[0]["details"] == "Object not found"
+    assert ("start", "set_user", "u0") not in FakeHook.last.events
+
+    results = run(operations, stop_on_error=False)
+    assert [(item["index"], item["error"]) for item in results] == [(0, True), (1, False)]
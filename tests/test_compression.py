@@ -0,0 +1,114 @@
+"""
+Тесты сжатия ответа присосок: выбор сжатия по Accept-Encoding и дожатие каждой части
+"""
+import zlib
+import asyncio
+
+import pytest
+
+from app.moduls import compression
+from app.moduls.compression import (GzipEncoder, ZstdEncoder, set_compression, negotiate_encoding, compress_stream,
+                                    zstandard)
+
+
+@pytest.fixture(autouse=True)
+def allowed():
+    """Разрешены все кодировки, после теста восстанавливаются исходные"""
+    saved = list(compression._allowed)
+    set_compression("zstd, gzip")
+    yield
+    compression._allowed = saved
+
+
+def test_set_compression_unknown():
+    with pytest.raises(ValueError):
+        set_compression("br")
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", GzipEncoder),
+    ("GZIP;q=0.5", GzipEncoder),
+    ("gzip;q=0", None),
+    ("gzip;q=abc", None),
+    ("*;q=0, gzip", GzipEncoder),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    encoder = negotiate_encoding(accept_encoding)
+    assert (type(encoder) if encoder else None) is expected
+
+
+def test_negotiate_encoding_disabled():
+    """По умолчанию (пустой список кодировок) ответы не сжимаются"""
+    set_compression("")
+    assert negotiate_encoding("gzip, zstd") is None
+
+
+def test_negotiate_encoding_priority():
+    """Выбирается кодировка с наибольшим q, при равном q - в порядке предпочтения (zstd, затем gzip)"""
+    preferred = ZstdEncoder if zstandard is not None else GzipEncoder
+    assert type(negotiate_encoding("gzip, zstd")) is preferred
+    assert type(negotiate_encoding("*")) is preferred
+    assert type(negotiate_encoding("zstd;q=0.5, gzip")) is GzipEncoder
+    if zstandard is not None:
+        assert type(negotiate_encoding("zstd, gzip;q=0.5")) is ZstdEncoder
+
+
+def test_gzip_flushes_every_chunk():
+    """Каждая сжатая часть распаковывается сразу, без ожидания конца потока"""
+    chunks = ['{"waiting": "', '.', b'.', '", "error": false, "details": ', '[1, 2, 3]', '}']
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [part async for part in compress_stream(stream(), GzipEncoder())]
+
+    parts = asyncio.run(collect())
+    assert len(parts) == len(chunks) + 1
+
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    for chunk, part in zip(chunks, parts):
+        assert decompressor.decompress(part) == (chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+    assert decompressor.decompress(parts[-1]) == b''
+    assert decompressor.eof
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_zstd_flushes_every_chunk():
+    chunks = [b'{"waiting": "', b'.', b'"}']
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [part async for part in compress_stream(stream(), ZstdEncoder())]
+
+    parts = asyncio.run(collect())
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    for chunk, part in zip(chunks, parts):
+        assert decompressor.decompress(part) == chunk
+
+
+def test_compress_stream_closes_source():
+    """Если стриминг прерван, исходный генератор закрывается сразу"""
+    closed = []
+
+    async def stream():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    async def interrupt():
+        compressed = compress_stream(stream(), GzipEncoder())
+        await anext(compressed)
+        await compressed.aclose()
+
+    asyncio.run(interrupt())
+    assert closed == [True]
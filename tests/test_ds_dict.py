@@ -0,0 +1,118 @@
+"""
+Тесты DSDict: поведение совпадает с исходным DSDict, в том числе для словарей с общей таблицей ключей
+"""
+import copy
+import json
+import pickle
+
+import pytest
+
+from app.ds import DSDict
+from app.ds.ds_dict import key_table
+from app.moduls.json_encoder import dumps
+
+SEED = [("distinguishedName", "CN=u0,DC=ex,DC=com"), ("sAMAccountName", "u0"), ("memberOf", ["CN=g0"]),
+        ("Enabled", True)]
+
+
+def operations():
+    """Последовательности изменений словаря: (название, функция, которая изменяет словарь и возвращает результат)"""
+    return [
+        ("setitem new", lambda d: d.__setitem__("mail", "u0@ex.com")),
+        ("setitem other case", lambda d: d.__setitem__("SAMACCOUNTNAME", "u1")),
+        ("delitem", lambda d: d.__delitem__("MEMBEROF")),
+        ("pop", lambda d: d.pop("enabled")),
+        ("pop default", lambda d: d.pop("absent", None)),
+        ("setdefault existing", lambda d: d.setdefault("SAMAccountName", "x")),
+        ("setdefault new", lambda d: d.setdefault("Description", "x")),
+        ("update dict", lambda d: d.update({"Name": "u0", "samaccountname": "u2"})),
+        ("update pairs", lambda d: d.update([("sn", "0")], givenName="u")),
+        ("update none", lambda d: d.update()),
+    ]
+
+
+@pytest.mark.parametrize("name, operation", operations(), ids=[i[0] for i in operations()])
+def test_same_as_baseline(name, operation, baseline_dict, same):
+    current, baseline = DSDict(SEED), baseline_dict(SEED)
+    assert operation(current) == operation(baseline)
+    same(current, baseline)
+
+
+@pytest.mark.parametrize("name, operation", operations(), ids=[i[0] for i in operations()])
+def test_shared_table(name, operation, baseline_dict, same):
+    """Изменение словаря с общей таблицей ключей не изменяет другие словари этой таблицы"""
+    table = key_table(tuple(key for key, _ in SEED))
+    current = DSDict._from_table(table, zip(table, [value for _, value in SEED]))
+    other = DSDict._from_table(table, zip(table, [value for _, value in SEED]))
+    baseline = baseline_dict(SEED)
+
+    same(current, baseline)
+    assert operation(current) == operation(baseline)
+    same(current, baseline)
+    same(other, baseline_dict(SEED))
+    assert table == key_table(tuple(key for key, _ in SEED))
+
+
+def test_copy(baseline_dict, same):
+    """Копия использует ту же таблицу ключей, пока один из словарей не изменит ключи"""
+    current = DSDict(SEED)
+    duplicate = current.copy()
+    assert type(duplicate) is DSDict
+
+    duplicate["Mail"] = "x"
+    current.pop("memberOf")
+    same(duplicate, baseline_dict(SEED + [("Mail", "x")]))
+    same(current, baseline_dict(SEED[:2] + SEED[3:]))
+
+
+def test_or(baseline_dict, same):
+    current = DSDict(SEED) | {"MAIL": "x", "enabled": False}
+    same(current, baseline_dict(SEED) | {"MAIL": "x", "enabled": False})
+    assert type(current) is DSDict
+
+    current = DSDict(SEED)
+    current |= {"Mail": "x"}
+    same(current, baseline_dict(SEED + [("Mail", "x")]))
+
+
+def test_popitem_and_clear(baseline_dict, same):
+    current = DSDict(SEED)
+    assert current.popitem() == ("enabled", True)
+    same(current, baseline_dict(SEED[:-1]))
+
+    current.clear()
+    same(current, baseline_dict())
+    current["Name"] = "u0"
+    same(current, baseline_dict(Name="u0"))
+
+
+def test_errors():
+    current = DSDict(SEED)
+    with pytest.raises(KeyError):
+        current["absent"]
+    with pytest.raises(KeyError):
+        current.pop("absent")
+    with pytest.raises(KeyError):
+        del current["absent"]
+
+
+def test_serialization(baseline_dict):
+    """Сериализация, копирование и передача в другой процесс сохраняют исходные ключи"""
+    current = DSDict(SEED)
+    expected = json.dumps(baseline_dict(SEED).original_dict())
+    assert json.dumps(current.original_dict()) == expected
+    assert json.loads(dumps(current)) == json.loads(expected)
+
+    for duplicate in (pickle.loads(pickle.dumps(current)), copy.deepcopy(current), copy.copy(current)):
+        assert type(duplicate) is DSDict
+        assert duplicate.items() == current.items()
+
+    assert repr(current) == "DSDict({'distinguishedName': 'CN=u0,DC=ex,DC=com', 'sAMAccountName': 'u0', " \
+                            "'memberOf': ['CN=g0'], 'Enabled': True})"
+
+
+def test_equality(baseline_dict):
+    """Сравнение не зависит от регистра исходных ключей, как и у исходного DSDict"""
+    assert DSDict(SEED) == baseline_dict(SEED)
+    assert DSDict(SEED) == DSDict([(key.upper(), value) for key, value in SEED])
+    assert DSDict(SEED) != DSDict(SEED[1:])
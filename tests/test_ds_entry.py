@@ -0,0 +1,83 @@
+"""
+Тесты DSEntry: объект с отложенной конвертацией совпадает с исходной конвертацией объекта
+"""
+import copy
+import json
+import pickle
+
+from app.ds import DSDict, DSEntry
+from app.ds.ds_entry import _PENDING
+from app.ds.func_ds_get import decode_page
+from app.moduls.json_encoder import dumps
+
+
+def test_same_as_baseline(raw_objects, properties, baseline, same):
+    entries = decode_page(raw_objects, *properties, lazy=True)
+    assert all(isinstance(entry, DSEntry) for entry in entries)
+    for entry, expected in zip(entries, baseline):
+        same(entry, expected)
+
+
+def test_same_as_decode_page(raw_objects, properties):
+    """Полная конвертация и DSEntry дают одинаковый результат при сравнении и сериализации"""
+    for entry, data in zip(decode_page(raw_objects, *properties, lazy=True), decode_page(raw_objects, *properties)):
+        assert entry == data and data == entry
+        assert repr(entry) == "DSEntry" + repr(data)[len("DSDict"):]
+        assert dumps(entry) == dumps(data)
+        assert json.dumps(entry, default=str) == json.dumps(data, default=str)
+
+
+def test_lazy(raw_objects):
+    """Атрибут конвертируется при первом обращении, остальные остаются в исходном виде"""
+    entry = decode_page(raw_objects[:1], ["*"], [], lazy=True)[0]
+    assert all(value is _PENDING for value in dict.values(entry))
+
+    assert entry["OBJECTSID"] == "S-1-5-21-1004336348-1177238915-682003330-1000"
+    assert dict.__getitem__(entry, "objectsid") == "S-1-5-21-1004336348-1177238915-682003330-1000"
+    assert dict.__getitem__(entry, "samaccountname") is _PENDING
+
+    # Вычисляемый атрибут не требует сохранения исходного атрибута
+    assert entry.get("enabled") is True
+    assert dict.__getitem__(entry, "useraccountcontrol") is _PENDING
+
+
+def test_derived_from_hidden(raw_objects):
+    """Вычисляемый атрибут скрытого атрибута вычисляется, сам скрытый атрибут не возвращается"""
+    entry = decode_page(raw_objects[1:2], ["distinguishedname", "enabled"], ["userAccountControl"], lazy=True)[0]
+    assert entry["Enabled"] is False
+    assert "userAccountControl" not in entry
+
+
+def test_mutations(raw_objects, baseline_dict, same):
+    entry = decode_page(raw_objects[:1], ["*"], [], lazy=True)[0]
+    expected = baseline_dict(decode_page(raw_objects[:1], ["*"], [])[0].items())
+
+    for current in (entry, expected):
+        current["Enabled"] = False
+        current["mail"] = "user0@ex.com"
+        del current["memberOf"]
+        current.pop("objectSid")
+        current.setdefault("name", "other")
+        current.update({"SN": "0"})
+    same(entry, expected)
+    assert entry["enabled"] is False
+
+
+def test_copy_and_pickle(raw_objects):
+    """Копия и объект, переданный в другой процесс, полностью сконвертированы и являются DSDict"""
+    entry = decode_page(raw_objects[:1], ["*"], [], lazy=True)[0]
+    data = decode_page(raw_objects[:1], ["*"], [])[0]
+
+    for duplicate in (pickle.loads(pickle.dumps(entry)), entry.copy()):
+        assert type(duplicate) is DSDict
+        assert duplicate.items() == data.items()
+    assert copy.deepcopy(entry).items() == data.items()
+
+
+def test_values_and_popitem(raw_objects):
+    entry = decode_page(raw_objects[:1], ["*"], [], lazy=True)[0]
+    data = decode_page(raw_objects[:1], ["*"], [])[0]
+    assert list(entry.values()) == list(dict.values(data))
+
+    entry = decode_page(raw_objects[:1], ["*"], [], lazy=True)[0]
+    assert entry.popitem() == data.popitem()
@@ -0,0 +1,113 @@
+"""
+Тесты учёта доступности хостов: circuit breaker, скользящее среднее времени подключения и порядок хостов
+"""
+import pytest
+
+from app.ds import ds_health
+from app.ds.ds_health import HealthRegistry
+
+
+class Clock:
+    """Заменяет модуль time в ds_health: время изменяется только явно"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ds_health, "time", clock)
+    return clock
+
+
+def test_breaker(clock):
+    """После failure_threshold ошибок подряд хост недоступен на время backoff"""
+    health = HealthRegistry(failure_threshold=2, backoff=5.0)
+    health.record_failure("dc1")
+    assert health.available("dc1")
+
+    health.record_failure("DC1")
+    assert not health.available("dc1")
+    clock.now += 4.9
+    assert not health.available("dc1")
+    clock.now += 0.1
+    assert health.available("dc1")
+
+
+def test_backoff_doubles(clock):
+    """Время недоступности удваивается с каждой ошибкой, но не больше max_backoff"""
+    health = HealthRegistry(backoff=5.0, max_backoff=12.0)
+    for backoff in (5.0, 10.0, 12.0, 12.0):
+        health.record_failure("dc1")
+        clock.now += backoff - 0.1
+        assert not health.available("dc1")
+        clock.now += 0.1
+        assert health.available("dc1")
+
+
+def test_success_resets(clock):
+    health = HealthRegistry(backoff=5.0)
+    health.record_failure("dc1")
+    health.record_failure("dc1")
+    health.record_success("dc1")
+    assert health.available("dc1")
+
+    # Счётчик ошибок сброшен: следующая ошибка снова закрывает хост на начальное время
+    health.record_failure("dc1")
+    clock.now += 5.0
+    assert health.available("dc1")
+
+    stats = health.stats()["dc1"]
+    assert stats["successes"] == 1
+    assert stats["errors"] == 3
+    assert stats["failures"] == 1
+
+
+def test_latency_ema(clock):
+    health = HealthRegistry(smoothing=0.5)
+    health.record_success("dc1", 0.2)
+    assert health.stats()["dc1"]["latency"] == 0.2
+    health.record_success("dc1", 0.4)
+    assert health.stats()["dc1"]["latency"] == 0.3
+    health.record_success("dc1")
+    assert health.stats()["dc1"]["latency"] == 0.3
+
+
+def test_order(clock):
+    """Сначала хосты без замеров (в исходном порядке), затем быстрые, недоступные - в конце"""
+    health = HealthRegistry()
+    health.record_success("slow", 0.5)
+    health.record_success("fast", 0.1)
+    health.record_failure("down")
+
+    assert health.order(["down", "slow", "new1", "fast", "new2"]) == ["new1", "new2", "fast", "slow", "down"]
+
+    # Когда время недоступности истекло, хост снова пробуется в обычном порядке
+    clock.now += health.backoff
+    assert health.order(["slow", "down"]) == ["down", "slow"]
+
+
+def test_order_all_down(clock):
+    """Недоступные хосты не исключаются"""
+    health = HealthRegistry()
+    health.record_failure("dc1")
+    health.record_failure("dc2")
+    assert health.order(["dc1", "dc2"]) == ["dc1", "dc2"]
+    assert health.spread(["dc1", "dc2"], 1) == ["dc1", "dc2"]
+
+
+def test_spread(clock):
+    """Параллельные сессии начинают с разных доступных хостов"""
+    health = HealthRegistry()
+    health.record_success("dc1", 0.1)
+    health.record_success("dc2", 0.2)
+    health.record_failure("dc3")
+
+    hosts = ["dc1", "dc2", "dc3"]
+    assert health.spread(hosts, 0) == ["dc1", "dc2", "dc3"]
+    assert health.spread(hosts, 1) == ["dc2", "dc1", "dc3"]
+    assert health.spread(hosts, 2) == ["dc1", "dc2", "dc3"]
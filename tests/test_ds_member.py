@@ -0,0 +1,101 @@
+"""
+Тесты получения членов группы: оценка размера группы, выбор способа поиска и параметры поиска
+"""
+import pytest
+
+from app.ds import DSDict, DSResultSet
+from app.ds.func_ds_get import run_blocking
+from app.ds.func_ds_member import (MEMBER_PROBE, ASQControl, ASQ_OID, read_probe, read_members, member_strategy,
+                                   member_search, members_in_base, probe_attribute)
+
+BASE = "OU=Users,DC=ex,DC=com"
+
+
+def dns(count: int) -> list[bytes]:
+    return [f"CN=u{i},{BASE}".encode("utf-8") for i in range(count)]
+
+
+@pytest.mark.parametrize("members, supports_asq, expected", [
+    ([], True, "empty"),
+    ([], False, "empty"),
+    (["CN=u0"], True, "asq"),
+    (None, True, "asq"),
+    (["CN=u0"], False, "dn"),
+    (None, False, "memberof"),
+])
+def test_member_strategy(members, supports_asq, expected):
+    assert member_strategy(members, supports_asq) == expected
+
+
+def test_probe_attribute():
+    assert probe_attribute() == f"member;range=0-{MEMBER_PROBE - 1}"
+
+
+def test_read_probe():
+    """Список членов, если получены все значения, None - если членов больше MEMBER_PROBE"""
+    assert read_probe({}) == []
+    assert read_probe({"member;range=0-*": dns(3)}) == [dn.decode("utf-8") for dn in dns(3)]
+    assert read_probe({f"member;range=0-{MEMBER_PROBE - 1}": dns(MEMBER_PROBE)}) is None
+    # Сервер, который не поддерживает диапазоны, возвращает все значения
+    assert read_probe({"member": dns(MEMBER_PROBE)}) == [dn.decode("utf-8") for dn in dns(MEMBER_PROBE)]
+    assert read_probe({"Member": dns(MEMBER_PROBE + 1)}) is None
+
+
+class FakeSession:
+    """Сессия общих корутин поиска, которая возвращает заранее заданный ответ"""
+
+    def __init__(self, res: list):
+        self.res = res
+        self.searches = []
+
+    async def search(self, **kwargs) -> int:
+        self.searches.append(kwargs)
+        return 1
+
+    async def result(self, msgid: int) -> tuple:
+        return 101, self.res, msgid, []
+
+
+def test_read_members():
+    group_dn = f"CN=g0,{BASE}"
+    session = FakeSession([(group_dn, {"member;range=0-*": dns(2)})])
+    assert run_blocking(read_members(session, group_dn)) == [dn.decode("utf-8") for dn in dns(2)]
+    assert session.searches[0]["base"] == group_dn
+    assert session.searches[0]["attrlist"] == [probe_attribute()]
+
+    assert run_blocking(read_members(FakeSession([]), group_dn)) == []
+
+
+def test_member_search():
+    group_dn = f"CN=g(0),{BASE}"
+
+    asq = member_search("asq", group_dn, BASE, None)
+    assert (asq["search_base"], asq["search_scope"]) == (group_dn, "base")
+    assert [control.controlType for control in asq["serverctrls"]] == [ASQ_OID]
+
+    dn = member_search("dn", group_dn, BASE, [f"CN=u(0),{BASE}", f"CN=u1,{BASE}"])
+    assert dn["ldap_filter"] == f"(|(distinguishedName=CN=u\\280\\29,{BASE})(distinguishedName=CN=u1,{BASE}))"
+    assert (dn["search_base"], dn["search_scope"], dn["serverctrls"]) == (BASE, "subtree", None)
+
+    memberof = member_search("memberof", group_dn, BASE, None)
+    assert memberof["ldap_filter"] == f"(memberOf={group_dn})"
+
+
+def test_asq_control():
+    """Значение элемента управления: SEQUENCE { sourceAttribute OCTET STRING }"""
+    assert ASQControl("member").encodeControlValue() == b"\x30\x08\x04\x06member"
+    value = ASQControl("a" * 200).encodeControlValue()
+    assert value[:6] == b"\x30\x81\xcb\x04\x81\xc8"
+    assert len(value) == 6 + 200
+
+
+def test_members_in_base():
+    """Возвращаются только объекты из области каталога (ASQ возвращает объекты из всего раздела каталога)"""
+    objects = [DSDict({"distinguishedName": f"CN=u0,{BASE}"}),
+               DSDict({"distinguishedName": "CN=u1,OU=Other,DC=ex,DC=com"}),
+               DSDict({"distinguishedName": BASE.upper()})]
+    assert members_in_base(objects, BASE) == [objects[0], objects[2]]
+
+    result = members_in_base(DSResultSet(objects), BASE)
+    assert isinstance(result, DSResultSet)
+    assert result == [objects[0], objects[2]]
@@ -0,0 +1,75 @@
+"""
+Тесты размеров страниц поиска и диапазонов значений по ограничениям политики запросов контроллера домена
+"""
+import pytest
+
+from app.ds.ds_search_base import DSCapabilities, read_admin_limits
+from app.ds.func_ds_get import DEFAULT_PAGE_SIZE, page_size_for, next_step, read_range, range_attribute
+
+
+@pytest.mark.parametrize("page_size, result_set_size, count, expected", [
+    (None, None, 0, DEFAULT_PAGE_SIZE),
+    (1000, None, 0, 1000),
+    (1000, None, 5000, 1000),
+    (1000, 10, 0, 10),
+    (1000, 2500, 2000, 500),
+    (1000, 2500, 1500, 1000),
+    (1000, 10, 10, 1),
+    (None, 5, 0, 5),
+])
+def test_page_size_for(page_size, result_set_size, count, expected):
+    """Страница не больше числа объектов, которое осталось получить, но не меньше одного объекта"""
+    assert page_size_for(page_size, result_set_size, count) == expected
+
+
+@pytest.mark.parametrize("step, received, expected", [
+    (None, 1500, None),
+    (5000, 1500, 1500),
+    (1500, 1500, 1500),
+    (1500, 0, 1500),
+])
+def test_next_step(step, received, expected):
+    """Если сервер вернул меньше значений, чем запрошено, шаг уменьшается до его предела"""
+    assert next_step(step, received) == expected
+
+
+def test_range_attribute():
+    assert range_attribute("member", 0) == "member;range=0-*"
+    assert range_attribute("member", 1500, 1500) == "member;range=1500-2999"
+
+
+def test_read_range():
+    assert read_range({"member;range=0-1499": [b"a"]}, "member") == ([b"a"], 1500)
+    assert read_range({"Member;Range=1500-*": [b"b"]}, "member") == ([b"b"], None)
+    assert read_range({"member": [b"a"]}, "member") == ([], None)
+    assert read_range({"member;range=0-1499": []}, "member") == ([], None)
+
+
+class FakeConnect:
+    """Сессия, которая возвращает lDAPAdminLimits политики запросов"""
+
+    def __init__(self, limits: list[bytes]):
+        self.limits = limits
+        self.searches = []
+
+    def search_s(self, base, scope, filterstr, attrlist):
+        self.searches.append(base)
+        return [(base, {"lDAPAdminLimits": self.limits})]
+
+
+def test_admin_limits():
+    capabilities = DSCapabilities({"configurationNamingContext": [b"CN=Configuration,DC=ex,DC=com"]})
+    assert capabilities.limit("MaxPageSize") is None
+    assert capabilities.limit("MaxPageSize", 1000) == 1000
+
+    connect = FakeConnect([b"MaxPageSize=5000", b"MaxValRange=3000", b"MaxQueryDuration=abc"])
+    capabilities.admin_limits = read_admin_limits(connect, capabilities)
+    assert connect.searches[0].endswith(",CN=Configuration,DC=ex,DC=com")
+    assert capabilities.limit("MaxPageSize") == 5000
+    assert capabilities.limit("maxvalrange") == 3000
+    assert capabilities.limit("MaxQueryDuration") is None
+
+
+def test_admin_limits_without_configuration():
+    capabilities = DSCapabilities({})
+    assert read_admin_limits(FakeConnect([b"MaxPageSize=5000"]), capabilities) == {}
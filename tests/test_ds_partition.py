@@ -0,0 +1,73 @@
+"""
+Тесты разбиения поиска по поддереву на части для параллельного исполнения
+"""
+import threading
+
+from app.ds.func_ds_partition import MAX_PARTITIONS, PartitionQueue, plan_partitions, raw_page
+
+BASE = "DC=ex,DC=com"
+
+
+def child(name: str, subordinates: int | None = None) -> dict:
+    """Дочерний объект области поиска в исходном виде (атрибуты CHILD_PROPERTIES)"""
+    data = {"distinguishedName": [f"{name},{BASE}".encode("utf-8")]}
+    if subordinates is not None:
+        data["msDS-Approx-Immed-Subordinates"] = [str(subordinates).encode("utf-8")]
+    return data
+
+
+def test_plan_partitions():
+    """Каждый дочерний объект - часть subtree (большие первыми), сама область - часть base в конце"""
+    children = [child("OU=Small", 1), child("CN=Computer"), child("OU=Large", 500), child("OU=Empty", 0)]
+    assert plan_partitions(BASE, children) == [
+        (f"OU=Large,{BASE}", "subtree"),
+        (f"OU=Small,{BASE}", "subtree"),
+        (f"CN=Computer,{BASE}", "subtree"),
+        (f"OU=Empty,{BASE}", "subtree"),
+        (BASE, "base"),
+    ]
+
+
+def test_plan_partitions_no_children():
+    assert plan_partitions(BASE, []) == [(BASE, "base")]
+
+
+def test_plan_partitions_cap():
+    """Если дочерних объектов больше MAX_PARTITIONS, поддерево ищется одной частью"""
+    children = [child(f"CN=u{i}") for i in range(MAX_PARTITIONS)]
+    assert len(plan_partitions(BASE, children)) == MAX_PARTITIONS + 1
+
+    children.append(child("CN=last"))
+    assert plan_partitions(BASE, children) == [(BASE, "subtree")]
+
+
+def test_partition_queue():
+    """Части subtree выдаются первыми, часть base - последней, каждая часть выдаётся один раз"""
+    partitions = [(BASE, "base"), (f"OU=A,{BASE}", "subtree"), (f"OU=B,{BASE}", "subtree")]
+    queue = PartitionQueue(partitions)
+    assert [queue.get() for _ in range(4)] == [(f"OU=A,{BASE}", "subtree"), (f"OU=B,{BASE}", "subtree"),
+                                               (BASE, "base"), None]
+
+
+def test_partition_queue_threads():
+    """Очередь общая для параллельных сессий"""
+    partitions = [(f"OU={i},{BASE}", "subtree") for i in range(1000)]
+    queue = PartitionQueue(partitions)
+    taken = [[] for _ in range(4)]
+
+    def worker(index: int):
+        while (partition := queue.get()) is not None:
+            taken[index].append(partition)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(sum(taken, [])) == sorted(partitions)
+
+
+def test_raw_page():
+    objects = [child("OU=A")]
+    assert raw_page(None, objects, [], []) is objects
@@ -0,0 +1,90 @@
+"""
+Тесты DSResultSet: результат по столбцам совпадает с исходной конвертацией объектов и со списком DSDict
+"""
+import pytest
+
+from app.ds import DSDict, DSResultSet
+from app.ds.func_ds_get import decode_page, decode_page_columns
+from app.moduls.response_format import _columnar_block, _columnar_rows
+
+
+def test_same_as_baseline(raw_objects, properties, baseline, same):
+    """Объекты разных наборов атрибутов сохраняют порядок страницы, ключи и значения исходной конвертации"""
+    result = decode_page_columns(raw_objects, *properties)
+    assert len(result) == len(baseline)
+    for data, expected in zip(result, baseline):
+        assert type(data) is DSDict
+        same(data, expected)
+    for index, expected in enumerate(baseline):
+        same(result[index], expected)
+    same(result[-1], baseline[-1])
+
+
+def test_same_as_decode_page(raw_objects, properties):
+    data = decode_page(raw_objects, *properties)
+    result = decode_page_columns(raw_objects, *properties)
+    assert result == data
+    assert result.to_list() == data
+    assert result.records() == [dict(i.items()) for i in data]
+    assert [list(i.keys()) for i in result.records()] == [i.keys() for i in data]
+
+
+def test_pages(raw_objects, properties):
+    """Страницы, добавленные в один результат, равны конвертации всех объектов сразу"""
+    result = DSResultSet()
+    for start in range(0, len(raw_objects), 7):
+        result.extend(decode_page_columns(raw_objects[start:start + 7], *properties))
+    assert result == decode_page(raw_objects, *properties)
+
+
+def test_index_and_slice(raw_objects):
+    data = decode_page(raw_objects, ["*"], [])
+    result = decode_page_columns(raw_objects, ["*"], [])
+
+    assert result[2:9:3] == data[2:9:3]
+    assert isinstance(result[2:9:3], DSResultSet)
+    assert result.take([5, 1]) == [data[5], data[1]]
+    assert result[:0] == []
+    with pytest.raises(IndexError):
+        result[len(data)]
+
+
+def test_column(raw_objects):
+    result = decode_page_columns(raw_objects, ["*"], [])
+    data = decode_page(raw_objects, ["*"], [])
+    assert result.column("SAMACCOUNTNAME") == [i["sAMAccountName"] for i in data]
+    assert result.column("proxyAddresses", []) == [i.get("proxyAddresses", []) for i in data]
+    assert result.column("absent") == [None] * len(data)
+
+
+def test_append_dicts(baseline_dict, same):
+    """Объекты с разными наборами ключей и регистром ключей"""
+    rows = [{"Name": "a", "mail": None}, DSDict({"NAME": "b", "sn": "1"}), {}]
+    result = DSResultSet(rows)
+    result.append({"name": "c"})
+
+    assert result.keys() == ["Name", "mail", "sn"]
+    for data, expected in zip(result, rows + [{"name": "c"}]):
+        same(data, baseline_dict(expected))
+
+
+def test_columnar_block(raw_objects):
+    """Блок DSResultSet совпадает с блоком списка словарей: null сохраняется, отсутствующие ключи - в missing"""
+    result = DSResultSet([{"a": 1, "b": None}, {"a": 2}, {"c": "x"}])
+    block = result.columnar_block()
+    assert block == {"columns": ["a", "b", "c"], "rows": [[1, None, None], [2, None, None], [None, None, "x"]],
+                     "missing": [[2], [1, 2], [0, 1]]}
+    assert block == _columnar_block(result.records())
+    assert _columnar_rows([block]) == result.records()
+
+    result = decode_page_columns(raw_objects, ["*"], [])
+    assert _columnar_rows([result.columnar_block()]) == result.records()
+
+
+def test_empty():
+    """Пустой результат передаётся блоком без столбцов и строк, как и пустой список"""
+    assert DSResultSet() == []
+    assert DSResultSet().records() == []
+    assert DSResultSet().columnar_block() == {"columns": [], "rows": []}
+    assert _columnar_block([]) == {"columns": [], "rows": []}
+    assert decode_page_columns([], ["*"], []) == []
@@ -0,0 +1,158 @@
+"""
+Тесты кэша ответов присосок: TTL, вытеснение (LRU) и сброс записей при изменениях в DS
+"""
+import asyncio
+
+import pytest
+
+from app.ds import remove_change_listener
+from app.ds.ds_changes import notify_change
+from app.moduls import response_cache
+from app.moduls.response_cache import ResponseCache
+
+
+class Clock:
+    """Заменяет модуль time в response_cache: время изменяется только явно"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def make_cache():
+    """Создание кэша. После теста кэш отписывается от изменений в DS"""
+    caches = []
+
+    def make(**kwargs):
+        kwargs.setdefault("ttl", 60)
+        cache = ResponseCache(name="test", **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        remove_change_listener(cache.invalidate)
+
+
+def record(cache: ResponseCache, key: str, data: dict | None, chunks: list, success: bool = True,
+           change: str | None = None) -> list:
+    """Стриминг ответа через Recorder. change - DN объекта, изменённого во время стриминга"""
+    recorder = cache.recorder(key, data)
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+        if change:
+            notify_change(change)
+        if success:
+            recorder.success()
+
+    async def collect():
+        return [chunk async for chunk in recorder.record(stream())]
+
+    return asyncio.run(collect())
+
+
+def test_ttl(make_cache, clock):
+    cache = make_cache(ttl=10)
+    cache.put("k", b"body", None, cache.generation)
+    assert cache.get("k") == b"body"
+
+    clock.now += 9.9
+    assert cache.get("k") == b"body"
+    clock.now += 0.1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_entries(make_cache, clock):
+    """При превышении числа записей удаляется давно не использованная"""
+    cache = make_cache(max_entries=2)
+    cache.put("a", b"1", None, cache.generation)
+    cache.put("b", b"2", None, cache.generation)
+    assert cache.get("a") == b"1"
+    cache.put("c", b"3", None, cache.generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_bytes(make_cache, clock):
+    """Размер кэша ограничен в байтах, ответ больше кэша не сохраняется"""
+    cache = make_cache(max_bytes=10)
+    cache.put("a", b"12345", None, cache.generation)
+    cache.put("b", b"12345", None, cache.generation)
+    cache.put("c", b"1", None, cache.generation)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+
+    cache.put("d", b"x" * 11, None, cache.generation)
+    assert cache.get("d") is None
+    assert cache.get("b") == b"12345"
+
+
+def test_recorder(make_cache, clock):
+    """Ответ сохраняется после успешного стриминга, ответ с ошибкой - нет"""
+    cache = make_cache()
+    assert record(cache, "ok", None, ["a", b"b"]) == ["a", b"b"]
+    assert cache.get("ok") == b"ab"
+
+    record(cache, "error", None, ["a"], success=False)
+    assert cache.get("error") is None
+
+
+def test_recorder_too_large(make_cache, clock):
+    cache = make_cache(max_bytes=4)
+    assert record(cache, "large", None, ["abc", "def"]) == ["abc", "def"]
+    assert cache.get("large") is None
+
+
+def test_change_during_stream(make_cache, clock):
+    """Ответ, при формировании которого были изменения в DS, не сохраняется (номер изменения увеличился)"""
+    cache = make_cache()
+    generation = cache.generation
+    record(cache, "k", {"base": "OU=Other,DC=ex,DC=com"}, ["a"], change="CN=u0,OU=Users,DC=ex,DC=com")
+    assert cache.generation == generation + 1
+    assert cache.get("k") is None
+
+    record(cache, "k", {"base": "OU=Other,DC=ex,DC=com"}, ["a"])
+    assert cache.get("k") == b"a"
+
+
+def test_notify_change_scope(make_cache, clock):
+    """Сбрасываются записи, область которых содержит объект, записи без области и записи, где объект упоминается"""
+    cache = make_cache(scope=lambda data: (data or {}).get("base"))
+    record(cache, "users", {"base": "OU=Users,DC=ex,DC=com"}, ['{"details": []}'])
+    record(cache, "groups", {"base": "OU=Groups,DC=ex,DC=com"}, ['{"details": []}'])
+    record(cache, "member", {"base": "OU=Groups,DC=ex,DC=com"}, ['{"member": "CN=U0,OU=Users,DC=ex,DC=com"}'])
+    record(cache, "all", None, ['{"details": []}'])
+
+    notify_change("CN=u0,OU=Users,DC=ex,DC=com")
+
+    assert cache.get("users") is None
+    assert cache.get("member") is None
+    assert cache.get("all") is None
+    assert cache.get("groups") == b'{"details": []}'
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_notify_change_escaped(make_cache, clock):
+    """DN, который в JSON передаётся с экранированием, тоже находится в ответе"""
+    cache = make_cache(scope=lambda data: (data or {}).get("base"))
+    record(cache, "k", {"base": "OU=Other,DC=ex,DC=com"}, ['{"dn": "CN=\\"Q\\",OU=Users,DC=ex,DC=com"}'])
+    notify_change('CN="Q",OU=Users,DC=ex,DC=com')
+    assert cache.get("k") is None
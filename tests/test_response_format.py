@@ -0,0 +1,143 @@
+"""
+Тесты форматов ответа присосок: выбор формата по Accept и восстановление ответа через decode_response
+"""
+import asyncio
+
+import pytest
+
+from app.moduls.post_base import stream_result
+from app.moduls.response_format import (JSONFormat, NDJSONFormat, MsgPackFormat, ColumnarFormat, negotiate,
+                                        get_format, decode_response, msgpack)
+
+FORMATS = [JSONFormat.name, NDJSONFormat.name, MsgPackFormat.name, ColumnarFormat.name]
+
+OBJECTS = [
+    {"distinguishedName": "CN=u0,DC=ex,DC=com", "name": "u0", "memberOf": ["CN=g0,DC=ex,DC=com"]},
+    {"distinguishedName": "CN=u1,DC=ex,DC=com", "name": "u1", "memberOf": []},
+]
+
+
+def response(s_func, name: str) -> tuple[bytes, str]:
+    """Тело ответа stream_result в формате name и его Content-Type"""
+    if name == MsgPackFormat.name and msgpack is None:
+        pytest.skip("msgpack is not installed")
+    fmt = get_format(name)
+
+    async def collect():
+        chunks = []
+        async for chunk in stream_result(s_func, None, fmt=fmt):
+            chunks.append(chunk.encode("utf-8") if isinstance(chunk, str) else bytes(chunk))
+        return b''.join(chunks)
+
+    return asyncio.run(collect()), fmt.media_type
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, JSONFormat),
+    ("", JSONFormat),
+    ("application/json", JSONFormat),
+    ("text/event-stream", JSONFormat),
+    ("application/x-ndjson", NDJSONFormat),
+    ("application/jsonl", NDJSONFormat),
+    ("application/vnd.tentacula.columnar+json", ColumnarFormat),
+    ("text/html, application/x-ndjson;q=0.5", NDJSONFormat),
+    ("application/x-ndjson;q=0.4, application/vnd.tentacula.columnar+json;q=0.9", ColumnarFormat),
+    ("application/x-ndjson;q=0, application/json;q=0.1", JSONFormat),
+    ("application/x-ndjson;q=abc", JSONFormat),
+    ("text/html", JSONFormat),
+])
+def test_negotiate(accept, expected):
+    """Формат выбирается по наибольшему q, при равном q - по порядку в Accept, иначе используется json"""
+    assert type(negotiate(accept)) is expected
+
+
+def test_negotiate_msgpack():
+    """msgpack выбирается, только если библиотека установлена"""
+    expected = MsgPackFormat if msgpack is not None else JSONFormat
+    assert type(negotiate("application/x-msgpack")) is expected
+
+
+def test_get_format_unknown():
+    with pytest.raises(ValueError):
+        get_format("xml")
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_round_trip_list(name):
+    """Список объектов"""
+    body, media_type = response(lambda: OBJECTS, name)
+    assert decode_response(body, media_type) == {"waiting": "", "error": False, "details": OBJECTS}
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_round_trip_value(name):
+    """Результат, который не является списком"""
+    body, media_type = response(lambda: {"count": 2}, name)
+    assert decode_response(body, media_type) == {"waiting": "", "error": False, "details": {"count": 2}}
+
+    body, media_type = response(lambda: 42, name)
+    assert decode_response(body, media_type)["details"] == "42"
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_round_trip_empty(name):
+    """Пустой список"""
+    body, media_type = response(lambda: [], name)
+    assert decode_response(body, media_type) == {"waiting": "", "error": False, "details": []}
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_round_trip_generator(name):
+    """Генератор: части ответа передаются одним списком"""
+    def pages():
+        yield OBJECTS[:1]
+        yield []
+        yield OBJECTS[1:]
+
+    body, media_type = response(pages, name)
+    assert decode_response(body, media_type) == {"waiting": "", "error": False, "details": OBJECTS}
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_round_trip_error(name):
+    """Ошибка до начала передачи результата"""
+    def fail():
+        raise RuntimeError("No such object")
+
+    body, media_type = response(fail, name)
+    assert decode_response(body, media_type) == {"waiting": "", "error": True, "details": "No such object"}
+
+
+def test_columnar_null_and_missing():
+    """В columnar значение null сохраняется, а отсутствующий у объекта ключ не восстанавливается"""
+    objects = [{"a": 1, "b": None}, {"a": 2}, {"c": "x"}]
+    body, media_type = response(lambda: objects, ColumnarFormat.name)
+    assert decode_response(body, media_type)["details"] == objects
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_round_trip_stream_error(name):
+    """Ошибка после начала передачи списка: вместо переданных элементов возвращается текст ошибки"""
+    def pages():
+        yield OBJECTS[:1]
+        raise RuntimeError("Server is unavailable")
+
+    body, media_type = response(pages, name)
+    assert decode_response(body, media_type) == {"waiting": "", "error": True, "details": "Server is unavailable"}
+
+
+@pytest.mark.parametrize("name", [JSONFormat.name, ColumnarFormat.name])
+def test_stream_keys_once(name):
+    """В json и columnar ключи error и details передаются по одному разу, в том числе при ошибке"""
+    def pages():
+        yield OBJECTS
+
+    def failed_pages():
+        yield OBJECTS
+        raise RuntimeError("Server is unavailable")
+
+    for s_func in (pages, failed_pages):
+        body, _ = response(s_func, name)
+        text = body.decode("utf-8")
+        assert text.count('"error"') == 1
+        assert text.count('"details"') == 1
@@ -0,0 +1,123 @@
+"""
+Тесты объединения одинаковых одновременных запросов (single-flight)
+"""
+import asyncio
+
+from app.moduls import single_flight
+from app.moduls.single_flight import flight_key, join, start
+
+
+async def collect(stream) -> list:
+    """Все части ответа клиента"""
+    return [chunk async for chunk in stream]
+
+
+def test_flight_key():
+    """Ключ не зависит от порядка входных данных, но учитывает эндпоинт, формат и учётные данные"""
+    key = flight_key("/ds/get_user", "json", {"login": "a", "identity": "u0"})
+    assert key == flight_key("/ds/get_user", "json", {"identity": "u0", "login": "a"})
+    assert key != flight_key("/ds/get_user", "ndjson", {"login": "a", "identity": "u0"})
+    assert key != flight_key("/ds/get_group", "json", {"login": "a", "identity": "u0"})
+    assert key != flight_key("/ds/get_user", "json", {"login": "b", "identity": "u0"})
+    assert "u0" not in key
+
+
+def test_join_without_flight():
+    assert join(flight_key("/ds/get_user", "json", {"identity": "none"})) is None
+
+
+def test_join_receives_whole_response():
+    """Подключившийся позже клиент получает ответ целиком с самого начала"""
+    async def main():
+        release = asyncio.Event()
+
+        async def stream():
+            yield "a"
+            await release.wait()
+            yield "b"
+            yield "c"
+
+        key = flight_key("/ds/get_user", "json", {"identity": "join"})
+        leader = start(key, stream())
+        first = await anext(leader)
+
+        follower = join(key)
+        assert follower is not None
+        release.set()
+
+        leader_chunks = [first] + [chunk async for chunk in leader]
+        follower_chunks = [chunk async for chunk in follower]
+        return key, leader_chunks, follower_chunks
+
+    key, leader_chunks, follower_chunks = asyncio.run(main())
+    assert leader_chunks == follower_chunks == ["a", "b", "c"]
+    # Завершённое исполнение удаляется: следующий запрос начинает новое
+    assert join(key) is None
+
+
+def test_error_fan_out():
+    """Если стриминг прерван ошибкой, все клиенты получают одни и те же части и завершаются"""
+    async def main():
+        async def stream():
+            yield "a"
+            await asyncio.sleep(0)
+            raise RuntimeError("Stream failed")
+
+        key = flight_key("/ds/get_user", "json", {"identity": "error"})
+        leader = start(key, stream())
+        follower = join(key)
+        return key, await asyncio.gather(collect(leader), collect(follower))
+
+    key, results = asyncio.run(main())
+    assert results == [["a"], ["a"]]
+    assert join(key) is None
+
+
+def test_cancel_when_all_clients_left():
+    """Исполнение прерывается, только когда отключились все клиенты"""
+    async def main():
+        closed = asyncio.Event()
+
+        async def stream():
+            try:
+                yield "a"
+                await asyncio.Event().wait()
+            finally:
+                closed.set()
+
+        key = flight_key("/ds/get_user", "json", {"identity": "cancel"})
+        leader = start(key, stream())
+        follower = join(key)
+        await anext(leader)
+        await anext(follower)
+
+        await leader.aclose()
+        await asyncio.sleep(0)
+        assert not closed.is_set()
+
+        await follower.aclose()
+        await asyncio.wait_for(closed.wait(), 1)
+        await asyncio.sleep(0)
+        return key
+
+    key = asyncio.run(main())
+    assert join(key) is None
+
+
+def test_stats():
+    before = dict(single_flight.stats())
+
+    async def main():
+        async def stream():
+            yield "a"
+
+        key = flight_key("/ds/get_user", "json", {"identity": "stats"})
+        leader = start(key, stream())
+        follower = join(key)
+        await asyncio.gather(collect(leader), collect(follower))
+
+    asyncio.run(main())
+    after = single_flight.stats()
+    assert after["leaders"] == before["leaders"] + 1
+    assert after["followers"] == before["followers"] + 1
+    assert after["in_flight"] == 0